@@ -0,0 +1,80 @@
+"""
+Micro-benchmark of AmplifyStream.transform_datetime_fields.
+
+Compares the previous implementation, which looked up five field names on every record and
+converted to local time, with the per-stream field list converted to UTC, formatted from a
+cache of the minutes converted recently. The current conversion is checked against
+datetime.fromtimestamp(..., timezone.utc).isoformat() first.
+
+Usage: python benchmarks/bench_datetime_fields.py [number_of_records]
+"""
+
+import sys
+import timeit
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from source_aws_amplify.timestamps import transform_epoch_fields  # noqa: E402
+
+ALL_FIELDS = ["createTime", "updateTime", "startTime", "endTime", "commitTime"]
+APP_FIELDS = ("createTime", "updateTime")
+JOB_FIELDS = ("startTime", "endTime", "commitTime")
+
+
+def make_apps(count: int):
+    return [{"appId": str(i), "createTime": 1.7e9 + i, "updateTime": 1700000000123 + i} for i in range(count)]
+
+
+def make_jobs(count: int):
+    return [
+        {"jobId": str(i), "startTime": 1.7e9 + i, "endTime": 1700000000123 + i, "commitTime": 1.7e9 + i, "status": "SUCCEED"}
+        for i in range(count)
+    ]
+
+
+def transform_all_fields(record):
+    for field in ALL_FIELDS:
+        if field in record and record[field] is not None:
+            try:
+                timestamp = float(record[field])
+                if timestamp > 1e11:
+                    timestamp = timestamp / 1000
+                record[field] = datetime.fromtimestamp(timestamp).isoformat()
+            except (ValueError, TypeError):
+                pass
+    return record
+
+
+def check(records, fields):
+    for record in records:
+        converted = transform_epoch_fields(dict(record), fields)
+        for field in fields:
+            timestamp = float(record[field])
+            expected = datetime.fromtimestamp(timestamp / 1000 if timestamp > 1e11 else timestamp, timezone.utc)
+            assert converted[field] == expected.isoformat(), (record, field, converted[field])
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    check(make_apps(count), APP_FIELDS)
+    check(make_jobs(count), JOB_FIELDS)
+
+    for stream, records, fields in (("apps", make_apps(count), APP_FIELDS), ("jobs", make_jobs(count), JOB_FIELDS)):
+
+        def previous():
+            for record in records:
+                transform_all_fields(dict(record))
+
+        def current():
+            for record in records:
+                transform_epoch_fields(dict(record), fields)
+
+        for name, function in (("previous", previous), ("current", current)):
+            seconds = min(timeit.repeat(function, number=1, repeat=5))
+            print(f"{stream:>4} {name:>8}: {seconds * 1000:8.1f} ms for {count} records ({count / seconds:,.0f} records/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Benchmark of the projection trimming records to the configured catalog before serialization.
+
+App records carry large environmentVariables, buildSpec and customRules blobs, which the catalog
+used here deselects. Reports the cost of projecting
+each record, and the size and serialization time of record messages with and without projection.
+
+Usage: python benchmarks/bench_projection.py [number_of_records]
+"""
+
+import copy
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from airbyte_cdk.entrypoint import AirbyteEntrypoint  # noqa: E402
+from airbyte_cdk.models import AirbyteMessage, AirbyteRecordMessage, Type  # noqa: E402
+
+from source_aws_amplify.projection import compile_projection  # noqa: E402
+
+STREAM = "apps"
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "source_aws_amplify" / "schemas" / f"{STREAM}.json"
+
+
+BUILD_SPEC = """version: 1
+frontend:
+  phases:
+    preBuild:
+      commands:
+        - npm ci
+    build:
+      commands:
+        - npm run build
+  artifacts:
+    baseDirectory: dist
+    files:
+      - '**/*'
+  cache:
+    paths:
+      - node_modules/**/*
+"""
+
+
+def make_records(count: int):
+    return [
+        {
+            "appArn": f"arn:aws:amplify:us-east-1:123456789012:apps/d{i:012x}",
+            "appId": f"d{i:012x}",
+            "createTime": "2024-03-01T00:00:00+00:00",
+            "updateTime": "2024-03-02T00:00:00+00:00",
+            "defaultDomain": f"d{i:012x}.amplifyapp.com",
+            "description": "",
+            "enableBasicAuth": False,
+            "enableBranchAutoBuild": True,
+            "environmentVariables": {f"VARIABLE_{j}": f"value-{j}-" + "x" * 40 for j in range(30)},
+            "name": f"app-{i}",
+            "platform": "WEB",
+            "repository": f"https://github.com/organization/app-{i}",
+            "buildSpec": BUILD_SPEC,
+            "customRules": [
+                {"source": f"/path-{j}/<*>", "target": "/index.html", "status": "404-200"} for j in range(20)
+            ],
+            "enableBranchAutoDeletion": False,
+            "iamServiceRoleArn": "",
+            "productionBranch": {"branchName": "main", "status": "SUCCEED", "lastDeployTime": "2024-03-02T00:00:00+00:00"},
+            "repositoryCloneMethod": "TOKEN",
+            "tags": {"team": "web"},
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    records = make_records(count)
+    schema = json.loads(SCHEMA_PATH.read_text())
+    selected = copy.deepcopy(schema)
+    for field in ("environmentVariables", "buildSpec", "customRules"):
+        selected["properties"].pop(field)
+
+    started = time.perf_counter()
+    projection = compile_projection(selected, keep=("appId",), full_schema=schema)
+    compiled = time.perf_counter() - started
+
+    # Records are discarded once written, so projected records are not kept alive while timing
+    started = time.perf_counter()
+    for record in records:
+        projection(record)
+    projecting = time.perf_counter() - started
+    projected = [projection(record) for record in records]
+
+    print(f"compile: {compiled * 1e3:.2f} ms, projection: {projecting / count * 1e6:.2f} us/record")
+    for name, batch in (("full", records), ("projected", projected)):
+        messages = [
+            AirbyteMessage(type=Type.RECORD, record=AirbyteRecordMessage(stream=STREAM, data=record, emitted_at=0))
+            for record in batch
+        ]
+        started = time.perf_counter()
+        for message in messages:
+            AirbyteEntrypoint.airbyte_message_to_string(message)
+        elapsed = time.perf_counter() - started
+        size = sum(len(AirbyteEntrypoint.airbyte_message_to_string(message)) for message in messages)
+        print(f"{name:>10}: {size / count:8.0f} bytes/record, serialized in {elapsed / count * 1e6:.2f} us/record")
+
+
+if __name__ == "__main__":
+    main()
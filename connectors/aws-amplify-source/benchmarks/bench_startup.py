@@ -0,0 +1,56 @@
+"""
+Cold-start benchmark of the connector commands.
+
+Runs each command in a fresh interpreter, the way the platform launches the connector, and reports
+the fastest and median wall-clock times. spec and discover run against a placeholder config;
+check only runs when a real config file is given, since it makes a request to AWS Amplify.
+
+Usage: python benchmarks/bench_startup.py [runs] [config.json]
+"""
+
+import json
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+CONNECTOR = Path(__file__).resolve().parent.parent
+
+PLACEHOLDER_CONFIG = {
+    "region": "us-east-1",
+    "auth_type": {"type": "auth_type_credentials", "access_key_id": "AKIAEXAMPLE", "secret_access_key": "secret"},
+}
+
+
+def time_command(args, runs: int):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "main.py", *args], cwd=CONNECTOR, stdout=subprocess.DEVNULL, check=False)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    config_path = sys.argv[2] if len(sys.argv) > 2 else None
+
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False) as placeholder:
+        json.dump(PLACEHOLDER_CONFIG, placeholder)
+
+    try:
+        commands = [("spec", ["spec"]), ("discover", ["discover", "--config", placeholder.name])]
+        if config_path:
+            commands.append(("check", ["check", "--config", config_path]))
+
+        for name, args in commands:
+            timings = time_command(args, runs)
+            print(f"{name:>8}: min {min(timings) * 1000:7.0f} ms, median {statistics.median(timings) * 1000:7.0f} ms over {runs} runs")
+    finally:
+        Path(placeholder.name).unlink(missing_ok=True)
+
+
+if __name__ == "__main__":
+    main()
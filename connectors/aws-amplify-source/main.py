@@ -2,9 +2,22 @@
 
 import sys
 
-from airbyte_cdk.entrypoint import launch
-from source_aws_amplify import SourceAwsAmplify
-
 if __name__ == "__main__":
-    source = SourceAwsAmplify()
-    launch(source, sys.argv[1:])
+    args = sys.argv[1:]
+    if args[:1] == ["spec"]:
+        # Served without importing the CDK, whose import dominates the start-up time of every command
+        from source_aws_amplify.spec import write_spec
+
+        write_spec(sys.stdout)
+    elif args[:1] == ["backfill"]:
+        # Local Parquet output for initial backfills, outside of the Airbyte protocol
+        from source_aws_amplify import SourceAwsAmplify
+        from source_aws_amplify.backfill import run_backfill
+
+        run_backfill(SourceAwsAmplify(), args[1:])
+    else:
+        from source_aws_amplify import SourceAwsAmplify
+        from source_aws_amplify.output import launch
+
+        source = SourceAwsAmplify()
+        launch(source, args)
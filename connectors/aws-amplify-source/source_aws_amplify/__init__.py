@@ -1,5 +1,12 @@
 
 
-from .source import SourceAwsAmplify
-
 __all__ = ["SourceAwsAmplify"]
+
+
+def __getattr__(name: str):
+    # The source is imported on first use, so that the spec command does not load the CDK
+    if name == "SourceAwsAmplify":
+        from .source import SourceAwsAmplify
+
+        return SourceAwsAmplify
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,13 +1,13 @@
 
 
-from typing import Any, Mapping, Optional
+from typing import TYPE_CHECKING, Any, Mapping, Optional
 
-import boto3
 import requests
 from airbyte_cdk.sources.streams.http.requests_native_auth.abstract_token import AbstractHeaderAuthenticator
 
-from botocore.auth import SigV4Auth
-from botocore.awsrequest import AWSRequest
+if TYPE_CHECKING:
+    # boto3 and botocore are only needed to sign requests, they are imported when the first one is
+    import boto3
 
 
 class AWSSigV4Authenticator(AbstractHeaderAuthenticator):
@@ -20,7 +20,7 @@ class AWSSigV4Authenticator(AbstractHeaderAuthenticator):
         self.region = region or "us-east-1"
         self.service_name = "amplify"
 
-    def get_session(self) -> boto3.Session:
+    def get_session(self) -> "boto3.Session":
         """
         To be implemented by subclasses to provide boto3 session.
         """
@@ -30,6 +30,9 @@ class AWSSigV4Authenticator(AbstractHeaderAuthenticator):
         """
         Sign the request using AWS SigV4.
         """
+        from botocore.auth import SigV4Auth
+        from botocore.awsrequest import AWSRequest
+
         session = self.get_session()
         credentials = session.get_credentials()
 
@@ -62,20 +65,29 @@ class AWSCredentialsAuthenticator(AWSSigV4Authenticator):
         super().__init__(region)
         self.access_key_id = access_key_id
         self.secret_access_key = secret_access_key
+        self._cached_session = None
 
-    def get_session(self) -> boto3.Session:
+    def get_session(self) -> "boto3.Session":
         """
         Create boto3 session with IAM credentials.
+        The session is cached since creating one costs more than signing a request;
+        credentials from the default chain are still refreshed by the session when they expire.
         """
+        if self._cached_session:
+            return self._cached_session
+
+        import boto3
+
         if self.access_key_id and self.secret_access_key:
-            return boto3.Session(
+            self._cached_session = boto3.Session(
                 region_name=self.region,
                 aws_access_key_id=self.access_key_id,
                 aws_secret_access_key=self.secret_access_key,
             )
         else:
             # Use default credentials (from environment, ~/.aws/credentials, or instance profile)
-            return boto3.Session(region_name=self.region)
+            self._cached_session = boto3.Session(region_name=self.region)
+        return self._cached_session
 
     @property
     def auth_header(self) -> str:
@@ -106,7 +118,7 @@ class AWSRoleAuthenticator(AWSSigV4Authenticator):
         self.secret_access_key = secret_access_key
         self._cached_session = None
 
-    def get_session(self) -> boto3.Session:
+    def get_session(self) -> "boto3.Session":
         """
         Create boto3 session by assuming an IAM role.
         The session is cached to avoid repeated assume_role calls.
@@ -114,6 +126,8 @@ class AWSRoleAuthenticator(AWSSigV4Authenticator):
         if self._cached_session:
             return self._cached_session
 
+        import boto3
+
         # Create initial session for STS client
         if self.access_key_id and self.secret_access_key:
             sts_session = boto3.Session(
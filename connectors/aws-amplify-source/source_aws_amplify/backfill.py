@@ -0,0 +1,329 @@
+import argparse
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+from airbyte_cdk.logger import init_logger
+from airbyte_cdk.models import (
+    AirbyteMessage,
+    AirbyteStateMessage,
+    AirbyteStateMessageSerializer,
+    AirbyteStreamStatus,
+    ConfiguredAirbyteCatalog,
+    ConfiguredAirbyteStream,
+    DestinationSyncMode,
+    SyncMode,
+    Type,
+)
+from airbyte_cdk.sources import AbstractSource
+
+from .projection import required_fields, selected_schema
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    # The backfill command is an operations tool: the connector itself does not need pyarrow
+    pa = None
+    pq = None
+
+# Records written to a Parquet row group at once
+BATCH_SIZE = 10_000
+
+# Name of the file holding the state of the backfill, in the format of the read command's --state
+STATE_FILE = "state.json"
+
+# Converts a record value to the Python value of its Arrow column
+Converter = Callable[[Any], Any]
+
+# Schema combinators whose alternatives are not merged: values under them are stored as JSON
+COMBINATORS = ("anyOf", "oneOf", "allOf")
+
+# Arrow types of the JSON scalars other than strings
+SCALAR_TYPES = {"integer": "int64", "number": "float64", "boolean": "bool_"}
+
+
+def _to_json(value: Any) -> Any:
+    return value if value is None else json.dumps(value, separators=(",", ":"), default=str)
+
+
+def _to_string(value: Any) -> Any:
+    return value if value is None or type(value) is str else _to_json(value)
+
+
+def arrow_column(schema: Any) -> Tuple["pa.DataType", Optional[Converter]]:
+    """
+    Map a JSON schema to an Arrow type, with the conversion its values need, if any.
+
+    Scalars map to Arrow scalars, objects with properties to structs and arrays to lists. Date-time
+    strings stay strings, as the APIs return them in several formats. Values without a single type
+    (free-form objects, combinators, mixed types) are stored as JSON strings.
+    """
+    if not isinstance(schema, Mapping) or any(combinator in schema for combinator in COMBINATORS):
+        return pa.string(), _to_json
+    types = schema.get("type")
+    types = [types] if isinstance(types, str) else [item for item in types or [] if item != "null"]
+    if len(types) != 1:
+        return pa.string(), _to_json
+    json_type = types[0]
+
+    if json_type == "string":
+        return pa.string(), _to_string
+    if json_type in SCALAR_TYPES:
+        return getattr(pa, SCALAR_TYPES[json_type])(), None
+
+    if json_type == "object":
+        properties = schema.get("properties")
+        if not isinstance(properties, Mapping) or not properties or schema.get("additionalProperties", False):
+            return pa.string(), _to_json
+        fields, converters = _arrow_fields(properties.items())
+        return pa.struct(fields), _object_converter(converters) if converters else None
+
+    if json_type == "array" and isinstance(schema.get("items"), Mapping):
+        item_type, item_converter = arrow_column(schema["items"])
+        if item_converter is None:
+            return pa.list_(item_type), None
+        return pa.list_(item_type), lambda value: value if value is None else [item_converter(item) for item in value]
+
+    return pa.string(), _to_json
+
+
+def _arrow_fields(properties) -> Tuple[List["pa.Field"], Dict[str, Converter]]:
+    fields = []
+    converters = {}
+    for name, subschema in properties:
+        arrow_type, converter = arrow_column(subschema)
+        fields.append(pa.field(name, arrow_type))
+        if converter is not None:
+            converters[name] = converter
+    return fields, converters
+
+
+def _object_converter(converters: Mapping[str, Converter]) -> Converter:
+    def convert(value: Any) -> Any:
+        if type(value) is not dict:
+            return value
+        value = dict(value)
+        for name, converter in converters.items():
+            if name in value:
+                value[name] = converter(value[name])
+        return value
+
+    return convert
+
+
+class StreamParts:
+    """
+    Parquet files of one stream, one per checkpoint of the stream.
+
+    A part collects the records emitted between two state messages, that is one slice or one
+    checkpoint interval of a long slice, in row groups of batch_size records. It is written under a
+    temporary name and only renamed once the state covering it is received, so that the parts on
+    disk always match the saved state: records of an interrupted part are read again on restart.
+    """
+
+    def __init__(self, directory: str, schema: Mapping[str, Any], keep: List[str], batch_size: int = BATCH_SIZE):
+        self.directory = directory
+        self.batch_size = batch_size
+        properties = dict(schema.get("properties") or {})
+        for name in keep:
+            properties.setdefault(name, {})
+        fields, self._converters = _arrow_fields(properties.items())
+        self.schema = pa.schema(fields)
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            if name.endswith(".parquet.tmp"):
+                # Left behind by an interrupted backfill; no state covers its records
+                os.remove(os.path.join(directory, name))
+        self._index = len([name for name in os.listdir(directory) if name.endswith(".parquet")])
+        self._rows: List[Mapping[str, Any]] = []
+        self._writer: Optional["pq.ParquetWriter"] = None
+        self._part_records = 0
+        self.records = 0
+        self.parts = 0
+
+    @property
+    def _path(self) -> str:
+        return os.path.join(self.directory, f"part-{self._index:05d}.parquet")
+
+    def add(self, record: Mapping[str, Any]) -> None:
+        if self._converters:
+            record = dict(record)
+            for name, converter in self._converters.items():
+                if name in record:
+                    record[name] = converter(record[name])
+        self._rows.append(record)
+        if len(self._rows) >= self.batch_size:
+            self._write_batch()
+
+    def _write_batch(self) -> None:
+        if not self._rows:
+            return
+        if self._writer is None:
+            self._writer = pq.ParquetWriter(self._path + ".tmp", self.schema, compression="zstd")
+        self._writer.write_table(pa.Table.from_pylist(self._rows, schema=self.schema))
+        self._part_records += len(self._rows)
+        self._rows = []
+
+    def checkpoint(self) -> None:
+        """Complete the current part, if it holds any record."""
+        self._write_batch()
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.replace(self._path + ".tmp", self._path)
+            self._index += 1
+            self.parts += 1
+            self.records += self._part_records
+            self._part_records = 0
+
+    def abort(self) -> None:
+        """Drop the records of the current part, which no state covers."""
+        self._rows = []
+        self._part_records = 0
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+            os.remove(self._path + ".tmp")
+
+
+class ParquetBackfill:
+    """
+    Reads streams of a source into local Parquet files instead of the Airbyte protocol.
+
+    The streams are read exactly as by the read command (same slicing, checkpointing and projection
+    onto the catalog), and their records are written to <output>/<stream>/part-NNNNN.parquet with the
+    Arrow schema derived from the stream's JSON schema. After every part, the state of the streams is
+    saved to <output>/state.json, which a regular sync can be started from, or the backfill resumed.
+    """
+
+    def __init__(
+        self,
+        source: AbstractSource,
+        config: Mapping[str, Any],
+        catalog: ConfiguredAirbyteCatalog,
+        state: List[AirbyteStateMessage],
+        directory: str,
+        batch_size: int = BATCH_SIZE,
+    ):
+        self.source = source
+        self.config = config
+        self.catalog = catalog
+        self.directory = directory
+        self.batch_size = batch_size
+        self.logger = init_logger("airbyte")
+        self._states: Dict[str, AirbyteStateMessage] = {
+            message.stream.stream_descriptor.name: message for message in state if message.stream
+        }
+        self._state = state
+        self._parts: Dict[str, StreamParts] = {}
+
+    def _stream_parts(self) -> Dict[str, StreamParts]:
+        streams = {stream.name: stream for stream in self.source.streams(self.config)}
+        return {
+            configured.stream.name: StreamParts(
+                os.path.join(self.directory, configured.stream.name),
+                selected_schema(streams[configured.stream.name], configured),
+                required_fields(streams[configured.stream.name], configured),
+                self.batch_size,
+            )
+            for configured in self.catalog.streams
+        }
+
+    def _save_state(self) -> None:
+        path = os.path.join(self.directory, STATE_FILE)
+        with open(path + ".tmp", "w") as state_file:
+            json.dump([AirbyteStateMessageSerializer.dump(message) for message in self._states.values()], state_file)
+        os.replace(path + ".tmp", path)
+
+    def _handle(self, message: AirbyteMessage) -> None:
+        if message.type == Type.RECORD:
+            self._parts[message.record.stream].add(message.record.data)
+        elif message.type == Type.STATE and message.state.stream:
+            name = message.state.stream.stream_descriptor.name
+            self._parts[name].checkpoint()
+            self._states[name] = message.state
+            self._save_state()
+        elif message.type == Type.TRACE and message.trace.stream_status:
+            if message.trace.stream_status.status == AirbyteStreamStatus.COMPLETE:
+                self._parts[message.trace.stream_status.stream_descriptor.name].checkpoint()
+        elif message.type == Type.LOG:
+            self.logger.info(message.log.message)
+
+    def run(self) -> Dict[str, int]:
+        """Run the backfill, returning the number of records written per stream."""
+        os.makedirs(self.directory, exist_ok=True)
+        self._parts = self._stream_parts()
+        started = time.perf_counter()
+        try:
+            for message in self.source.read(self.logger, self.config, self.catalog, self._state):
+                self._handle(message)
+        except BaseException:
+            for parts in self._parts.values():
+                parts.abort()
+            raise
+        for parts in self._parts.values():
+            parts.checkpoint()
+
+        elapsed = time.perf_counter() - started
+        for name, parts in self._parts.items():
+            self.logger.info(
+                f"Backfilled {parts.records} {name} records into {parts.parts} Parquet files "
+                f"in {elapsed:.1f}s ({parts.records / max(elapsed, 1e-9):,.0f} records/s)"
+            )
+        return {name: parts.records for name, parts in self._parts.items()}
+
+
+def backfill_catalog(
+    source: AbstractSource, config: Mapping[str, Any], streams: Optional[List[str]]
+) -> ConfiguredAirbyteCatalog:
+    """Catalog of the given streams (all by default), read incrementally where supported."""
+    discovered = source.discover(init_logger("airbyte"), config).streams
+    unknown = set(streams or []) - {stream.name for stream in discovered}
+    if unknown:
+        raise ValueError(f"Unknown streams: {', '.join(sorted(unknown))}")
+
+    configured = []
+    for stream in discovered:
+        if streams and stream.name not in streams:
+            continue
+        incremental = SyncMode.incremental in stream.supported_sync_modes
+        configured.append(
+            ConfiguredAirbyteStream(
+                stream=stream,
+                sync_mode=SyncMode.incremental if incremental else SyncMode.full_refresh,
+                destination_sync_mode=DestinationSyncMode.append,
+                cursor_field=stream.default_cursor_field if incremental else None,
+            )
+        )
+    return ConfiguredAirbyteCatalog(streams=configured)
+
+
+def run_backfill(source: AbstractSource, args: List[str]) -> None:
+    """Entry point of the backfill command: python main.py backfill --config ... --output-directory ..."""
+    parser = argparse.ArgumentParser(
+        prog="main.py backfill", description="Read streams into local Parquet files, for initial backfills."
+    )
+    parser.add_argument("--config", required=True, help="path to the connector configuration")
+    parser.add_argument("--output-directory", required=True, help="directory receiving the Parquet files and state")
+    parser.add_argument("--catalog", help="path to a configured catalog, instead of --streams")
+    parser.add_argument("--streams", help="comma-separated streams to read, all of them by default")
+    parser.add_argument("--state", help=f"state to start from, by default the {STATE_FILE} of the output directory")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="records per Parquet row group")
+    parsed = parser.parse_args(args)
+    if pa is None:
+        parser.error("the backfill command requires pyarrow: pip install pyarrow")
+
+    config = source.read_config(parsed.config)
+    if parsed.catalog:
+        catalog = source.read_catalog(parsed.catalog)
+    else:
+        catalog = backfill_catalog(source, config, parsed.streams.split(",") if parsed.streams else None)
+
+    state_path = parsed.state or os.path.join(parsed.output_directory, STATE_FILE)
+    state = source.read_state(state_path) if os.path.exists(state_path) else []
+    if state:
+        init_logger("airbyte").info(f"Starting from the state in {state_path}")
+
+    ParquetBackfill(source, config, catalog, state, parsed.output_directory, parsed.batch_size).run()
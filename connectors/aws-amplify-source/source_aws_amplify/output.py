@@ -0,0 +1,177 @@
+import argparse
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+import orjson
+from airbyte_cdk.entrypoint import AirbyteEntrypoint, launch as cdk_launch, logger as cdk_logger
+from airbyte_cdk.logger import PRINT_BUFFER, is_platform_debug_log_enabled
+from airbyte_cdk.models import AirbyteMessage, Type
+from airbyte_cdk.sources import Source
+from airbyte_cdk.utils.constants import ENV_REQUEST_CACHE_PATH
+
+# Environment switch enabling the buffered writer for the read command
+BUFFERED_OUTPUT_ENV = "CONNECTOR_BUFFERED_OUTPUT"
+
+# Records are written out once this many bytes are buffered, or at the latest this many seconds after the last write
+BUFFER_SIZE = 1 << 20
+FLUSH_INTERVAL_SECONDS = 1.0
+
+# Messages written out immediately, along with everything buffered before them
+FLUSHING_TYPES = (Type.STATE, Type.TRACE, Type.CONTROL)
+
+
+# Serialized record envelope around the data and emitted_at of each (stream, namespace)
+_RECORD_ENVELOPES: Dict[Tuple[str, Optional[str]], Tuple[bytes, bytes]] = {}
+
+
+def _record_envelope(stream: str, namespace: Optional[str]) -> Tuple[bytes, bytes]:
+    envelope = _RECORD_ENVELOPES.get((stream, namespace))
+    if envelope is None:
+        prefix = b'{"type":"RECORD","record":{"stream":' + orjson.dumps(stream) + b',"data":'
+        suffix = b"}}" if namespace is None else b',"namespace":' + orjson.dumps(namespace) + b"}}"
+        envelope = _RECORD_ENVELOPES[(stream, namespace)] = (prefix, suffix)
+    return envelope
+
+
+def serialize_message(message: AirbyteMessage) -> bytes:
+    """
+    Serialize a message exactly as AirbyteEntrypoint.airbyte_message_to_string does.
+
+    Only the data of a record is encoded, with orjson, and placed in an envelope serialized once
+    per stream; like the protocol serializer, null top-level data fields are left out. Records with
+    metadata, and records orjson cannot encode, go through the CDK, as do all other messages.
+    """
+    record = message.record
+    if message.type == Type.RECORD and record.meta is None and record.file_reference is None:
+        data = record.data
+        if None in data.values():
+            data = data.copy()
+            for key in [key for key, value in data.items() if value is None]:
+                del data[key]
+        try:
+            encoded = orjson.dumps(data)
+        except TypeError:
+            encoded = None
+        if encoded is not None and type(record.emitted_at) is int:
+            prefix, suffix = _record_envelope(record.stream, record.namespace)
+            return b'%s%s,"emitted_at":%d%s' % (prefix, encoded, record.emitted_at, suffix)
+    return AirbyteEntrypoint.airbyte_message_to_string(message).encode("utf-8")
+
+
+class BufferedMessageWriter:
+    """
+    Writes serialized messages to stdout in large batches instead of one print per message.
+
+    The buffer is written out when it reaches BUFFER_SIZE, when FLUSH_INTERVAL_SECONDS passed since
+    the last write, and with every state, trace or control message, so that the platform never
+    receives a state before the records it covers and checkpoints are not delayed. Log lines
+    buffered by the CDK are written out first, keeping both outputs in order at batch boundaries.
+
+    Used as a context manager, the writer also flushes from a timer thread, so that messages and
+    log lines do not wait in the buffer while the read produces nothing (a slow request, a backoff).
+    The buffer is shared with that thread under the lock of the CDK's PRINT_BUFFER.
+    """
+
+    def __init__(self, output: BinaryIO, buffer_size: int = BUFFER_SIZE, flush_interval: float = FLUSH_INTERVAL_SECONDS):
+        self.output = output
+        self.buffer_size = buffer_size
+        self.flush_interval = flush_interval
+        self._chunks: List[bytes] = []
+        self._size = 0
+        self._last_flush = time.monotonic()
+        self._stopped = threading.Event()
+        self._timer: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "BufferedMessageWriter":
+        self._stopped.clear()
+        self._timer = threading.Thread(target=self._flush_periodically, name="output-flush", daemon=True)
+        self._timer.start()
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self._stopped.set()
+        if self._timer is not None:
+            self._timer.join()
+            self._timer = None
+        self.flush()
+
+    def _flush_periodically(self) -> None:
+        """Flush whatever waited flush_interval since the last write, until the writer is closed."""
+        while not self._stopped.wait(max(0.0, self._last_flush + self.flush_interval - time.monotonic())):
+            if time.monotonic() - self._last_flush >= self.flush_interval:
+                self.flush()
+
+    def write(self, message: AirbyteMessage) -> None:
+        line = serialize_message(message) + b"\n"
+        with PRINT_BUFFER.lock:
+            self._chunks.append(line)
+            self._size += len(line)
+        if (
+            message.type in FLUSHING_TYPES
+            or self._size >= self.buffer_size
+            or time.monotonic() - self._last_flush >= self.flush_interval
+        ):
+            self.flush()
+
+    def flush(self) -> None:
+        with PRINT_BUFFER.lock:
+            PRINT_BUFFER.flush()
+            sys.__stdout__.flush()
+            if self._chunks:
+                self.output.write(b"".join(self._chunks))
+                self._chunks = []
+                self._size = 0
+            self.output.flush()
+            self._last_flush = time.monotonic()
+
+
+class BufferedEntrypoint(AirbyteEntrypoint):
+    """Entrypoint whose read command yields messages unserialized, for the BufferedMessageWriter to batch."""
+
+    def read_messages(self, parsed_args: argparse.Namespace) -> Iterable[AirbyteMessage]:
+        """The read branch of AirbyteEntrypoint.run, without the per-message serialization."""
+        if (hasattr(parsed_args, "debug") and parsed_args.debug) or is_platform_debug_log_enabled():
+            self.logger.setLevel(logging.DEBUG)
+            cdk_logger.setLevel(logging.DEBUG)
+            self.logger.debug("Debug logs enabled")
+        else:
+            self.logger.setLevel(logging.INFO)
+
+        source_spec = self.source.spec(self.logger)
+        try:
+            with tempfile.TemporaryDirectory(ignore_cleanup_errors=True) as temp_dir:
+                os.environ[ENV_REQUEST_CACHE_PATH] = temp_dir
+                raw_config = self.source.read_config(parsed_args.config)
+                config = self.source.configure(raw_config, temp_dir)
+                yield from self._emit_queued_messages(self.source)
+
+                config_catalog = self.source.read_catalog(parsed_args.catalog)
+                state = self.source.read_state(parsed_args.state)
+                yield from self.read(source_spec, config, config_catalog, state)
+        finally:
+            yield from self._emit_queued_messages(self.source)
+
+
+def buffered_output_enabled() -> bool:
+    return os.environ.get(BUFFERED_OUTPUT_ENV, "").lower() in ("1", "true", "yes")
+
+
+def launch(source: Source, args: List[str], output: Optional[BinaryIO] = None) -> None:
+    """
+    Run the connector like airbyte_cdk.entrypoint.launch, batching the output of the read command
+    when CONNECTOR_BUFFERED_OUTPUT is set. The other commands produce few messages and go through the CDK.
+    """
+    entrypoint = BufferedEntrypoint(source)
+    parsed_args = entrypoint.parse_args(args)
+    if parsed_args.command != "read" or not buffered_output_enabled():
+        cdk_launch(source, args)
+        return
+
+    with PRINT_BUFFER, BufferedMessageWriter(output or sys.__stdout__.buffer) as writer:
+        for message in entrypoint.read_messages(parsed_args):
+            writer.write(message)
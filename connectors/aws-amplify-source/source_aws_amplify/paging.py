@@ -0,0 +1,138 @@
+import bisect
+import logging
+import threading
+from typing import Optional, Union
+from urllib.parse import parse_qs, urlparse
+
+import requests
+from airbyte_cdk.sources.streams.http.error_handlers import ErrorHandler, ErrorResolution, HttpStatusErrorHandler
+
+# Page sizes the controller moves between, below the maximum of the endpoint. Round sizes keep the
+# page boundaries of two sizes aligned often, which page-numbered pagination needs to change size
+PAGE_SIZES = (5, 10, 20, 25, 50, 100)
+
+# Pages answered faster and smaller than this grow the size, once GROW_AFTER_PAGES full ones in a row were
+FAST_SECONDS = 1.0
+SMALL_PAYLOAD_BYTES = 1 << 20
+GROW_AFTER_PAGES = 3
+
+# Pages answered slower or larger than this are shrunk
+SLOW_SECONDS = 5.0
+LARGE_PAYLOAD_BYTES = 4 << 20
+
+# Responses telling that the server gave up on a request, as it does on pages too heavy to render in time
+TIMEOUT_STATUS_CODES = (408, 504)
+
+
+class PageSizer:
+    """
+    Chooses the page size of an endpoint from the latency and payload size of its responses.
+
+    Starting from the largest size the API accepts (or the size remembered from a previous sync),
+    a run of full pages answered quickly and with a small payload moves the size one step up
+    PAGE_SIZES, up to the maximum, while a slow or large page or a timeout at least halves it. Observations are made on
+    the size a page was requested with, so that pages fetched concurrently with an older size do not
+    undo each other's adjustments.
+    """
+
+    def __init__(self, name: str, maximum: int, logger: logging.Logger):
+        self.name = name
+        self.maximum = max(1, maximum)
+        self.sizes = [size for size in PAGE_SIZES if size < self.maximum] + [self.maximum]
+        self.logger = logger
+        self._lock = threading.Lock()
+        self._fast_pages = 0
+        self.size = self.maximum
+
+    def _larger(self, size: int) -> int:
+        """The step above size."""
+        return self.sizes[min(bisect.bisect_right(self.sizes, size), len(self.sizes) - 1)]
+
+    def _halved(self, size: int) -> int:
+        """The largest step at most half of size."""
+        return self.sizes[max(bisect.bisect_right(self.sizes, size // 2) - 1, 0)]
+
+    def restore(self, size: Optional[int]) -> None:
+        """Start from the size chosen in a previous sync, if any."""
+        if isinstance(size, int) and size > 0:
+            with self._lock:
+                self.size = self.sizes[max(bisect.bisect_right(self.sizes, size) - 1, 0)]
+
+    def observe(self, page_size: int, seconds: float, payload_bytes: int, full: bool) -> None:
+        """Account for a page requested with page_size, answered in seconds with payload_bytes."""
+        with self._lock:
+            previous = self.size
+            if seconds >= SLOW_SECONDS or payload_bytes >= LARGE_PAYLOAD_BYTES:
+                self.size = min(self.size, self._halved(page_size))
+                self._fast_pages = 0
+            elif full and seconds < FAST_SECONDS and payload_bytes < SMALL_PAYLOAD_BYTES and page_size >= self.size:
+                self._fast_pages += 1
+                if self._fast_pages >= GROW_AFTER_PAGES:
+                    self.size = self._larger(page_size)
+                    self._fast_pages = 0
+            size = self.size
+        if size != previous:
+            self.logger.info(
+                f"Page size of {self.name} changed from {previous} to {size} "
+                f"after a page of {page_size} taking {seconds:.1f}s and {payload_bytes} bytes"
+            )
+
+    def observe_response(self, response: requests.Response, parameter: str, records: int) -> None:
+        """Account for a page response, whose request carries its size in the given query parameter."""
+        try:
+            page_size = int(parse_qs(urlparse(response.request.url).query)[parameter][0])
+        except (AttributeError, KeyError, ValueError):
+            return
+        self.observe(page_size, response.elapsed.total_seconds(), len(response.content), records >= page_size)
+
+    def aligned(self, offset: int) -> Optional[int]:
+        """
+        The largest step between half the current size and the current size whose page boundaries
+        fall on offset, for pagination by page number to continue from there with that size.
+        """
+        size = self.size
+        for step in reversed(self.sizes):
+            if size // 2 <= step <= size and offset % step == 0:
+                return step
+        return None
+
+    def timed_out(self) -> None:
+        """Account for a request that timed out."""
+        with self._lock:
+            previous = self.size
+            self.size = self._halved(self.size)
+            self._fast_pages = 0
+            size = self.size
+        if size != previous:
+            self.logger.info(f"Page size of {self.name} lowered from {previous} to {size} after a timeout")
+
+
+class PageSizeErrorHandler(ErrorHandler):
+    """
+    Error handler shrinking the page size of a stream on timeouts, then deferring to the stream's
+    own error handling. The retry of the request that timed out is sent as it was; the next page
+    requested uses the smaller size.
+    """
+
+    def __init__(self, error_handler: Optional[ErrorHandler], page_sizer: PageSizer):
+        self.error_handler = error_handler or HttpStatusErrorHandler(page_sizer.logger)
+        self.page_sizer = page_sizer
+
+    @property
+    def max_retries(self) -> Optional[int]:
+        return self.error_handler.max_retries
+
+    @property
+    def max_time(self) -> Optional[int]:
+        return self.error_handler.max_time
+
+    def interpret_response(
+        self, response_or_exception: Optional[Union[requests.Response, Exception]] = None
+    ) -> ErrorResolution:
+        timed_out = isinstance(response_or_exception, requests.Timeout) or (
+            isinstance(response_or_exception, requests.Response)
+            and response_or_exception.status_code in TIMEOUT_STATUS_CODES
+        )
+        if timed_out:
+            self.page_sizer.timed_out()
+        return self.error_handler.interpret_response(response_or_exception)
@@ -0,0 +1,86 @@
+import queue
+import threading
+from typing import Any, Callable, Iterator, Mapping, Optional, Tuple
+
+import requests
+
+# Pages fetched ahead of the page whose records are being emitted
+DEFAULT_PREFETCH_PAGES = 2
+
+Page = Tuple[requests.PreparedRequest, requests.Response, Optional[Mapping[str, Any]]]
+
+
+def decoded(response: requests.Response) -> Any:
+    """The JSON body of a response, decoded once however many times it is read."""
+    body = getattr(response, "_decoded_json", None)
+    if body is None:
+        body = response.json()
+        response._decoded_json = body
+    return body
+
+
+def prefetch_pages(
+    fetch_page: Callable[[Optional[Mapping[str, Any]]], Tuple[requests.PreparedRequest, requests.Response]],
+    next_page_token: Callable[[requests.Response], Optional[Mapping[str, Any]]],
+    page_token: Optional[Mapping[str, Any]] = None,
+    depth: int = DEFAULT_PREFETCH_PAGES,
+    wrap_worker: Optional[Callable[[Callable[..., None]], Callable[..., None]]] = None,
+) -> Iterator[Page]:
+    """
+    Paginate from page_token, yielding each page's request, response and next page token in order.
+
+    With a depth, pages are fetched by a background thread as soon as the token of the previous one
+    is known, and handed over with their JSON body decoded through a queue of at most depth pages,
+    so that the next requests are in flight while the records of a page are emitted. Errors of the
+    background thread are raised where the page they concern would have been yielded. Stopping the
+    iteration early stops the thread once its request in flight is answered, without waiting for it.
+    wrap_worker wraps the function the thread runs, for instance to profile it.
+    Without a depth, pages are fetched one after the other as the iteration asks for them.
+    """
+    if depth <= 0:
+        while True:
+            request, response = fetch_page(page_token)
+            page_token = next_page_token(response)
+            yield request, response, page_token
+            if not page_token:
+                return
+
+    pages: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item: Tuple[Optional[Page], Optional[BaseException]]) -> None:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def fetch(token: Optional[Mapping[str, Any]]) -> None:
+        try:
+            while not stop.is_set():
+                request, response = fetch_page(token)
+                if stop.is_set():
+                    response.close()
+                    return
+                token = next_page_token(response)
+                decoded(response)
+                put(((request, response, token), None))
+                if not token:
+                    return
+        except Exception as e:
+            put((None, e))
+
+    target = wrap_worker(fetch) if wrap_worker else fetch
+    worker = threading.Thread(target=target, args=(page_token,), name="prefetch", daemon=True)
+    worker.start()
+    try:
+        while True:
+            page, error = pages.get()
+            if error is not None:
+                raise error
+            yield page
+            if not page[2]:
+                return
+    finally:
+        stop.set()
@@ -0,0 +1,310 @@
+import cProfile
+import inspect
+import io
+import json
+import os
+import pstats
+import re
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Sequence, Tuple
+
+from requests.auth import AuthBase
+
+# Environment switches, taking precedence over the profiling_directory and profile_slices config options
+DIRECTORY_ENV = "CONNECTOR_PROFILING_DIRECTORY"
+SLICES_ENV = "CONNECTOR_PROFILE_SLICES"
+
+# Number of hot functions and memory allocation sites reported
+TOP = 15
+
+
+class TimedAuth(AuthBase):
+    """Authenticator wrapper that times the signing of every request."""
+
+    def __init__(self, auth: AuthBase, profiler: "Profiler", section: str):
+        self.auth = auth
+        self.profiler = profiler
+        self.section = section
+
+    def __call__(self, request):
+        started = time.perf_counter()
+        try:
+            return self.auth(request)
+        finally:
+            self.profiler.record(self.section, time.perf_counter() - started)
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.auth, name)
+
+
+class Profiler:
+    """
+    Opt-in profiling of stream reads.
+
+    Each stream read runs under cProfile and tracemalloc, and with profile_slices each slice gets
+    its own profile as well. Section timers measure the hot paths of the connector (response
+    parsing, pagination, datetime conversion, SigV4 signing) without the overhead of cProfile's call accounting.
+    Results are written to one directory per stream:
+
+    - stream.prof: cProfile statistics of the whole read, slices included, for pstats or snakeviz
+    - slice-NNNN.prof: cProfile statistics of each slice, listed in slices.txt
+    - memory.txt: the largest allocation sites at the end of the read
+    - summary.txt: section timers and the functions with the most own time
+
+    and one summary of the whole sync, written to summary.txt and logged once the sync is over.
+
+    cProfile sees the thread reading the stream and the worker threads started through
+    profile_thread, whose profiles are added to the stream's (not to the slice's). Other worker
+    threads show up in the section timers only. The profiles also include the time spent by the
+    Airbyte entrypoint handling the records that the stream yields.
+    """
+
+    def __init__(self, directory: str, profile_slices: bool = False):
+        self.directory = directory
+        self.profile_slices = profile_slices
+        self._lock = threading.Lock()
+        self._stream: Optional[str] = None
+        self._sections: Dict[str, Dict[str, List[float]]] = {}
+        self._profile: Optional[cProfile.Profile] = None
+        # Profiles cannot be enabled together: the last one entered is the one collecting
+        self._active: List[cProfile.Profile] = []
+        self._slice_stats: Optional[pstats.Stats] = None
+        self._slices = 0
+        # Profiles of the worker threads of each stream, and the elapsed time and statistics of the streams read
+        self._thread_profiles: Dict[str, List[cProfile.Profile]] = {}
+        self._streams: List[Tuple[str, float, pstats.Stats]] = []
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> Optional["Profiler"]:
+        """Create the profiler enabled by the environment or the config, or None when profiling is off."""
+        directory = os.environ.get(DIRECTORY_ENV) or config.get("profiling_directory")
+        if not directory:
+            return None
+        profile_slices = os.environ.get(SLICES_ENV, "").lower() in ("1", "true", "yes") or bool(
+            config.get("profile_slices", False)
+        )
+        return cls(directory, profile_slices)
+
+    def record(self, section: str, seconds: float, calls: int = 1) -> None:
+        """Add a measurement to a section timer of the stream being read."""
+        with self._lock:
+            totals = self._sections.setdefault(self._stream or "", {}).setdefault(section, [0, 0.0])
+            totals[0] += calls
+            totals[1] += seconds
+
+    def instrument(self, instance: Any, sections: Mapping[str, str]) -> None:
+        """
+        Time the given methods of an instance, mapping method names to section names.
+        Methods returning generators are timed while they are being iterated.
+        """
+        for method_name, section in sections.items():
+            method = getattr(instance, method_name, None)
+            if method is not None:
+                setattr(instance, method_name, self.timed(method, section))
+
+    def timed(self, method: Callable[..., Any], section: str) -> Callable[..., Any]:
+        """Wrap a function so that its calls are recorded in a section timer."""
+        if inspect.isgeneratorfunction(method):
+
+            def timed_generator(*args, **kwargs):
+                started = time.perf_counter()
+                iterator = method(*args, **kwargs)
+                calls = 1
+                while True:
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        self.record(section, time.perf_counter() - started, calls)
+                        return
+                    self.record(section, time.perf_counter() - started, calls)
+                    calls = 0
+                    yield item
+                    started = time.perf_counter()
+
+            return timed_generator
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self.record(section, time.perf_counter() - started)
+
+        return timed
+
+    def timed_auth(self, auth: AuthBase, section: str) -> AuthBase:
+        """Wrap an authenticator so that the time spent signing requests is recorded."""
+        if isinstance(auth, TimedAuth):
+            return auth
+        return TimedAuth(auth, self, section)
+
+    def profile_thread(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        """
+        Wrap the function run by a worker thread of the stream being read, so that the thread is
+        profiled too. A thread still running when the stream's results are written is left out.
+        """
+        stream_name = self._stream
+        if stream_name is None:
+            return function
+
+        def profiled(*args, **kwargs):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+            except ValueError:
+                # Another profiler is active in this thread: the work is measured by the section timers only
+                return function(*args, **kwargs)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                profile.disable()
+                with self._lock:
+                    if stream_name in self._thread_profiles:
+                        self._thread_profiles[stream_name].append(profile)
+
+        return profiled
+
+    def _stream_directory(self, stream_name: str) -> str:
+        path = os.path.join(self.directory, re.sub(r"[^A-Za-z0-9_.-]", "_", stream_name))
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def profile_stream(self, stream_name: str, records: Iterable[Any]) -> Iterator[Any]:
+        """Profile the read of a stream, writing the results once it is over."""
+        self._stream = stream_name
+        self._sections[stream_name] = {}
+        with self._lock:
+            self._thread_profiles[stream_name] = []
+        self._profile = cProfile.Profile()
+        self._slice_stats = None
+        self._slices = 0
+        if self.profile_slices:
+            open(os.path.join(self._stream_directory(stream_name), "slices.txt"), "w").close()
+        started_tracing = not tracemalloc.is_tracing()
+        if started_tracing:
+            tracemalloc.start()
+        started = time.perf_counter()
+
+        self._active = [self._profile]
+        self._profile.enable()
+        try:
+            yield from records
+        finally:
+            self._profile.disable()
+            self._active = []
+            elapsed = time.perf_counter() - started
+            snapshot = tracemalloc.take_snapshot()
+            if started_tracing:
+                tracemalloc.stop()
+            self._write_stream(stream_name, elapsed, snapshot)
+            self._stream = None
+            self._profile = None
+            self._slice_stats = None
+
+    @contextmanager
+    def profile_slice(self, stream_slice: Optional[Mapping[str, Any]]) -> Iterator[None]:
+        """
+        Give a slice its own profile when profile_slices is enabled. The profile collecting until then
+        is paused for the duration of the slice; this includes parent partitions read by a substream
+        while it generates its slices.
+        """
+        if not self.profile_slices or not self._active:
+            yield
+            return
+
+        self._slices += 1
+        index = self._slices
+        profile = cProfile.Profile()
+        self._active[-1].disable()
+        self._active.append(profile)
+        profile.enable()
+        try:
+            yield
+        finally:
+            if profile in self._active:
+                # Disabling a profile stops whichever one is collecting, so only the last entered is switched
+                if self._active[-1] is profile:
+                    profile.disable()
+                    self._active.pop()
+                    self._active[-1].enable()
+                else:
+                    self._active.remove(profile)
+                directory = self._stream_directory(self._stream or "")
+                profile.dump_stats(os.path.join(directory, f"slice-{index:04d}.prof"))
+                with open(os.path.join(directory, "slices.txt"), "a") as slices_file:
+                    slices_file.write(f"slice-{index:04d}.prof {json.dumps(stream_slice, default=str)}\n")
+                if self._slice_stats is None:
+                    self._slice_stats = pstats.Stats(profile)
+                else:
+                    self._slice_stats.add(profile)
+
+    def _write_stream(self, stream_name: str, elapsed: float, snapshot: tracemalloc.Snapshot) -> None:
+        directory = self._stream_directory(stream_name)
+        stats = pstats.Stats(self._profile)
+        if self._slice_stats is not None:
+            stats.add(self._slice_stats)
+        with self._lock:
+            thread_profiles = self._thread_profiles.pop(stream_name, [])
+        for profile in thread_profiles:
+            stats.add(profile)
+        stats.dump_stats(os.path.join(directory, "stream.prof"))
+        self._streams.append((stream_name, elapsed, stats))
+
+        with open(os.path.join(directory, "memory.txt"), "w") as memory_file:
+            for statistic in snapshot.statistics("lineno")[:TOP]:
+                memory_file.write(f"{statistic}\n")
+
+        lines = [f"Profile of stream {stream_name}: {elapsed:.2f}s, results in {directory}"]
+        lines.extend(self._section_lines(stream_name, "  "))
+        lines.extend(self._hot_lines(stats))
+        with open(os.path.join(directory, "summary.txt"), "w") as summary_file:
+            summary_file.write("\n".join(lines) + "\n")
+
+    def _section_lines(self, stream_name: str, indent: str) -> List[str]:
+        return [
+            f"{indent}{section}: {seconds:.3f}s in {calls} calls"
+            for section, (calls, seconds) in sorted(
+                self._sections.get(stream_name, {}).items(), key=lambda item: item[1][1], reverse=True
+            )
+        ]
+
+    @staticmethod
+    def _hot_lines(stats: pstats.Stats) -> List[str]:
+        output = io.StringIO()
+        stats.stream = output
+        stats.sort_stats(pstats.SortKey.TIME).print_stats(TOP)
+        hot = [line for line in output.getvalue().splitlines() if re.match(r"\s*[\d/]+\s+\d+\.\d+", line)]
+        lines = [f"  top {len(hot)} functions by own time (ncalls tottime percall cumtime percall function):"]
+        lines.extend(f"    {line.strip()}" for line in hot)
+        return lines
+
+    def log_summary(self, logger: Any, unprofiled_threads: Sequence[str] = ()) -> None:
+        """
+        Log one summary of the streams read so far, their section timers and the functions with the
+        most own time across them, naming the worker threads left out of the profiles.
+        """
+        if not self._streams:
+            return
+        streams, self._streams = self._streams, []
+        lines = [
+            f"Profile of {len(streams)} streams: {sum(elapsed for _, elapsed, _ in streams):.2f}s, "
+            f"results in {self.directory}"
+        ]
+        for stream_name, elapsed, _ in streams:
+            lines.append(f"  {stream_name}: {elapsed:.2f}s")
+            lines.extend(self._section_lines(stream_name, "    "))
+        combined = pstats.Stats()
+        for _, _, stats in streams:
+            combined.add(stats)
+        lines.extend(self._hot_lines(combined))
+        if unprofiled_threads:
+            lines.append(f"  not profiled, in the section timers only: {', '.join(unprofiled_threads)} threads")
+
+        summary = "\n".join(lines)
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, "summary.txt"), "w") as summary_file:
+            summary_file.write(summary + "\n")
+        logger.info(summary)
@@ -0,0 +1,151 @@
+from typing import Any, Callable, FrozenSet, Iterable, Iterator, List, Mapping, Optional
+
+# Trims a record, or a value nested in one, to the fields selected by its schema
+Projection = Callable[[Any], Any]
+
+# Schema combinators whose alternatives are not merged: values under them are kept whole
+COMBINATORS = ("anyOf", "oneOf", "allOf")
+
+
+def compile_projection(
+    schema: Mapping[str, Any], keep: Iterable[str] = (), full_schema: Optional[Mapping[str, Any]] = None
+) -> Optional[Projection]:
+    """
+    Compile the schema of the selected fields into a function that drops the fields of a record it
+    does not select, keeping the given top-level fields (primary key, cursor) whatever the schema says.
+
+    An object loses the fields that full_schema, the schema they were selected from, declares and
+    schema does not. Fields neither declares are kept, unless schema sets additionalProperties to
+    false (it defaults to true), in which case objects are trimmed to their properties. Arrays of
+    objects are projected item by item; values under a combinator are kept whole.
+    Returns None when the schema cannot trim anything.
+
+    Values kept whole are shared with the source record, which is never modified.
+    """
+    return _compile_object(schema, full_schema, frozenset(keep))
+
+
+def _compile(schema: Any, full_schema: Any) -> Optional[Projection]:
+    """Compile the projection of a value described by the schema, or return None when it is kept whole."""
+    if not isinstance(schema, Mapping) or any(combinator in schema for combinator in COMBINATORS):
+        return None
+    if isinstance(schema.get("properties"), Mapping):
+        return _compile_object(schema, full_schema, frozenset())
+
+    items = _compile(schema.get("items"), full_schema.get("items") if isinstance(full_schema, Mapping) else None)
+    if items is None:
+        return None
+
+    def project_array(value: Any) -> Any:
+        return [items(item) for item in value] if type(value) is list else value
+
+    return project_array
+
+
+def _compile_object(schema: Mapping[str, Any], full_schema: Any, keep: FrozenSet[str]) -> Optional[Projection]:
+    properties = schema.get("properties")
+    if not isinstance(properties, Mapping):
+        return None
+    full_properties = full_schema.get("properties") if isinstance(full_schema, Mapping) else None
+    if not isinstance(full_properties, Mapping):
+        full_properties = {}
+    projections = {
+        name: projection
+        for name, subschema in properties.items()
+        if (projection := _compile(subschema, full_properties.get(name))) is not None
+    }
+
+    if schema.get("additionalProperties", True) is False:
+        fields = tuple((name, projections.get(name)) for name in {**properties, **dict.fromkeys(keep)})
+
+        def project_declared(value: Any) -> Any:
+            if type(value) is not dict:
+                return value
+            return {
+                name: value[name] if projection is None else projection(value[name])
+                for name, projection in fields
+                if name in value
+            }
+
+        return project_declared
+
+    dropped = frozenset(full_properties).difference(properties, keep)
+    if not dropped and not projections:
+        return None
+
+    def project_selected(value: Any) -> Any:
+        if type(value) is not dict:
+            return value
+        return {
+            name: field if (projection := projections.get(name)) is None else projection(field)
+            for name, field in value.items()
+            if name not in dropped
+        }
+
+    return project_selected
+
+
+def deselects_fields(schema: Any, full_schema: Any) -> bool:
+    """Whether the schema of the selected fields leaves out a field of the schema they were selected from."""
+    if not isinstance(schema, Mapping) or not isinstance(full_schema, Mapping):
+        return False
+    properties = schema.get("properties")
+    full_properties = full_schema.get("properties")
+    if isinstance(properties, Mapping) and isinstance(full_properties, Mapping):
+        if any(name not in properties for name in full_properties):
+            return True
+        if any(deselects_fields(subschema, full_properties.get(name)) for name, subschema in properties.items()):
+            return True
+    return deselects_fields(schema.get("items"), full_schema.get("items"))
+
+
+def key_fields(primary_key: Any) -> List[str]:
+    """Top-level fields of a primary key given as a field name, a list of names or a list of paths."""
+    if not primary_key:
+        return []
+    if isinstance(primary_key, str):
+        return [primary_key]
+    return [key if isinstance(key, str) else key[0] for key in primary_key if key]
+
+
+def cursor_fields(cursor_field: Any) -> List[str]:
+    """Top-level field of a cursor given as a field name or a path."""
+    if not cursor_field:
+        return []
+    return [cursor_field if isinstance(cursor_field, str) else cursor_field[0]]
+
+
+def selected_schema(stream: Any, configured_stream: Any) -> Mapping[str, Any]:
+    """
+    The schema of the fields selected for a stream: the one of its configured catalog entry, or the
+    bundled schema when the catalog does not declare any properties.
+    """
+    schema = configured_stream.stream.json_schema or {}
+    if not schema.get("properties"):
+        schema = stream.get_json_schema()
+    return schema
+
+
+def required_fields(stream: Any, configured_stream: Any) -> List[str]:
+    """Top-level fields that are kept whatever the catalog selects: primary key and cursor."""
+    keep = key_fields(stream.primary_key) + key_fields(configured_stream.primary_key)
+    keep += cursor_fields(stream.cursor_field) + cursor_fields(configured_stream.cursor_field)
+    return keep
+
+
+def stream_projection(stream: Any, configured_stream: Any) -> Optional[Projection]:
+    """
+    Compile the projection of a stream onto the fields selected by its configured catalog entry,
+    or return None when the catalog selects all the fields of the stream.
+    """
+    schema = selected_schema(stream, configured_stream)
+    full_schema = stream.get_json_schema()
+    if not deselects_fields(schema, full_schema):
+        return None
+    return compile_projection(schema, required_fields(stream, configured_stream), full_schema)
+
+
+def project_records(records: Iterable[Any], projection: Projection) -> Iterator[Any]:
+    """Apply a projection to the records read from a stream, passing other messages through."""
+    for record in records:
+        yield projection(record) if type(record) is dict else record
@@ -1,12 +1,24 @@
 
 
-from typing import Any, List, Mapping, Tuple
+from typing import Any, Iterator, List, Mapping, Optional, Tuple
 
+import requests
+from airbyte_cdk.models import AirbyteMessage, AirbyteStateMessage, ConfiguredAirbyteCatalog
 from airbyte_cdk.sources import AbstractSource
 from airbyte_cdk.sources.streams import Stream
 
 from .auth import get_authenticator
+from .hedging import HedgingAdapter
+from .prefetch import DEFAULT_PREFETCH_PAGES
+from .profiling import Profiler
 from .streams import AppsStream, BranchesStream, JobsStream
+from .transport import build_session
+
+# Seconds to wait for AWS Amplify to answer the check request
+CHECK_TIMEOUT_SECONDS = 30
+
+# Worker threads whose time shows up in the section timers of the profiling summary, but not in its profiles
+UNPROFILED_THREADS = ("hedged request",)
 
 
 class SourceAwsAmplify(AbstractSource):
@@ -22,9 +34,14 @@ class SourceAwsAmplify(AbstractSource):
     - jobs: Build and deployment jobs for each branch
     """
 
+    def __init__(self):
+        super().__init__()
+        self._hedging: Optional[HedgingAdapter] = None
+        self._profiler: Optional[Profiler] = None
+
     def check_connection(self, logger, config: Mapping[str, Any]) -> Tuple[bool, Any]:
         """
-        Test the connection to AWS Amplify by attempting to list apps.
+        Test the connection to AWS Amplify by requesting the first app of the listing.
 
         Args:
             logger: Airbyte logger instance (not used, we use print instead)
@@ -61,22 +78,32 @@ class SourceAwsAmplify(AbstractSource):
             authenticator = get_authenticator(config)
 
             # Create a temporary AppsStream to test the connection
-            apps_stream = AppsStream(region=region, authenticator=authenticator)
+            session = build_session(config, authenticator)
+            apps_stream = AppsStream(region=region, authenticator=authenticator, session=session)
 
-            # Try to read the first record
+            # Request a single app rather than paginating through all of them, under a time budget
             try:
-                records = list(apps_stream.read_records(sync_mode="full_refresh"))
-                # Successfully read records, connection is valid
-                if records:
-                    return True, None
-                else:
-                    # No apps found, but connection is still valid
-                    print("Connection successful, but no apps found in the specified region")
-                    return True, None
-            except (ConnectionError, TimeoutError, ValueError) as conn_error:
+                response = apps_stream.session.get(
+                    f"{apps_stream.url_base}{apps_stream.path()}",
+                    params={"maxResults": 1},
+                    timeout=CHECK_TIMEOUT_SECONDS,
+                )
+            except requests.exceptions.Timeout:
+                print(f"Connection error: no response within {CHECK_TIMEOUT_SECONDS} seconds")
+                return False, f"AWS Amplify did not respond within {CHECK_TIMEOUT_SECONDS} seconds"
+            except requests.exceptions.RequestException as conn_error:
                 print(f"Connection error: {str(conn_error)}")
                 return False, str(conn_error)
 
+            if response.status_code != 200:
+                print(f"Connection error: HTTP {response.status_code}")
+                return False, f"AWS Amplify returned HTTP {response.status_code}: {response.text[:500]}"
+
+            if not response.json().get("apps"):
+                # No apps found, but connection is still valid
+                print("Connection successful, but no apps found in the specified region")
+            return True, None
+
         except (ValueError, KeyError, TypeError) as e:
             print(f"Failed to connect to AWS Amplify: {str(e)}")
             return False, str(e)
@@ -93,13 +120,37 @@ class SourceAwsAmplify(AbstractSource):
         """
         region = config.get("region", "us-east-1")
         authenticator = get_authenticator(config)
+        checkpoint_interval_pages = config.get("checkpoint_interval_pages", 10)
+        prefetch_pages = int(config.get("prefetch_pages", DEFAULT_PREFETCH_PAGES))
+
+        # One connection pool shared by all streams, timing the signing of requests when profiling
+        self._profiler = Profiler.from_config(config)
+        profiler = self._profiler
+        if profiler:
+            authenticator = profiler.timed_auth(authenticator, "sigv4_signing")
+        session = build_session(config, authenticator)
+        adapter = session.get_adapter("https://")
+        self._hedging = adapter if isinstance(adapter, HedgingAdapter) else None
 
         # Create parent stream
-        apps_stream = AppsStream(region=region, authenticator=authenticator)
+        apps_stream = AppsStream(
+            region=region,
+            authenticator=authenticator,
+            checkpoint_interval_pages=checkpoint_interval_pages,
+            prefetch_pages=prefetch_pages,
+            session=session,
+            profiler=profiler,
+        )
 
         # Create substream for branches (depends on apps)
         branches_stream = BranchesStream(
-            parent_stream=apps_stream, region=region, authenticator=authenticator
+            parent_stream=apps_stream,
+            region=region,
+            authenticator=authenticator,
+            checkpoint_interval_pages=checkpoint_interval_pages,
+            prefetch_pages=prefetch_pages,
+            session=session,
+            profiler=profiler,
         )
 
         # Create substream for jobs (depends on both apps and branches)
@@ -107,6 +158,24 @@ class SourceAwsAmplify(AbstractSource):
             parent_streams={"apps": apps_stream, "branches": branches_stream},
             region=region,
             authenticator=authenticator,
+            checkpoint_interval_pages=checkpoint_interval_pages,
+            prefetch_pages=prefetch_pages,
+            session=session,
+            profiler=profiler,
         )
 
         return [apps_stream, branches_stream, jobs_stream]
+
+    def read(
+        self,
+        logger,
+        config: Mapping[str, Any],
+        catalog: ConfiguredAirbyteCatalog,
+        state: Optional[List[AirbyteStateMessage]] = None,
+    ) -> Iterator[AirbyteMessage]:
+        """Read the streams, then report hedging statistics and, when profiling, the profile of the sync."""
+        yield from super().read(logger, config, catalog, state)
+        if self._hedging is not None:
+            self._hedging.log_stats(logger)
+        if self._profiler is not None:
+            self._profiler.log_summary(logger, UNPROFILED_THREADS)
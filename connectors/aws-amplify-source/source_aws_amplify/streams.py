@@ -1,13 +1,55 @@
 
 
 from abc import ABC
-from typing import Any, Iterable, Mapping, MutableMapping, Optional, List
-from datetime import datetime
+from contextlib import nullcontext
+from typing import Any, Callable, Iterable, Mapping, MutableMapping, Optional, List, Tuple
 from urllib.parse import quote
 
 import requests
-from airbyte_cdk.sources.streams.http import HttpStream
+from airbyte_cdk.sources.message import InMemoryMessageRepository
+from airbyte_cdk.sources.streams.call_rate import APIBudget
+from airbyte_cdk.sources.streams.checkpoint import Cursor, ResumableFullRefreshCursor
+from airbyte_cdk.sources.streams.checkpoint.substream_resumable_full_refresh_cursor import (
+    SubstreamResumableFullRefreshCursor,
+)
+from airbyte_cdk.sources.streams.http import HttpClient, HttpStream
+from airbyte_cdk.sources.streams.http.error_handlers import ErrorHandler
 from airbyte_cdk.sources.streams.http.requests_native_auth.abstract_token import AbstractHeaderAuthenticator
+from airbyte_cdk.sources.types import StreamSlice
+
+from .paging import PageSizeErrorHandler, PageSizer
+from .prefetch import DEFAULT_PREFETCH_PAGES, decoded, prefetch_pages
+from .profiling import Profiler
+from .projection import project_records, stream_projection
+from .timestamps import transform_epoch_fields
+
+
+class SubstreamPaginationCursor(SubstreamResumableFullRefreshCursor):
+    """
+    Substream resumable full refresh cursor that also records the pagination position of the
+    partition in progress, so that an interrupted partition resumes from its last checkpointed page,
+    and the page size chosen for the stream, so that a new attempt starts from it.
+    """
+
+    def __init__(self, page_sizer: Optional[PageSizer] = None):
+        super().__init__()
+        self.page_sizer = page_sizer
+
+    def get_stream_state(self) -> MutableMapping[str, Any]:
+        state = super().get_stream_state()
+        if self.page_sizer and self.page_sizer.size != self.page_sizer.maximum:
+            state["page_size"] = self.page_sizer.size
+        return state
+
+    def set_initial_state(self, stream_state: Mapping[str, Any]) -> None:
+        super().set_initial_state(stream_state)
+        if stream_state and self.page_sizer:
+            self.page_sizer.restore(stream_state.get("page_size"))
+
+    def checkpoint_page(self, partition: Mapping[str, Any], cursor: Mapping[str, Any]) -> None:
+        """Record the pagination position of a partition, which select_state hands back on resume."""
+        # Partition states set as initial states replace the state of their partition only
+        super().set_initial_state({"states": [{"partition": partition, "cursor": cursor}]})
 
 
 class AmplifyStream(HttpStream, ABC):
@@ -17,26 +59,186 @@ class AmplifyStream(HttpStream, ABC):
     datetime transformation, and AWS-specific request handling.
     """
 
-    def __init__(self, region: str, authenticator: AbstractHeaderAuthenticator, **kwargs):
-        super().__init__(authenticator=authenticator, **kwargs)
+    # Epoch fields converted to ISO 8601, restricted per stream to the fields its records carry
+    datetime_fields: Tuple[str, ...] = ("createTime", "updateTime", "startTime", "endTime", "commitTime")
+
+    # Largest maxResults the endpoint accepts
+    max_page_size = 100
+
+    def __init__(
+        self,
+        region: str,
+        authenticator: AbstractHeaderAuthenticator,
+        checkpoint_interval_pages: int = 10,
+        prefetch_pages: int = DEFAULT_PREFETCH_PAGES,
+        session: Optional[requests.Session] = None,
+        profiler: Optional[Profiler] = None,
+        **kwargs,
+    ):
+        # Created first, the error handler built by HttpStream.__init__ lowers it on timeouts
+        self._page_sizer = PageSizer(self.name, self.max_page_size, self.logger)
+        if session is None:
+            session = requests.Session()
+            session.auth = authenticator
+        # The connector-wide connection pool, authenticated by build_session, unless the stream has a session of its own
+        self._session = session
+        self._init_http_stream(session, **kwargs)
         self.region = region
+        self.checkpoint_interval_pages = max(1, checkpoint_interval_pages)
+        self.prefetch_pages = max(0, prefetch_pages)
+        self._state_manager = None
+        self._profiler = profiler
+        if profiler:
+            profiler.instrument(
+                self,
+                {
+                    "_fetch_next_page": "fetch_page",
+                    "parse_response": "parse_response",
+                    "next_page_token": "next_page_token",
+                    "transform_datetime_fields": "datetime_conversion",
+                },
+            )
 
     @property
     def url_base(self) -> str:
         """Return the API base URL for AWS Amplify."""
         return f"https://amplify.{self.region}.amazonaws.com"
 
+    @property
+    def session(self) -> requests.Session:
+        """The authenticated session used by this stream, for requests made outside of pagination."""
+        return self._session
+
+    def _init_http_stream(self, session: requests.Session, api_budget: Optional[APIBudget] = None) -> None:
+        """
+        Initialize the stream as HttpStream.__init__ does, with an HTTP client sending its requests
+        through the given session, which already carries the authenticator, instead of a session
+        the CDK would create for the stream.
+        """
+        self._exit_on_rate_limit = False
+        self._http_client = HttpClient(
+            name=self.name,
+            logger=self.logger,
+            error_handler=self.get_error_handler(),
+            api_budget=api_budget or APIBudget(policies=[]),
+            session=session,
+            use_cache=self.use_cache,
+            backoff_strategy=self.get_backoff_strategy(),
+            message_repository=InMemoryMessageRepository(),
+        )
+        if not self.cursor and len(self.cursor_field) == 0 and type(self).read_records is HttpStream.read_records:
+            self.cursor = ResumableFullRefreshCursor()
+
+    def get_error_handler(self) -> Optional[ErrorHandler]:
+        """Shrink the page size when requests time out, on top of the default error handling."""
+        return PageSizeErrorHandler(super().get_error_handler(), self._page_sizer)
+
     def next_page_token(self, response: requests.Response) -> Optional[Mapping[str, Any]]:
         """
         Handle pagination using AWS Amplify's nextToken pattern.
         AWS Amplify APIs use cursor-based pagination with a nextToken field.
+        The page is measured to adapt maxResults, which the next request is sent with.
         """
-        json_response = response.json()
+        json_response = decoded(response)
+        self._page_sizer.observe_response(response, "maxResults", len(json_response.get(self.data_field, [])))
         next_token = json_response.get("nextToken")
         if next_token:
             return {"nextToken": next_token}
         return None
 
+    def get_cursor(self) -> Optional[Cursor]:
+        """
+        Substreams checkpoint their pagination position within a partition,
+        on top of marking completed partitions.
+        """
+        if self.has_multiple_slices and isinstance(self.cursor, ResumableFullRefreshCursor):
+            self.cursor = SubstreamPaginationCursor(self._page_sizer)
+        return self.cursor
+
+    def read(self, configured_stream, logger, slice_logger, stream_state, state_manager, internal_config):
+        """
+        Keep the state manager at hand so that long partitions can checkpoint their pagination,
+        and trim records to the fields of the configured catalog before they are serialized.
+        """
+        self._state_manager = state_manager
+        try:
+            records = super().read(configured_stream, logger, slice_logger, stream_state, state_manager, internal_config)
+            projection = stream_projection(self, configured_stream)
+            if projection:
+                records = project_records(records, projection)
+            if self._profiler:
+                yield from self._profiler.profile_stream(self.name, records)
+            else:
+                yield from records
+        finally:
+            self._state_manager = None
+
+    def profile_slice(self, stream_slice: Optional[Mapping[str, Any]]):
+        """Context in which a slice is read, profiled on its own when slice profiling is enabled."""
+        return self._profiler.profile_slice(stream_slice) if self._profiler else nullcontext()
+
+    def profile_thread(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        """A function run by a worker thread of the stream, profiled with the stream when profiling is enabled."""
+        return self._profiler.profile_thread(function) if self._profiler else function
+
+    def _read_pages(
+        self,
+        records_generator_fn: Callable[..., Iterable[Mapping[str, Any]]],
+        stream_slice: Optional[Mapping[str, Any]] = None,
+        stream_state: Optional[Mapping[str, Any]] = None,
+    ) -> Iterable[Any]:
+        """Read the pages of a partition, profiled on their own when slice profiling is enabled."""
+        with self.profile_slice(stream_slice):
+            yield from self._read_partition_pages(records_generator_fn, stream_slice, stream_state)
+
+    def _read_partition_pages(
+        self,
+        records_generator_fn: Callable[..., Iterable[Mapping[str, Any]]],
+        stream_slice: Optional[Mapping[str, Any]] = None,
+        stream_state: Optional[Mapping[str, Any]] = None,
+    ) -> Iterable[Any]:
+        """
+        Paginate through a partition, fetching the next prefetch_pages pages while the records of a
+        page are emitted. Substream partitions checkpoint the nextToken and the number of records
+        emitted every checkpoint_interval_pages pages, and a partition interrupted in a previous
+        attempt continues from its last checkpointed nextToken.
+        """
+        cursor = self.get_cursor()
+        checkpointing = isinstance(cursor, SubstreamPaginationCursor) and self._state_manager is not None
+
+        partition, cursor_slice, _ = self._extract_slice_fields(stream_slice=stream_slice)
+        stream_state = stream_state or {}
+        next_page_token = None
+        records = 0
+        if checkpointing and cursor_slice.get("nextToken"):
+            next_page_token = {"nextToken": cursor_slice["nextToken"]}
+            records = cursor_slice.get("records", 0)
+            self.logger.info(f"Resuming {self.name} partition {partition} after {records} records")
+
+        pages = 0
+        for request, response, next_page_token in prefetch_pages(
+            lambda page_token: self._fetch_next_page(stream_slice, stream_state, page_token),
+            self.next_page_token,
+            next_page_token,
+            self.prefetch_pages,
+            self.profile_thread,
+        ):
+            for record in records_generator_fn(request, response, stream_state, stream_slice):
+                records += 1
+                yield record
+
+            if not next_page_token:
+                break
+
+            pages += 1
+            if checkpointing and pages % self.checkpoint_interval_pages == 0:
+                cursor.checkpoint_page(partition, {**next_page_token, "records": records})
+                yield self._checkpoint_state(self.state, state_manager=self._state_manager)
+
+        if isinstance(cursor, SubstreamResumableFullRefreshCursor):
+            # Completed partitions are skipped by the next attempt
+            cursor.close_slice(StreamSlice(cursor_slice={}, partition=partition))
+
     def request_params(
         self,
         stream_state: Mapping[str, Any],
@@ -44,9 +246,10 @@ class AmplifyStream(HttpStream, ABC):
         next_page_token: Mapping[str, Any] = None,
     ) -> MutableMapping[str, Any]:
         """
-        Set request parameters including pagination token and maxResults.
+        Set request parameters including pagination token and maxResults, adapted to the
+        endpoint's responses within its limit.
         """
-        params = {"maxResults": 100}
+        params = {"maxResults": self._page_sizer.size}
         if next_page_token:
             params.update(next_page_token)
         return params
@@ -56,7 +259,7 @@ class AmplifyStream(HttpStream, ABC):
         Parse the response and transform datetime fields.
         Extracts records from the response using the data_field property.
         """
-        json_response = response.json()
+        json_response = decoded(response)
         records = json_response.get(self.data_field, [])
 
         for record in records:
@@ -65,30 +268,13 @@ class AmplifyStream(HttpStream, ABC):
 
     def transform_datetime_fields(self, record: Mapping[str, Any]) -> Mapping[str, Any]:
         """
-        Transform datetime fields from Unix timestamp to ISO 8601 format.
-        Handles fields like createTime, updateTime, startTime, endTime, commitTime.
+        Transform datetime fields from Unix timestamp to ISO 8601 UTC format.
+        Only the fields listed in the stream's datetime_fields are looked up.
 
         AWS Amplify returns timestamps as Unix epochs (seconds or milliseconds).
-        This method converts them to ISO 8601 format for consistency.
+        Values that cannot be converted are kept as they are.
         """
-        datetime_fields = ["createTime", "updateTime", "startTime", "endTime", "commitTime"]
-
-        for field in datetime_fields:
-            if field in record and record[field] is not None:
-                try:
-                    # Convert scientific notation to float
-                    timestamp = float(record[field])
-                    # Convert to seconds if in milliseconds
-                    if timestamp > 1e11:
-                        timestamp = timestamp / 1000
-                    # Convert to datetime string
-                    dt = datetime.fromtimestamp(timestamp)
-                    record[field] = dt.isoformat()
-                except (ValueError, TypeError):
-                    # If conversion fails, keep original value
-                    pass
-
-        return record
+        return transform_epoch_fields(record, self.datetime_fields)
 
 
 class AppsStream(AmplifyStream):
@@ -101,6 +287,7 @@ class AppsStream(AmplifyStream):
 
     primary_key = "appId"
     data_field = "apps"
+    datetime_fields = ("createTime", "updateTime")
 
     @property
     def name(self) -> str:
@@ -126,6 +313,8 @@ class BranchesStream(AmplifyStream):
 
     primary_key = "branchName"
     data_field = "branches"
+    datetime_fields = ("createTime", "updateTime")
+    max_page_size = 50
 
     @property
     def name(self) -> str:
@@ -144,20 +333,6 @@ class BranchesStream(AmplifyStream):
         app_id = stream_slice["app_id"]
         return f"/apps/{app_id}/branches"
 
-    def request_params(
-        self,
-        stream_state: Mapping[str, Any],
-        stream_slice: Mapping[str, Any] = None,
-        next_page_token: Mapping[str, Any] = None,
-    ) -> MutableMapping[str, Any]:
-        """
-        Set request parameters with a lower maxResults for branches.
-        """
-        params = {"maxResults": 50}
-        if next_page_token:
-            params.update(next_page_token)
-        return params
-
     def stream_slices(
         self, sync_mode, cursor_field: List[str] = None, stream_state: Mapping[str, Any] = None
     ) -> Iterable[Optional[Mapping[str, Any]]]:
@@ -180,6 +355,8 @@ class JobsStream(AmplifyStream):
 
     primary_key = "jobId"
     data_field = "jobSummaries"
+    datetime_fields = ("startTime", "endTime", "commitTime")
+    max_page_size = 50
 
     @property
     def name(self) -> str:
@@ -202,20 +379,6 @@ class JobsStream(AmplifyStream):
         encoded_branch = quote(branch_name, safe="")
         return f"/apps/{app_id}/branches/{encoded_branch}/jobs"
 
-    def request_params(
-        self,
-        stream_state: Mapping[str, Any],
-        stream_slice: Mapping[str, Any] = None,
-        next_page_token: Mapping[str, Any] = None,
-    ) -> MutableMapping[str, Any]:
-        """
-        Set request parameters with a lower maxResults for jobs.
-        """
-        params = {"maxResults": 50}
-        if next_page_token:
-            params.update(next_page_token)
-        return params
-
     def stream_slices(
         self, sync_mode, cursor_field: List[str] = None, stream_state: Mapping[str, Any] = None
     ) -> Iterable[Optional[Mapping[str, Any]]]:
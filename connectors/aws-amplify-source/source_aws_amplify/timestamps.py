@@ -0,0 +1,59 @@
+import math
+from datetime import datetime, timezone
+from typing import Any, Dict, MutableMapping, Tuple
+
+_UTC = timezone.utc
+_fromtimestamp = datetime.fromtimestamp
+_modf = math.modf
+
+# ISO 8601 prefix (up to the seconds) of the minutes converted recently, by minutes since the epoch:
+# records of a page tend to share their minutes, and formatting the seconds is cheaper than a datetime
+_MINUTE_PREFIXES: Dict[int, str] = {}
+_MAX_MINUTE_PREFIXES = 4096
+
+
+def _epoch_to_iso(timestamp: float) -> str:
+    """
+    Format an epoch in seconds as datetime.fromtimestamp(timestamp, timezone.utc).isoformat() does,
+    rounding to microseconds half to even, with the date, hour and minute taken from a cache.
+    """
+    fraction, whole = _modf(timestamp)
+    microseconds = 0
+    if fraction:
+        microseconds = round(fraction * 1e6)
+        if microseconds >= 1_000_000:
+            whole += 1
+            microseconds -= 1_000_000
+        elif microseconds < 0:
+            whole -= 1
+            microseconds += 1_000_000
+    minute, second = divmod(int(whole), 60)
+    prefix = _MINUTE_PREFIXES.get(minute)
+    if prefix is None:
+        if len(_MINUTE_PREFIXES) >= _MAX_MINUTE_PREFIXES:
+            _MINUTE_PREFIXES.clear()
+        prefix = _MINUTE_PREFIXES[minute] = _fromtimestamp(minute * 60, _UTC).isoformat()[:17]
+    if microseconds:
+        return f"{prefix}{second:02d}.{microseconds:06d}+00:00"
+    return f"{prefix}{second:02d}+00:00"
+
+
+def transform_epoch_fields(record: MutableMapping[str, Any], fields: Tuple[str, ...]) -> MutableMapping[str, Any]:
+    """
+    Convert the given epoch fields of a record (seconds or milliseconds, possibly in scientific
+    notation) in place to ISO 8601 UTC timestamps, skipping missing and null values and leaving
+    values that are not epochs unchanged.
+    """
+    for field in fields:
+        value = record.get(field)
+        if value is None:
+            continue
+        try:
+            timestamp = float(value)
+            # Convert to seconds if in milliseconds
+            if timestamp > 1e11:
+                timestamp /= 1000
+            record[field] = _epoch_to_iso(timestamp)
+        except (TypeError, ValueError, OverflowError, OSError):
+            pass
+    return record
@@ -0,0 +1,56 @@
+from typing import Any, Mapping
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+
+from .hedging import DEFAULT_PERCENTILE, MAX_CONCURRENT_HEDGES, HedgingAdapter
+from .prefetch import DEFAULT_PREFETCH_PAGES
+
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    # urllib3 only decodes brotli responses when a brotli package is installed
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Paginations read at once: the apps, the branches of an app and the jobs of a branch
+NESTED_PAGINATIONS = 3
+
+
+def pool_size(prefetch_pages: int) -> int:
+    """
+    Connections the streams use at once: one request in flight per nested pagination, sent by its
+    prefetch thread when pages are prefetched. A prefetch thread stopped early may still have its
+    last request in flight while the pagination that replaced it sends its own, hence twice as
+    many connections when prefetching.
+    """
+    return NESTED_PAGINATIONS * (2 if prefetch_pages > 0 else 1)
+
+
+def build_session(config: Mapping[str, Any], authenticator: AuthBase) -> requests.Session:
+    """
+    Create the HTTP session shared by every stream of the connector, signing requests with the authenticator.
+
+    All requests go through one keep-alive connection pool per host, sized to the requests the
+    configured prefetch_pages sends at once, so that the connection to the regional Amplify
+    endpoint (and the DNS lookup and TLS handshake that opened it) is reused across streams and
+    partitions instead of being set up again by each stream.
+    With hedge_requests, slow GETs are hedged, the pool keeping room for the hedges in flight.
+    """
+    size = pool_size(int(config.get("prefetch_pages", DEFAULT_PREFETCH_PAGES)))
+    session = requests.Session()
+    session.auth = authenticator
+    if config.get("hedge_requests"):
+        adapter = HedgingAdapter(
+            percentile=float(config.get("hedge_percentile") or DEFAULT_PERCENTILE),
+            pool_connections=1,
+            pool_maxsize=size + MAX_CONCURRENT_HEDGES,
+            pool_block=True,
+        )
+    else:
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=size, pool_block=True)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"})
+    return session
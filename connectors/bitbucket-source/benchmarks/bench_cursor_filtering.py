@@ -0,0 +1,71 @@
+"""
+Micro-benchmark of the client-side cursor filtering done by IncrementalBitbucketStream.parse_response.
+
+Compares parsing every cursor with datetime.fromisoformat against comparing UTC cursors as
+strings with the normalized start bound, normalizing only the values that move the cursor.
+
+Usage: python benchmarks/bench_cursor_filtering.py [number_of_records]
+"""
+
+import sys
+import timeit
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from source_bitbucket.timestamps import comparable_timestamp, normalize_timestamp  # noqa: E402
+
+
+def make_cursors(count: int):
+    # Newest first, as returned by the API
+    base = datetime(2022, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=count)
+    formats = [
+        lambda dt: dt.isoformat(),  # commits: 2022-01-01T00:00:00+00:00
+        lambda dt: dt.strftime("%Y-%m-%dT%H:%M:%S.%f+00:00"),  # pull requests
+        lambda dt: dt.strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z",  # deployments
+    ]
+    return [formats[i % 3](base - timedelta(minutes=i)) for i in range(count)]
+
+
+def filter_with_datetime(cursors, start_date):
+    start_dt = datetime.fromisoformat(start_date.replace("Z", "+00:00"))
+    latest = None
+    kept = 0
+    for cursor_value in cursors:
+        record_dt = datetime.fromisoformat(cursor_value.replace("Z", "+00:00"))
+        if record_dt >= start_dt:
+            if not latest or cursor_value > latest:
+                latest = cursor_value
+            kept += 1
+    return kept
+
+
+def filter_with_comparable_strings(cursors, start_date):
+    start_bound = normalize_timestamp(start_date)[:19]
+    latest = None
+    kept = 0
+    for cursor_value in cursors:
+        comparable = comparable_timestamp(cursor_value)
+        if comparable >= start_bound:
+            if not latest or comparable > latest:
+                normalized = normalize_timestamp(comparable)
+                if not latest or normalized > latest:
+                    latest = normalized
+            kept += 1
+    return kept
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    cursors = make_cursors(count)
+    start_date = "2022-03-01T00:00:00Z"
+    assert filter_with_datetime(cursors, start_date) == filter_with_comparable_strings(cursors, start_date)
+
+    for name, function in (("datetime", filter_with_datetime), ("strings", filter_with_comparable_strings)):
+        seconds = min(timeit.repeat(lambda: function(cursors, start_date), number=1, repeat=5))
+        print(f"{name:>10}: {seconds * 1000:8.1f} ms for {count} records ({count / seconds:,.0f} records/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Benchmark of writing record messages to stdout, in messages per second.
+
+Compares the CDK entrypoint, which serializes every message through the protocol serializer and
+prints it on its own, with the BufferedMessageWriter used when CONNECTOR_BUFFERED_OUTPUT is set.
+Output goes to os.devnull; both paths are first checked to produce identical bytes.
+
+Usage: python benchmarks/bench_output.py [number_of_messages]
+"""
+
+import os
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from airbyte_cdk.entrypoint import AirbyteEntrypoint  # noqa: E402
+from airbyte_cdk.logger import PRINT_BUFFER  # noqa: E402
+from airbyte_cdk.models import AirbyteMessage, AirbyteRecordMessage, Type  # noqa: E402
+
+from source_bitbucket.output import BufferedMessageWriter, serialize_message  # noqa: E402
+
+
+def make_messages(count: int):
+    return [
+        AirbyteMessage(
+            type=Type.RECORD,
+            record=AirbyteRecordMessage(
+                stream="commits",
+                data={
+                    "hash": f"{i:040x}",
+                    "date": "2024-03-01T00:00:00+00:00",
+                    "message": f"Fix issue #{i}\n\nLonger description of the change.",
+                    "author": {"raw": "Jane Doe <jane@example.com>", "user": {"uuid": "{1234}", "display_name": "Jane"}},
+                    "parents": [{"hash": f"{i - 1:040x}"}],
+                    "repository": "workspace/repository",
+                    "summary": None,
+                    "cursor_at": "2024-03-01T00:00:00+00:00",
+                },
+                emitted_at=1700000000000 + i,
+            ),
+        )
+        for i in range(count)
+    ]
+
+
+def write_with_cdk(messages, output) -> None:
+    """What airbyte_cdk.entrypoint.launch does: one print per message, through the CDK's PrintBuffer."""
+    with PRINT_BUFFER:
+        for message in messages:
+            print(f"{AirbyteEntrypoint.airbyte_message_to_string(message)}\n", end="")
+
+
+def write_buffered(messages, output) -> None:
+    writer = BufferedMessageWriter(output.buffer)
+    for message in messages:
+        writer.write(message)
+    writer.flush()
+
+
+WRITERS = (("cdk", write_with_cdk), ("buffered", write_buffered))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    messages = make_messages(count)
+
+    for message in messages[:1000]:
+        assert serialize_message(message) == AirbyteEntrypoint.airbyte_message_to_string(message).encode()
+
+    stdout = sys.__stdout__
+    with open(os.devnull, "w") as output:
+        # Both paths write to sys.__stdout__, which is pointed at os.devnull while they run
+        sys.__stdout__ = output
+        try:
+            results = [(name, min(_time(function, messages, output) for _ in range(3))) for name, function in WRITERS]
+        finally:
+            sys.__stdout__ = stdout
+    for name, best in results:
+        print(f"{name:>9}: {best * 1000:8.1f} ms for {count} messages ({count / best:,.0f} messages/s)")
+
+
+def _time(function, messages, output) -> float:
+    started = time.perf_counter()
+    function(messages, output)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+Benchmark of the projection trimming records to the configured catalog before serialization.
+
+Pull request records carry a links tree at every level (repository, branches, users); the catalog
+used here deselects the top-level links, as most of our catalogs do. Reports the cost of projecting
+each record, and the size and serialization time of record messages with and without projection.
+
+Usage: python benchmarks/bench_projection.py [number_of_records]
+"""
+
+import copy
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from airbyte_cdk.entrypoint import AirbyteEntrypoint  # noqa: E402
+from airbyte_cdk.models import AirbyteMessage, AirbyteRecordMessage, Type  # noqa: E402
+
+from source_bitbucket.projection import compile_projection  # noqa: E402
+
+STREAM = "pull_requests"
+SCHEMA_PATH = Path(__file__).resolve().parent.parent / "source_bitbucket" / "schemas" / f"{STREAM}.json"
+
+
+def links(*names: str):
+    return {name: {"href": f"https://api.bitbucket.org/2.0/repositories/workspace/repository/{name}"} for name in names}
+
+
+def user(index: int):
+    return {
+        "display_name": f"User {index}",
+        "uuid": f"{{{index:08x}-0000-0000-0000-000000000000}}",
+        "account_id": f"5f{index:020x}",
+        "nickname": f"user{index}",
+        "type": "user",
+        "links": links("self", "avatar", "html"),
+    }
+
+
+def branch(name: str):
+    return {
+        "branch": {"name": name},
+        "commit": {"hash": "0123456789ab", "type": "commit", "links": links("self", "html")},
+        "repository": {"full_name": "workspace/repository", "name": "repository", "type": "repository",
+                       "uuid": "{repository}", "links": links("self", "html", "avatar")},
+    }
+
+
+def make_records(count: int):
+    return [
+        {
+            "id": i,
+            "title": f"Fix issue #{i}",
+            "description": "Longer description of the change. " * 4,
+            "state": "MERGED",
+            "created_on": "2024-03-01T00:00:00.000000+00:00",
+            "updated_on": "2024-03-02T00:00:00.000000+00:00",
+            "close_source_branch": True,
+            "comment_count": 3,
+            "task_count": 0,
+            "author": user(i),
+            "source": branch(f"feature/{i}"),
+            "destination": branch("main"),
+            "reviewers": [user(i + 1), user(i + 2)],
+            "participants": [{"user": user(i + 1), "role": "REVIEWER", "approved": True, "type": "participant"}],
+            "links": links("self", "html", "commits", "approve", "diff", "diffstat", "comments", "activity",
+                           "merge", "decline", "statuses"),
+            "summary": {"raw": "Longer description", "markup": "markdown", "html": "<p>Longer description</p>"},
+            "type": "pullrequest",
+            "cursor_at": "2024-03-02T00:00:00.000000+00:00",
+        }
+        for i in range(count)
+    ]
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50_000
+    records = make_records(count)
+    schema = json.loads(SCHEMA_PATH.read_text())
+    selected = copy.deepcopy(schema)
+    selected["properties"].pop("links")
+
+    started = time.perf_counter()
+    projection = compile_projection(selected, keep=("id", "cursor_at"), full_schema=schema)
+    compiled = time.perf_counter() - started
+
+    # Records are discarded once written, so projected records are not kept alive while timing
+    started = time.perf_counter()
+    for record in records:
+        projection(record)
+    projecting = time.perf_counter() - started
+    projected = [projection(record) for record in records]
+
+    print(f"compile: {compiled * 1e3:.2f} ms, projection: {projecting / count * 1e6:.2f} us/record")
+    for name, batch in (("full", records), ("projected", projected)):
+        messages = [
+            AirbyteMessage(type=Type.RECORD, record=AirbyteRecordMessage(stream=STREAM, data=record, emitted_at=0))
+            for record in batch
+        ]
+        started = time.perf_counter()
+        for message in messages:
+            AirbyteEntrypoint.airbyte_message_to_string(message)
+        elapsed = time.perf_counter() - started
+        size = sum(len(AirbyteEntrypoint.airbyte_message_to_string(message)) for message in messages)
+        print(f"{name:>10}: {size / count:8.0f} bytes/record, serialized in {elapsed / count * 1e6:.2f} us/record")
+
+
+if __name__ == "__main__":
+    main()
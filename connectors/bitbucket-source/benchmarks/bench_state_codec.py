@@ -0,0 +1,83 @@
+"""
+Benchmark of the checkpoint cost and size of the state of a repository substream.
+
+For growing numbers of repositories, checkpoints the state once per completed slice, as a sync
+does, and compares serializing the plain state with serializing the compact state of StateCodec,
+which only re-encodes the chunks of the repositories touched since the previous checkpoint.
+Reports the mean time of a checkpoint, the size of the serialized state, and the time of the
+first (full) compact encoding.
+
+Usage: python benchmarks/bench_state_codec.py [checkpoints] [repository counts...]
+"""
+
+import json
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from source_bitbucket.state_codec import StateCodec  # noqa: E402
+
+FIELDS = ("repositories", "slice_stats", "failed_slices")
+
+
+def make_state(count: int):
+    repositories = [f"workspace/repository-{index:06d}" for index in range(count)]
+    return {
+        "cursor_at": "2024-06-01T00:00:00.000000Z",
+        "last_full_scan": "2024-05-28T00:00:00.000000Z",
+        "repositories": {name: f"2024-05-{index % 28 + 1:02d}T12:34:56.789012+00:00" for index, name in enumerate(repositories)},
+        "slice_stats": {name: {"seconds": round(index % 97 * 0.37, 3), "pages": index % 13 + 1} for index, name in enumerate(repositories)},
+    }, repositories
+
+
+def complete_slice(state, repository: str, checkpoint: int) -> None:
+    state["repositories"][repository] = f"2024-06-{checkpoint % 28 + 1:02d}T00:00:00.000000+00:00"
+    state["slice_stats"][repository] = {"seconds": 1.5, "pages": checkpoint % 7 + 1}
+    state["cursor_at"] = f"2024-06-{checkpoint % 28 + 1:02d}T00:00:00.000000Z"
+
+
+def run(count: int, checkpoints: int):
+    plain, repositories = make_state(count)
+    started = time.perf_counter()
+    for checkpoint in range(checkpoints):
+        complete_slice(plain, repositories[checkpoint * 7919 % count], checkpoint)
+        serialized = json.dumps(plain)
+    plain_seconds = (time.perf_counter() - started) / checkpoints
+    plain_size = len(serialized)
+
+    state, repositories = make_state(count)
+    codec = StateCodec(FIELDS, min_repositories=1)
+    started = time.perf_counter()
+    json.dumps(codec.encode(state))
+    first_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    for checkpoint in range(checkpoints):
+        repository = repositories[checkpoint * 7919 % count]
+        complete_slice(state, repository, checkpoint)
+        codec.touch(repository)
+        serialized = json.dumps(codec.encode(state))
+    compact_seconds = (time.perf_counter() - started) / checkpoints
+    compact_size = len(serialized)
+
+    # The checkpoints encoded incrementally decode to the plain state
+    decoded = StateCodec(FIELDS).decode(json.loads(serialized))
+    assert decoded == plain, "compact state does not round-trip"
+    return plain_seconds, plain_size, compact_seconds, compact_size, first_seconds
+
+
+def main():
+    checkpoints = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    counts = [int(count) for count in sys.argv[2:]] or [100, 1_000, 5_000, 20_000]
+    print(f"{'repositories':>12} {'plain ms':>9} {'plain KB':>9} {'compact ms':>11} {'compact KB':>11} {'first ms':>9}")
+    for count in counts:
+        plain_seconds, plain_size, compact_seconds, compact_size, first_seconds = run(count, checkpoints)
+        print(
+            f"{count:>12} {plain_seconds * 1000:>9.2f} {plain_size / 1024:>9.0f} "
+            f"{compact_seconds * 1000:>11.2f} {compact_size / 1024:>11.0f} {first_seconds * 1000:>9.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -2,9 +2,34 @@
 
 import sys
 
-from airbyte_cdk.entrypoint import launch
-from source_bitbucket import SourceBitbucket
-
 if __name__ == "__main__":
-    source = SourceBitbucket()
-    launch(source, sys.argv[1:])
+    args = sys.argv[1:]
+    if args[:1] == ["spec"]:
+        # Served without importing the CDK, whose import dominates the start-up time of every command
+        from source_bitbucket.spec import write_spec
+
+        write_spec(sys.stdout)
+    elif args[:1] == ["backfill"]:
+        # Local Parquet output for initial backfills, outside of the Airbyte protocol
+        from source_bitbucket import SourceBitbucket
+        from source_bitbucket.backfill import run_backfill
+
+        run_backfill(SourceBitbucket(), args[1:])
+    elif args[:1] == ["plan"]:
+        # Estimate of the requests and duration of a sync, from the statistics saved in its state
+        from source_bitbucket import SourceBitbucket
+        from source_bitbucket.plan import run_plan
+
+        run_plan(SourceBitbucket(), args[1:])
+    elif args[:1] == ["events"]:
+        # Webhook receiver queueing the repositories that event-driven syncs read
+        from source_bitbucket import SourceBitbucket
+        from source_bitbucket.events import run_receiver
+
+        run_receiver(SourceBitbucket(), args[1:])
+    else:
+        from source_bitbucket import SourceBitbucket
+        from source_bitbucket.output import launch
+
+        source = SourceBitbucket()
+        launch(source, args)
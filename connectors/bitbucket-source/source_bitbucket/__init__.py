@@ -1,5 +1,12 @@
 
 
-from .source import SourceBitbucket
-
 __all__ = ["SourceBitbucket"]
+
+
+def __getattr__(name: str):
+    # The source is imported on first use, so that the spec command does not load the CDK
+    if name == "SourceBitbucket":
+        from .source import SourceBitbucket
+
+        return SourceBitbucket
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
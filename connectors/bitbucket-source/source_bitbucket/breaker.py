@@ -0,0 +1,92 @@
+import threading
+from typing import Optional, Union
+
+import requests
+from airbyte_cdk.models import FailureType
+from airbyte_cdk.sources.streams.http.error_handlers import ErrorHandler, ErrorResolution, ResponseAction
+
+# Failed requests (5xx responses, timeouts, connection errors) after which a slice is deferred
+DEFAULT_MAX_FAILURES = 3
+
+# Requests answered slower than this count as failures
+DEFAULT_SLOW_REQUEST_SECONDS = 60.0
+
+
+class SliceBreaker:
+    """
+    Circuit breaker of the slice being read.
+
+    Every failed or slow request of the slice counts against its budget. Once the budget is spent,
+    the breaker opens: the request in progress fails instead of being retried again, so that the
+    stream can defer the slice rather than stall behind it. The breaker is reset for every slice.
+    """
+
+    def __init__(
+        self, max_failures: int = DEFAULT_MAX_FAILURES, slow_request_seconds: float = DEFAULT_SLOW_REQUEST_SECONDS
+    ):
+        self.max_failures = max_failures
+        self.slow_request_seconds = slow_request_seconds
+        self._lock = threading.Lock()
+        self.failures = 0
+        self.reason: Optional[str] = None
+
+    @property
+    def open(self) -> bool:
+        return self.reason is not None
+
+    def reset(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.reason = None
+
+    def record_failure(self, description: str) -> bool:
+        """Count a failed request, returning whether the breaker is open."""
+        with self._lock:
+            self.failures += 1
+            if self.max_failures > 0 and self.failures >= self.max_failures and self.reason is None:
+                self.reason = f"{self.failures} failed or slow requests, the last one: {description}"
+            return self.reason is not None
+
+
+class SliceBreakerErrorHandler(ErrorHandler):
+    """
+    Error handler counting the failed and slow requests of a slice, then deferring to the stream's
+    own error handling until the breaker opens. Rate limits are not the slice's fault and do not count.
+    """
+
+    def __init__(self, error_handler: ErrorHandler, breaker: SliceBreaker):
+        self.error_handler = error_handler
+        self.breaker = breaker
+
+    @property
+    def max_retries(self) -> Optional[int]:
+        return self.error_handler.max_retries
+
+    @property
+    def max_time(self) -> Optional[int]:
+        return self.error_handler.max_time
+
+    def interpret_response(
+        self, response_or_exception: Optional[Union[requests.Response, Exception]] = None
+    ) -> ErrorResolution:
+        resolution = self.error_handler.interpret_response(response_or_exception)
+        if isinstance(response_or_exception, requests.Response):
+            seconds = response_or_exception.elapsed.total_seconds()
+            if resolution.response_action == ResponseAction.RETRY:
+                failure = f"HTTP {response_or_exception.status_code}"
+            elif seconds >= self.breaker.slow_request_seconds:
+                failure = f"answered in {seconds:.0f}s"
+            else:
+                return resolution
+        elif resolution.response_action == ResponseAction.RETRY:
+            failure = str(response_or_exception)
+        else:
+            return resolution
+
+        if self.breaker.record_failure(failure):
+            return ErrorResolution(
+                response_action=ResponseAction.FAIL,
+                failure_type=FailureType.transient_error,
+                error_message=f"Slice circuit breaker open after {self.breaker.reason}",
+            )
+        return resolution
@@ -0,0 +1,101 @@
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Any, Dict, Iterable, Mapping, Tuple
+
+# Entries kept by default; at a few kilobytes per pull request this stays within a few hundred megabytes
+DEFAULT_MAX_ENTRIES = 50_000
+
+# Seconds a write waits for another process holding the database lock
+LOCK_TIMEOUT_SECONDS = 30
+
+
+class DetailCache:
+    """
+    Persistent cache of pull request details, shared across syncs.
+
+    Entries are keyed by repository and pull request id and only returned while the pull request's
+    updated_on is the one they were fetched for, so that an unchanged pull request is never fetched
+    again while any update to it (comment, approval, new commit) invalidates its entry.
+    The cache is a SQLite database holding at most max_entries pull requests; the least recently
+    used entries are evicted first.
+    """
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=LOCK_TIMEOUT_SECONDS, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS details ("
+                "repository TEXT NOT NULL, id INTEGER NOT NULL, updated_on TEXT NOT NULL, "
+                "body TEXT NOT NULL, used REAL NOT NULL, PRIMARY KEY (repository, id))"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS details_used ON details (used)")
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "DetailCache":
+        """Create the cache of the configured workspace, in detail_cache_directory or the temporary directory."""
+        directory = config.get("detail_cache_directory") or tempfile.gettempdir()
+        workspace = re.sub(r"[^A-Za-z0-9_.-]", "_", config["workspace"])
+        path = os.path.join(directory, f"bitbucket-pull-request-details-{workspace}.sqlite")
+        return cls(path, int(config.get("detail_cache_size") or DEFAULT_MAX_ENTRIES))
+
+    def get_many(self, repository: str, versions: Iterable[Tuple[int, str]]) -> Dict[int, Dict[str, Any]]:
+        """Return the cached details of the given (id, updated_on) pull request versions, by id."""
+        versions = dict(versions)
+        if not versions:
+            return {}
+        placeholders = ",".join("?" * len(versions))
+        with self._lock, self._connection:
+            rows = self._connection.execute(
+                f"SELECT id, updated_on, body FROM details WHERE repository = ? AND id IN ({placeholders})",
+                (repository, *versions),
+            ).fetchall()
+            found = {
+                pull_request_id: json.loads(body)
+                for pull_request_id, updated_on, body in rows
+                if versions[pull_request_id] == updated_on
+            }
+            if found:
+                self._connection.executemany(
+                    "UPDATE details SET used = ? WHERE repository = ? AND id = ?",
+                    [(time.time(), repository, pull_request_id) for pull_request_id in found],
+                )
+            self.hits += len(found)
+            self.misses += len(versions) - len(found)
+        return found
+
+    def put_many(self, repository: str, details: Iterable[Tuple[int, str, Mapping[str, Any]]]) -> None:
+        """Store the details fetched for (id, updated_on) pull request versions, replacing older versions."""
+        rows = [
+            (repository, pull_request_id, updated_on, json.dumps(body), time.time())
+            for pull_request_id, updated_on, body in details
+        ]
+        if not rows:
+            return
+        with self._lock, self._connection:
+            self._connection.executemany("INSERT OR REPLACE INTO details VALUES (?, ?, ?, ?, ?)", rows)
+
+    def evict(self) -> int:
+        """Delete the least recently used entries beyond max_entries, returning how many were deleted."""
+        with self._lock, self._connection:
+            (count,) = self._connection.execute("SELECT COUNT(*) FROM details").fetchone()
+            excess = count - self.max_entries
+            if excess <= 0:
+                return 0
+            self._connection.execute(
+                "DELETE FROM details WHERE rowid IN (SELECT rowid FROM details ORDER BY used LIMIT ?)", (excess,)
+            )
+            return excess
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
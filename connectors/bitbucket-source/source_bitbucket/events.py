@@ -0,0 +1,222 @@
+import argparse
+import hashlib
+import hmac
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Iterator, List, Mapping, Optional, Tuple
+
+from airbyte_cdk.logger import init_logger
+
+# Webhook events that signal new data per stream, by event key prefix
+EVENT_STREAMS: Mapping[str, Tuple[str, ...]] = {
+    "commits": ("repo:push",),
+    "pull_requests": ("pullrequest:",),
+    # Bitbucket has no deployment event: pipelines deploying a commit report their progress as commit statuses
+    "deployments": ("repo:push", "repo:commit_status_"),
+}
+
+# Seconds a write waits for another process holding the database lock
+LOCK_TIMEOUT_SECONDS = 30
+
+# Largest webhook payload the receiver accepts; Bitbucket payloads are a few dozen kilobytes
+MAX_PAYLOAD_BYTES = 10 << 20
+
+
+def event_streams(event_key: str) -> List[str]:
+    """Streams that have new data to read after the given webhook event."""
+    return [stream for stream, prefixes in EVENT_STREAMS.items() if event_key.startswith(prefixes)]
+
+
+def _spooled_events(path: str) -> Iterator[Tuple[str, Mapping[str, Any], float]]:
+    """Event key, payload and reception time of the events of a spool file, skipping malformed lines."""
+    received = os.path.getmtime(path)
+    with open(path) as spool:
+        for line in spool:
+            try:
+                event = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(event, dict):
+                yield str(event.get("event_key", "")), event.get("payload") or {}, event.get("received", received)
+
+
+class EventQueue:
+    """
+    On-disk queue of the repositories with webhook events not synced yet, per stream.
+
+    Events are not stored: only the time of the last event received for each (repository, stream)
+    is, so that the queue stays a few bytes per active repository however many events arrive.
+    A repository leaves the queue of a stream once a slice started after its last event completes;
+    events received while the slice runs keep it queued for the next sync. The queue is a SQLite
+    database, written by the receiver and read by syncs, possibly from different processes.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, timeout=LOCK_TIMEOUT_SECONDS, check_same_thread=False)
+        with self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS pending ("
+                "repository TEXT NOT NULL, stream TEXT NOT NULL, received REAL NOT NULL, "
+                "PRIMARY KEY (repository, stream))"
+            )
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> Optional["EventQueue"]:
+        """Open the queue of the configured workspace in event_queue_directory, or None when events are disabled."""
+        directory = config.get("event_queue_directory")
+        if not directory:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        workspace = re.sub(r"[^A-Za-z0-9_.-]", "_", config["workspace"])
+        return cls(os.path.join(directory, f"bitbucket-events-{workspace}.sqlite"))
+
+    def record(self, event_key: str, payload: Mapping[str, Any], received: Optional[float] = None) -> List[str]:
+        """Queue the repository of a webhook event for the streams it concerns, returning those streams."""
+        repository = (payload.get("repository") or {}).get("full_name")
+        streams = event_streams(event_key)
+        if not repository or not streams:
+            return []
+        received = time.time() if received is None else received
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "INSERT INTO pending VALUES (?, ?, ?) ON CONFLICT (repository, stream) "
+                "DO UPDATE SET received = MAX(received, excluded.received)",
+                [(repository, stream, received) for stream in streams],
+            )
+        return streams
+
+    def ingest_spool(self, path: str) -> int:
+        """
+        Queue the events of a spool file, one JSON object per line with the event_key and payload of
+        a webhook, then remove the file. The file is renamed before it is read, so that events
+        appended to it meanwhile land in a new file, and a file left by an interrupted ingestion is
+        read again. Returns the number of events queued.
+        """
+        ingesting = path + ".ingesting"
+        if not os.path.exists(ingesting):
+            if not os.path.exists(path):
+                return 0
+            os.replace(path, ingesting)
+
+        queued = 0
+        for event_key, payload, received in _spooled_events(ingesting):
+            if self.record(event_key, payload, received):
+                queued += 1
+        os.remove(ingesting)
+        return queued
+
+    def pending(self, stream: str, spool_path: Optional[str] = None) -> Dict[str, float]:
+        """
+        Repositories with events not synced yet by the stream, with the time of their last event.
+        With a spool file, its events not ingested yet are counted too, the file being only read.
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT repository, received FROM pending WHERE stream = ?", (stream,)
+            ).fetchall()
+        pending = dict(rows)
+        for path in (spool_path + ".ingesting", spool_path) if spool_path else ():
+            if not os.path.exists(path):
+                continue
+            for event_key, payload, received in _spooled_events(path):
+                repository = (payload.get("repository") or {}).get("full_name")
+                if repository and stream in event_streams(event_key):
+                    pending[repository] = max(received, pending.get(repository, received))
+        return pending
+
+    def acknowledge(self, stream: str, repository: str, synced_from: float) -> None:
+        """Dequeue a repository synced by a slice started at synced_from, unless an event arrived since."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM pending WHERE repository = ? AND stream = ? AND received <= ?",
+                (repository, stream, synced_from),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    """Receives Bitbucket webhook deliveries and queues the repositories they concern."""
+
+    server: "WebhookServer"
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length > MAX_PAYLOAD_BYTES:
+            self.send_error(413)
+            return
+        body = self.rfile.read(length)
+        if not self.server.verify(body, self.headers.get("X-Hub-Signature")):
+            self.send_error(401)
+            return
+        try:
+            payload = json.loads(body or b"{}")
+        except ValueError:
+            payload = None
+        if not isinstance(payload, dict):
+            self.send_error(400)
+            return
+
+        repository = (payload.get("repository") or {}).get("full_name") or ""
+        if repository.startswith(self.server.workspace + "/"):
+            self.server.queue.record(self.headers.get("X-Event-Key", ""), payload)
+        # Deliveries of events the connector does not need are acknowledged too, so Bitbucket does not retry them
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        self.server.logger.debug(format % args)
+
+
+class WebhookServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, queue: EventQueue, workspace: str, secret: Optional[str] = None):
+        super().__init__(address, WebhookHandler)
+        self.queue = queue
+        self.workspace = workspace
+        self.secret = secret.encode("utf-8") if secret else None
+        self.logger = init_logger("airbyte")
+
+    def verify(self, body: bytes, signature: Optional[str]) -> bool:
+        """Check the HMAC-SHA256 signature Bitbucket sends when the webhook has a secret."""
+        if self.secret is None:
+            return True
+        expected = "sha256=" + hmac.new(self.secret, body, hashlib.sha256).hexdigest()
+        return signature is not None and hmac.compare_digest(signature, expected)
+
+
+def run_receiver(source: Any, args: List[str]) -> None:
+    """Entry point of the webhook receiver: python main.py events --config ... --port ..."""
+    parser = argparse.ArgumentParser(
+        prog="main.py events",
+        description="Receive Bitbucket webhooks and queue the repositories to read on the next sync.",
+    )
+    parser.add_argument("--config", required=True, help="path to the connector configuration")
+    parser.add_argument("--host", default="0.0.0.0", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8080, help="port to listen on")
+    parsed = parser.parse_args(args)
+
+    config = source.read_config(parsed.config)
+    queue = EventQueue.from_config(config)
+    if queue is None:
+        parser.error("the configuration has no event_queue_directory")
+
+    server = WebhookServer((parsed.host, parsed.port), queue, config["workspace"], config.get("webhook_secret"))
+    server.logger.info(f"Queueing webhook events of {config['workspace']} into {queue.path} on port {parsed.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        queue.close()
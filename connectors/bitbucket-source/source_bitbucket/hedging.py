@@ -0,0 +1,178 @@
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Deque, Dict, Mapping, Optional
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Percentile of an endpoint's recent latencies after which a request is hedged
+DEFAULT_PERCENTILE = 95
+
+# Latencies kept per endpoint, and latencies needed before its requests are hedged
+WINDOW = 200
+MIN_SAMPLES = 20
+
+# Requests are not hedged sooner than this, whatever the percentile, so that fast endpoints are not doubled on jitter
+MIN_DELAY_SECONDS = 0.25
+
+# Hedges in flight at once, and hedges sent at most per request sent, so that a slow API is not flooded
+MAX_CONCURRENT_HEDGES = 2
+MAX_HEDGE_RATIO = 0.05
+
+# Path segments that identify a resource rather than an endpoint: numbers and {uuid}s
+_IDENTIFIER = re.compile(r"^(\d+|\{[^}]*\}|[0-9a-fA-F-]{32,36})$")
+
+
+def endpoint_key(url: str) -> str:
+    """
+    Key of the endpoint a URL belongs to, for latency statistics: its number of path segments and
+    its last segment that does not identify a resource (pullrequests, diffstat, branches, jobs...).
+    """
+    segments = [segment for segment in urlparse(url).path.split("/") if segment]
+    names = [segment for segment in segments if not _IDENTIFIER.match(segment)]
+    return f"{len(segments)}:{names[-1] if names else ''}"
+
+
+def _percentile(values, percentile: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * percentile / 100))]
+
+
+def _discard(future: Future) -> None:
+    """Release the connection of a response that lost the race, once it arrives."""
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+class HedgingAdapter(HTTPAdapter):
+    """
+    HTTP adapter hedging slow GET requests.
+
+    Once an endpoint has enough latency samples, a GET taking longer than the given percentile of
+    its recent latencies is sent a second time, and whichever response arrives first is used.
+    The other one is cancelled if it has not been sent yet, and otherwise dropped on arrival,
+    releasing its connection. Hedges are capped both in flight and as a share of all requests.
+    Only GETs are hedged, being idempotent.
+
+    Subclasses can make every request, hedges included, wait for a permit before it is sent (such
+    as a token of a shared quota) by overriding _acquire, and hold back hedges with _can_hedge.
+    The permit is taken before the hedging delay starts, so that only the time spent on the wire
+    is timed and recorded in the latencies of the endpoint.
+    """
+
+    def __init__(self, percentile: float = DEFAULT_PERCENTILE, **kwargs):
+        super().__init__(**kwargs)
+        self.percentile = percentile
+        self._lock = threading.Lock()
+        self._latencies: Dict[str, Deque[float]] = {}
+        self._requests = 0
+        self._hedges = 0
+        self._hedges_in_flight = 0
+        self._hedges_won = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=kwargs.get("pool_maxsize", 10) + MAX_CONCURRENT_HEDGES, thread_name_prefix="hedging"
+        )
+
+    def _delay(self, endpoint: str) -> Optional[float]:
+        """Seconds after which a request to the endpoint is hedged, or None while it has too few samples."""
+        with self._lock:
+            latencies = self._latencies.get(endpoint)
+            if latencies is None or len(latencies) < MIN_SAMPLES:
+                return None
+            return max(MIN_DELAY_SECONDS, _percentile(latencies, self.percentile))
+
+    def _acquire(self) -> None:
+        """Wait until a request may be sent. Called before each request and hedge, outside of its timing."""
+
+    def _can_hedge(self) -> bool:
+        """Whether a hedge may be sent now, on top of the caps on hedges."""
+        return True
+
+    def _wire_send(self, request: requests.PreparedRequest, kwargs: Mapping[str, Any]) -> requests.Response:
+        return super().send(request, **kwargs)
+
+    def _timed_send(self, endpoint: str, request: requests.PreparedRequest, kwargs: Mapping[str, Any]):
+        started = time.monotonic()
+        response = self._wire_send(request, kwargs)
+        elapsed = time.monotonic() - started
+        with self._lock:
+            self._latencies.setdefault(endpoint, deque(maxlen=WINDOW)).append(elapsed)
+        return response
+
+    def _take_hedge(self) -> bool:
+        with self._lock:
+            if self._hedges_in_flight >= MAX_CONCURRENT_HEDGES or self._hedges >= MAX_HEDGE_RATIO * self._requests:
+                return False
+            self._hedges += 1
+            self._hedges_in_flight += 1
+            return True
+
+    def _hedged_send(self, endpoint: str, request: requests.PreparedRequest, kwargs: Mapping[str, Any]):
+        self._acquire()
+        return self._timed_send(endpoint, request, kwargs)
+
+    def _hedge_done(self, future: Future) -> None:
+        with self._lock:
+            self._hedges_in_flight -= 1
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        endpoint = endpoint_key(request.url)
+        with self._lock:
+            self._requests += 1
+        delay = self._delay(endpoint) if request.method == "GET" else None
+        self._acquire()
+        if delay is None:
+            return self._timed_send(endpoint, request, kwargs)
+
+        primary = self._executor.submit(self._timed_send, endpoint, request, kwargs)
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._can_hedge() or not self._take_hedge():
+            return primary.result()
+
+        hedge = self._executor.submit(self._hedged_send, endpoint, request.copy(), kwargs)
+        hedge.add_done_callback(self._hedge_done)
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+                for loser in pending:
+                    if not loser.cancel():
+                        loser.add_done_callback(_discard)
+                for other in done - {future}:
+                    _discard(other)
+                if future is hedge:
+                    with self._lock:
+                        self._hedges_won += 1
+                return future.result()
+        raise error
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        super().close()
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        """Hedging statistics: requests sent, hedges sent and won, and the hedging delay per endpoint."""
+        with self._lock:
+            delays = {
+                endpoint: round(max(MIN_DELAY_SECONDS, _percentile(latencies, self.percentile)), 3)
+                for endpoint, latencies in self._latencies.items()
+                if len(latencies) >= MIN_SAMPLES
+            }
+            return {"requests": self._requests, "hedges": self._hedges, "hedges_won": self._hedges_won, "delays": delays}
+
+    def log_stats(self, logger) -> None:
+        stats = self.stats
+        delays = ", ".join(f"{endpoint} after {delay}s" for endpoint, delay in sorted(stats["delays"].items()))
+        logger.info(
+            f"Hedged {stats['hedges']} of {stats['requests']} requests, {stats['hedges_won']} hedges answered first"
+            + (f"; hedging {delays}" if delays else "")
+        )
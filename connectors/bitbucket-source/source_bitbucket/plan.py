@@ -0,0 +1,259 @@
+import argparse
+import json
+import math
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+from airbyte_cdk.models import ConfiguredAirbyteCatalog, ConfiguredAirbyteCatalogSerializer, SyncMode
+from airbyte_cdk.sources import AbstractSource
+from airbyte_cdk.sources.connector_state_manager import ConnectorStateManager
+
+from .backfill import backfill_catalog
+from .quota import QuotaCoordinator
+from .streams import BitbucketStream, RepositorySubstream
+
+# Hourly request quota of Bitbucket Cloud for API tokens, when quota_requests_per_hour is not configured
+DEFAULT_REQUESTS_PER_HOUR = 1000
+
+# Seconds per request assumed while no slice of the stream was timed by a previous sync
+DEFAULT_SECONDS_PER_REQUEST = 0.5
+
+
+class StreamEstimate:
+    """Requests and duration a stream is expected to take, in total and per repository slice."""
+
+    def __init__(self, name: str, listing_requests: int = 0):
+        self.name = name
+        self.listing_requests = listing_requests
+        self.slices: List[Tuple[str, int, float, bool]] = []
+        self.notes: List[str] = []
+        self.deferred = False
+
+    def add_slice(self, repository: str, requests: int, seconds: float, measured: bool) -> None:
+        self.slices.append((repository, requests, seconds, measured))
+
+    @property
+    def requests(self) -> int:
+        return self.listing_requests + sum(requests for _, requests, _, _ in self.slices)
+
+    @property
+    def seconds(self) -> float:
+        return sum(seconds for _, _, seconds, _ in self.slices)
+
+
+def _pages(records: int, page_size: int) -> int:
+    return max(1, math.ceil(records / max(1, page_size)))
+
+
+def estimate_substream(
+    stream: RepositorySubstream, repositories: List[Mapping[str, Any]], listing_requests: int
+) -> StreamEstimate:
+    """
+    Estimate the slices of a repository substream from the statistics of the previous sync in its
+    state: the pages and seconds each repository took. Only the slices the sync would read are
+    estimated, as planned by the stream itself; repositories without statistics are estimated from
+    their size, at the pages and seconds per byte of the repositories with statistics.
+    """
+    estimate = StreamEstimate(stream.name, listing_requests)
+    slices = stream.planned_slices(repositories)
+    if len(slices) < len(repositories):
+        estimate.notes.append(f"{len(repositories) - len(slices)} unchanged repositories skipped")
+    has_cursor = bool(stream.state.get(stream.cursor_field))
+    if has_cursor and stream.full_scan_due():
+        estimate.notes.append("full scan due")
+
+    stats = stream.slice_stats
+    measured = [(repo, stats[repo["full_name"]]) for repo in repositories if repo["full_name"] in stats]
+    total_pages = sum(slice_stats.get("pages", 0) for _, slice_stats in measured)
+    total_seconds = sum(slice_stats.get("seconds", 0.0) for _, slice_stats in measured)
+    total_size = sum(repo.get("size") or 0 for repo, slice_stats in measured if slice_stats.get("pages"))
+    seconds_per_page = total_seconds / total_pages if total_pages else DEFAULT_SECONDS_PER_REQUEST
+    pages_per_byte = total_pages / total_size if total_pages and total_size else None
+
+    listed = {repo["full_name"]: repo for repo in repositories}
+    for stream_slice in slices:
+        repository = stream_slice["repository"]
+        slice_stats = stats.get(repository)
+        if slice_stats and slice_stats.get("pages"):
+            pages = int(slice_stats["pages"])
+            estimate.add_slice(repository, pages, float(slice_stats.get("seconds", 0.0)), True)
+        else:
+            size = listed.get(repository, {}).get("size") or 0
+            pages = max(1, round(size * pages_per_byte)) if pages_per_byte and size else 1
+            estimate.add_slice(repository, pages, pages * seconds_per_page, False)
+
+    unmeasured = sum(1 for slice_estimate in estimate.slices if not slice_estimate[3])
+    if unmeasured:
+        estimate.notes.append(f"{unmeasured} repositories without statistics estimated from their size")
+    failed = stream.failed_repositories
+    if failed:
+        estimate.notes.append(f"{len(failed)} repositories failed in the previous sync")
+    if stream.name == "pull_requests":
+        if stream.config.get("pull_request_details"):
+            estimate.notes.append("plus 2+ requests per changed pull request not in the detail cache")
+        if stream.backfill_window_days and not has_cursor:
+            estimate.notes.append("first sync backfilled by windows: pages of each window are not estimated")
+    elif stream.name == "deployments":
+        estimate.notes.append("plus 1 request per environment")
+    return estimate
+
+
+class SyncPlan:
+    """
+    Estimates the API requests and duration of a sync before it runs.
+
+    Repositories are listed from the API (the only requests the plan makes); everything else comes
+    from the state: cursors and skipped repositories decide which slices a sync would read, and the
+    pages and seconds per slice recorded by the previous sync estimate their cost. Webhook events
+    queued or spooled for the next sync are counted, and the shared quota is taken at its current
+    balance. Streams are then taken in priority order while they fit in the request budget; the
+    others are deferred.
+    """
+
+    def __init__(
+        self,
+        source: AbstractSource,
+        config: Mapping[str, Any],
+        catalog: ConfiguredAirbyteCatalog,
+        state: List[Any],
+        budget_hours: float = 1.0,
+        priority: Optional[List[str]] = None,
+    ):
+        self.source = source
+        self.config = config
+        self.catalog = catalog
+        self.state_manager = ConnectorStateManager(state)
+        self.requests_per_hour = int(config.get("quota_requests_per_hour") or DEFAULT_REQUESTS_PER_HOUR)
+        self.quota = QuotaCoordinator.from_config(config)
+        self.budget = int(self.requests_per_hour * budget_hours)
+        self.priority = priority or []
+        self.estimates: List[StreamEstimate] = []
+
+    def _ordered_streams(self) -> List[Any]:
+        """Configured streams, the prioritized ones first in their priority order, then in catalog order."""
+        rank = {name: index for index, name in enumerate(self.priority)}
+        return sorted(self.catalog.streams, key=lambda configured: rank.get(configured.stream.name, len(rank)))
+
+    def estimate(self) -> List[StreamEstimate]:
+        streams: Dict[str, BitbucketStream] = {stream.name: stream for stream in self.source.streams(self.config)}
+        parent = streams["repositories"]
+        repositories = list(parent.read_all_repositories())
+        listing_requests = _pages(len(repositories), parent.page_size)
+
+        self.estimates = []
+        for configured in self._ordered_streams():
+            stream = streams[configured.stream.name]
+            if configured.sync_mode == SyncMode.incremental:
+                stream_state = self.state_manager.get_stream_state(stream.name, configured.stream.namespace)
+                if stream_state:
+                    stream.state = stream_state
+            if isinstance(stream, RepositorySubstream):
+                estimate = estimate_substream(stream, repositories, listing_requests)
+            elif stream.name == "repositories":
+                estimate = StreamEstimate(stream.name, listing_requests)
+            else:
+                # The workspace members are not counted before they are read
+                estimate = StreamEstimate(stream.name, 1)
+                estimate.notes.append("1 request per page of members")
+            self.estimates.append(estimate)
+
+        # A stream larger than the whole budget is still read when it comes first: deferring it would not make it fit
+        spent = 0
+        for estimate in self.estimates:
+            estimate.deferred = spent > 0 and spent + estimate.requests > self.budget
+            if not estimate.deferred:
+                spent += estimate.requests
+        return self.estimates
+
+    def quota_seconds(self, requests: int) -> float:
+        """
+        Seconds the quota holds back a number of requests, starting from the current balance of the
+        bucket shared with the other processes when quota_requests_per_hour is configured, and from
+        a full hourly bucket otherwise.
+        """
+        tokens, blocked_seconds = float(self.requests_per_hour), 0.0
+        if self.quota is not None:
+            tokens, blocked_seconds = self.quota.balance()
+        return blocked_seconds + max(0.0, requests - tokens) * 3600.0 / self.requests_per_hour
+
+    def planned_catalog(self) -> ConfiguredAirbyteCatalog:
+        """The catalog of the streams that fit in the budget, in the order they should be read."""
+        configured = {configured.stream.name: configured for configured in self.catalog.streams}
+        return ConfiguredAirbyteCatalog(
+            streams=[configured[estimate.name] for estimate in self.estimates if not estimate.deferred]
+        )
+
+    def report(self, slices: bool = False) -> List[str]:
+        """Lines of the plan: requests and duration per stream, optionally per slice, and in total."""
+        lines = [f"{'stream':<20} {'slices':>7} {'requests':>9} {'duration':>10}  notes"]
+        for estimate in self.estimates:
+            status = "deferred, " if estimate.deferred else ""
+            lines.append(
+                f"{estimate.name:<20} {len(estimate.slices):>7} {estimate.requests:>9} "
+                f"{_duration(estimate.seconds + estimate.listing_requests * DEFAULT_SECONDS_PER_REQUEST):>10}  "
+                f"{status}{'; '.join(estimate.notes)}"
+            )
+            if slices:
+                for repository, requests, seconds, measured in estimate.slices:
+                    basis = "previous sync" if measured else "estimated"
+                    lines.append(f"  {repository:<26} {requests:>9} {_duration(seconds):>10}  {basis}")
+
+        planned = [estimate for estimate in self.estimates if not estimate.deferred]
+        requests = sum(estimate.requests for estimate in planned)
+        seconds = sum(
+            estimate.seconds + estimate.listing_requests * DEFAULT_SECONDS_PER_REQUEST for estimate in planned
+        )
+        quota_seconds = self.quota_seconds(requests)
+        lines.append(
+            f"Planned: {requests} requests of a budget of {self.budget} at {self.requests_per_hour} requests per hour, "
+            f"expected to take {_duration(max(seconds, quota_seconds))}"
+            + (f" (held back {_duration(quota_seconds)} by the quota)" if quota_seconds > seconds else "")
+        )
+        deferred = [estimate.name for estimate in self.estimates if estimate.deferred]
+        if deferred:
+            lines.append(f"Deferred to a later sync: {', '.join(deferred)}")
+        return lines
+
+
+def _duration(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m{seconds % 60:02.0f}s"
+    return f"{seconds // 3600:.0f}h{seconds % 3600 / 60:02.0f}m"
+
+
+def run_plan(source: AbstractSource, args: List[str]) -> None:
+    """Entry point of the planning command: python main.py plan --config ... [--catalog ...] [--state ...]"""
+    parser = argparse.ArgumentParser(
+        prog="main.py plan", description="Estimate the API requests and duration of a sync before it runs."
+    )
+    parser.add_argument("--config", required=True, help="path to the connector configuration")
+    parser.add_argument("--catalog", help="path to a configured catalog, instead of --streams")
+    parser.add_argument("--streams", help="comma-separated streams to read, all of them by default")
+    parser.add_argument("--state", help="state the sync would start from")
+    parser.add_argument("--budget-hours", type=float, default=1.0, help="hours of request quota the sync may use")
+    parser.add_argument("--priority", help="comma-separated streams to read first, in this order")
+    parser.add_argument("--slices", action="store_true", help="also report every repository slice")
+    parser.add_argument("--output-catalog", help="write the catalog of the streams that fit in the budget, in order")
+    parsed = parser.parse_args(args)
+
+    config = source.read_config(parsed.config)
+    if parsed.catalog:
+        catalog = source.read_catalog(parsed.catalog)
+    else:
+        catalog = backfill_catalog(source, config, parsed.streams.split(",") if parsed.streams else None)
+    state = source.read_state(parsed.state) if parsed.state else []
+
+    plan = SyncPlan(
+        source,
+        config,
+        catalog,
+        state,
+        budget_hours=parsed.budget_hours,
+        priority=parsed.priority.split(",") if parsed.priority else None,
+    )
+    plan.estimate()
+    print("\n".join(plan.report(slices=parsed.slices)))
+    if parsed.output_catalog:
+        with open(parsed.output_catalog, "w") as catalog_file:
+            json.dump(ConfiguredAirbyteCatalogSerializer.dump(plan.planned_catalog()), catalog_file, indent=2)
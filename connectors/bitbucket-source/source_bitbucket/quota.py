@@ -0,0 +1,131 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any, Mapping, Optional, Tuple
+
+
+class QuotaCoordinator:
+    """
+    Token bucket shared by every connector process on a host that uses the same Bitbucket credentials.
+
+    The bucket lives in a small JSON file keyed by a hash of the credentials and guarded by an
+    exclusive file lock, so that processes draw from one hourly budget instead of each assuming it
+    has the whole quota. The bucket holds up to requests_per_hour tokens and refills continuously;
+    requests waiting for a token are served first come, first served across processes.
+    When Bitbucket answers 429 anyway (other clients may use the same credentials), the bucket is
+    blocked for every process until the rate limit window is expected to be over.
+    """
+
+    def __init__(self, path: str, requests_per_hour: int):
+        self.path = path
+        self.capacity = float(requests_per_hour)
+        self.refill_per_second = requests_per_hour / 3600.0
+        self._lock = threading.Lock()
+        self._waited = 0.0
+        self._waits = 0
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> Optional["QuotaCoordinator"]:
+        """Create the coordinator configured by quota_requests_per_hour, or None when coordination is disabled."""
+        requests_per_hour = config.get("quota_requests_per_hour")
+        if not requests_per_hour:
+            return None
+        credentials = f"{config.get('email', '')}:{config.get('api_token', '')}"
+        key = hashlib.sha256(credentials.encode("utf-8")).hexdigest()[:16]
+        directory = config.get("quota_directory") or tempfile.gettempdir()
+        return cls(os.path.join(directory, f"bitbucket-quota-{key}.json"), int(requests_per_hour))
+
+    def _refill(self, bucket: Mapping[str, float], now: float) -> Tuple[float, float]:
+        """Tokens of the bucket refilled up to now, and the time refilling resumes from."""
+        tokens = bucket.get("tokens", self.capacity)
+        # Refilling starts again at "updated", which is in the future while the bucket is blocked
+        updated = bucket.get("updated", now)
+        if now > updated:
+            tokens = min(self.capacity, tokens + (now - updated) * self.refill_per_second)
+            updated = now
+        return tokens, updated
+
+    def _update(self, now: float, take: bool = False, block_until: Optional[float] = None) -> float:
+        """
+        Refill the bucket under the file lock and optionally reserve a token or block the bucket.
+
+        Tokens are reserved even when the bucket is empty, the balance going negative, so that
+        waiting requests are served in the order they arrived rather than racing for each refill.
+        Returns the number of seconds to wait before the reserved token becomes available.
+        """
+        with open(self.path, "a+") as bucket_file:
+            fcntl.flock(bucket_file, fcntl.LOCK_EX)
+            try:
+                bucket_file.seek(0)
+                try:
+                    bucket = json.loads(bucket_file.read() or "{}")
+                except ValueError:
+                    bucket = {}
+                tokens, updated = self._refill(bucket, now)
+
+                wait = 0.0
+                if block_until is not None:
+                    tokens = min(tokens, 0.0)
+                    updated = max(updated, block_until)
+                elif take:
+                    tokens -= 1
+                    wait = (updated - now) + max(0.0, -tokens) / self.refill_per_second
+
+                bucket_file.seek(0)
+                bucket_file.truncate()
+                bucket_file.write(json.dumps({"tokens": tokens, "updated": updated}))
+                bucket_file.flush()
+                return wait
+            finally:
+                fcntl.flock(bucket_file, fcntl.LOCK_UN)
+
+    def acquire(self) -> None:
+        """Block until a request may be sent under the shared quota."""
+        wait = self._update(time.time(), take=True)
+        if wait > 0:
+            time.sleep(wait)
+            with self._lock:
+                self._waited += wait
+                self._waits += 1
+
+    def balance(self) -> Tuple[float, float]:
+        """
+        Tokens currently in the shared bucket, negative when requests are waiting for a token, and
+        seconds until it refills again, positive while it is blocked. The bucket file is only read.
+        """
+        now = time.time()
+        try:
+            with open(self.path) as bucket_file:
+                fcntl.flock(bucket_file, fcntl.LOCK_SH)
+                try:
+                    bucket = json.loads(bucket_file.read() or "{}")
+                finally:
+                    fcntl.flock(bucket_file, fcntl.LOCK_UN)
+        except (OSError, ValueError):
+            bucket = {}
+        tokens, updated = self._refill(bucket, now)
+        return tokens, max(0.0, updated - now)
+
+    def exhausted(self) -> bool:
+        """Whether the shared bucket is blocked or has no token left for a request sent now."""
+        tokens, blocked_seconds = self.balance()
+        return blocked_seconds > 0 or tokens < 1
+
+    def block(self, seconds: float) -> None:
+        """Empty the bucket and hold back every process for the given number of seconds."""
+        now = time.time()
+        self._update(now, block_until=now + seconds)
+
+    @property
+    def waited_seconds(self) -> float:
+        """Total time this process spent waiting for the quota."""
+        return self._waited
+
+    @property
+    def waits(self) -> int:
+        """Number of requests that had to wait for the quota."""
+        return self._waits
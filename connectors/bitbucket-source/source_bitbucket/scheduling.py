@@ -0,0 +1,77 @@
+import time
+from typing import Any, Dict, Iterable, List, Mapping, Optional
+
+
+class SliceScheduler:
+    """
+    Orders repository slices of child streams by their estimated cost.
+
+    The estimate comes from the slice durations recorded in the previous sync's state.
+    Repositories without history are estimated from their ``size`` using the seconds-per-byte
+    ratio observed on repositories that do have history. The most expensive slices are
+    scheduled first so that one huge repository never ends up as the tail of the sync.
+    """
+
+    def __init__(self, slice_stats: Optional[Mapping[str, Mapping[str, Any]]] = None):
+        self._previous: Dict[str, Dict[str, Any]] = {
+            repository: dict(stats) for repository, stats in (slice_stats or {}).items()
+        }
+        # Previous statistics overlaid with this sync's measurements, kept up to date so that reading
+        # the stream state (done after every record) does not rebuild it
+        self._stats: Dict[str, Dict[str, Any]] = dict(self._previous)
+        self._started: Dict[str, float] = {}
+
+    def _seconds_per_byte(self, repositories: List[Mapping[str, Any]]) -> Optional[float]:
+        """Derive the cost of a byte of repository from slices measured in the previous sync."""
+        total_seconds = 0.0
+        total_size = 0
+        for repository in repositories:
+            previous = self._previous.get(repository["full_name"])
+            size = repository.get("size") or 0
+            if previous and size:
+                total_seconds += previous.get("seconds", 0.0)
+                total_size += size
+        if total_seconds and total_size:
+            return total_seconds / total_size
+
+        # Without history, express sizes relative to the slowest slice we know of
+        largest_size = max((repository.get("size") or 0 for repository in repositories), default=0)
+        slowest = max((stats.get("seconds", 0.0) for stats in self._previous.values()), default=0.0)
+        if largest_size and slowest:
+            return slowest / largest_size
+        return None
+
+    def estimate(self, repository: Mapping[str, Any], seconds_per_byte: Optional[float] = None) -> float:
+        """Return the estimated cost of a repository slice, in seconds when history is available."""
+        previous = self._previous.get(repository["full_name"])
+        if previous and "seconds" in previous:
+            return float(previous["seconds"])
+        size = float(repository.get("size") or 0)
+        return size * seconds_per_byte if seconds_per_byte else size
+
+    def order(self, repositories: Iterable[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+        """
+        Return the repositories sorted from most to least expensive.
+        Ties are broken by the most recently updated repository, which is likely to have the most new data.
+        """
+        repositories = list(repositories)
+        seconds_per_byte = self._seconds_per_byte(repositories)
+        repositories.sort(key=lambda repository: repository.get("updated_on") or "", reverse=True)
+        repositories.sort(key=lambda repository: self.estimate(repository, seconds_per_byte), reverse=True)
+        return repositories
+
+    def start(self, repository: str) -> None:
+        """Mark the beginning of a repository slice."""
+        self._started[repository] = time.monotonic()
+
+    def finish(self, repository: str, pages: int) -> None:
+        """Record the duration and page count of a finished repository slice."""
+        started = self._started.pop(repository, None)
+        if started is None:
+            return
+        self._stats[repository] = {"seconds": round(time.monotonic() - started, 3), "pages": pages}
+
+    @property
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Slice statistics to persist in state, with this sync's measurements taking precedence."""
+        return self._stats
@@ -1,8 +1,10 @@
 
 
-from typing import Any, List, Mapping, Tuple
+from typing import Any, Iterator, List, Mapping, Optional, Tuple
 
-from airbyte_cdk import BasicHttpAuthenticator, SyncMode
+import requests
+from airbyte_cdk import BasicHttpAuthenticator
+from airbyte_cdk.models import AirbyteMessage, AirbyteStateMessage, ConfiguredAirbyteCatalog
 from airbyte_cdk.sources import AbstractSource
 from airbyte_cdk.sources.streams import Stream
 
@@ -13,6 +15,16 @@ from .streams import (
     DeploymentsStream,
     WorkspaceUsersStream,
 )
+from .hedging import HedgingAdapter
+from .profiling import Profiler
+from .quota import QuotaCoordinator
+from .transport import build_session
+
+# Seconds to wait for Bitbucket to answer the check request
+CHECK_TIMEOUT_SECONDS = 30
+
+# Worker threads whose time shows up in the section timers of the profiling summary, but not in its profiles
+UNPROFILED_THREADS = ("hedged request", "pull request detail", "repository listing")
 
 
 class SourceBitbucket(AbstractSource):
@@ -29,9 +41,15 @@ class SourceBitbucket(AbstractSource):
     - workspace_users: Members of the workspace
     """
 
+    def __init__(self):
+        super().__init__()
+        self._quota: Optional[QuotaCoordinator] = None
+        self._hedging: Optional[HedgingAdapter] = None
+        self._profiler: Optional[Profiler] = None
+
     def check_connection(self, logger, config: Mapping[str, Any]) -> Tuple[bool, Any]:
         """
-        Test the connection to Bitbucket by attempting to list repositories.
+        Test the connection to Bitbucket by requesting the first member of the workspace.
 
         Args:
             logger: Airbyte logger instance
@@ -58,16 +76,32 @@ class SourceBitbucket(AbstractSource):
 
             # Create a temporary WorkspaceUsersStream to test the connection
             users_stream = WorkspaceUsersStream(
-                config=config, authenticator=authenticator
+                config=config,
+                authenticator=authenticator,
+                session=build_session(config, authenticator, QuotaCoordinator.from_config(config)),
             )
 
-            # Try to read the first record
-            for _ in users_stream.read_records(sync_mode=SyncMode.full_refresh):
-                # Successfully read at least one record, connection is valid
-                return True, None
-
-            # No users found, but connection is still valid
-            print("Connection successful, but no users found in the workspace")
+            # Request a single member rather than a full page, under a time budget
+            try:
+                response = users_stream.session.get(
+                    f"{users_stream.url_base}{users_stream.get_path()}",
+                    params={"pagelen": 1},
+                    timeout=CHECK_TIMEOUT_SECONDS,
+                )
+            except requests.exceptions.Timeout:
+                print(f"Failed to connect to Bitbucket: no response within {CHECK_TIMEOUT_SECONDS} seconds")
+                return False, f"Connection failed: Bitbucket did not respond within {CHECK_TIMEOUT_SECONDS} seconds"
+
+            if response.status_code in (401, 403):
+                return False, "Authentication failed: check the email and API token, and the token's permissions"
+            if response.status_code == 404:
+                return False, f"Workspace not found: {workspace}"
+            if response.status_code != 200:
+                return False, f"Connection failed: HTTP {response.status_code}: {response.text[:500]}"
+
+            if not response.json().get("values"):
+                # No users found, but connection is still valid
+                print("Connection successful, but no users found in the workspace")
             return True, None
 
         except ValueError as e:
@@ -94,32 +128,49 @@ class SourceBitbucket(AbstractSource):
 
         authenticator = BasicHttpAuthenticator(username=email, password=api_token, config=config, parameters={})
 
+        # One connection pool shared by all streams, drawing from the quota shared with other processes
+        self._quota = QuotaCoordinator.from_config(config)
+        session = build_session(config, authenticator, self._quota)
+        adapter = session.get_adapter("https://")
+        self._hedging = adapter if isinstance(adapter, HedgingAdapter) else None
+        # One profiler for all streams, summarizing the sync once it is read
+        self._profiler = Profiler.from_config(config)
+        profiler = self._profiler
+
         # Create parent stream
-        repositories_stream = RepositoriesStream(config=config, authenticator=authenticator)
+        repositories_stream = RepositoriesStream(config=config, authenticator=authenticator, session=session, profiler=profiler)
 
         # Create substreams (depend on repositories)
         pull_requests_stream = PullRequestsStream(
             parent_stream=repositories_stream,
             config=config,
             authenticator=authenticator,
+            session=session,
+            profiler=profiler,
         )
 
         commits_stream = CommitsStream(
             parent_stream=repositories_stream,
             config=config,
             authenticator=authenticator,
+            session=session,
+            profiler=profiler,
         )
 
         deployments_stream = DeploymentsStream(
             parent_stream=repositories_stream,
             config=config,
             authenticator=authenticator,
+            session=session,
+            profiler=profiler,
         )
 
         # Independent stream
         workspace_users_stream = WorkspaceUsersStream(
             config=config,
             authenticator=authenticator,
+            session=session,
+            profiler=profiler,
         )
 
         return [
@@ -129,3 +180,25 @@ class SourceBitbucket(AbstractSource):
             deployments_stream,
             workspace_users_stream,
         ]
+
+    def read(
+        self,
+        logger,
+        config: Mapping[str, Any],
+        catalog: ConfiguredAirbyteCatalog,
+        state: Optional[List[AirbyteStateMessage]] = None,
+    ) -> Iterator[AirbyteMessage]:
+        """
+        Read the streams, then report the time spent waiting for the shared API quota, hedging
+        statistics and, when profiling, the profile of the sync.
+        """
+        yield from super().read(logger, config, catalog, state)
+        if self._hedging is not None:
+            self._hedging.log_stats(logger)
+        if self._quota is not None:
+            logger.info(
+                f"Waited {self._quota.waited_seconds:.1f}s for the shared API quota "
+                f"across {self._quota.waits} requests"
+            )
+        if self._profiler is not None:
+            self._profiler.log_summary(logger, UNPROFILED_THREADS)
@@ -0,0 +1,42 @@
+import json
+import os
+from typing import Any, Dict, TextIO
+
+import yaml
+
+SPEC_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "spec.yaml")
+
+# Field order of the protocol's ConnectorSpecification, which the CDK serializes the spec in
+SPEC_FIELDS = (
+    "connectionSpecification",
+    "documentationUrl",
+    "changelogUrl",
+    "supportsIncremental",
+    "supportsNormalization",
+    "supportsDBT",
+    "supported_destination_sync_modes",
+    "authSpecification",
+    "advanced_auth",
+    "protocol_version",
+)
+
+
+def spec_message() -> Dict[str, Any]:
+    """
+    Build the SPEC message the CDK entrypoint would emit for spec.yaml, without importing the CDK.
+    Fields missing from spec.yaml get the defaults of the protocol's ConnectorSpecification, and
+    fields are written in its order.
+    """
+    with open(SPEC_PATH) as spec_file:
+        spec = yaml.load(spec_file, Loader=getattr(yaml, "CSafeLoader", yaml.SafeLoader))
+    spec.setdefault("supportsNormalization", False)
+    spec.setdefault("supportsDBT", False)
+    ordered = {field: spec.pop(field) for field in SPEC_FIELDS if field in spec}
+    ordered.update(spec)
+    return {"type": "SPEC", "spec": ordered}
+
+
+def write_spec(output: TextIO) -> None:
+    """Write the SPEC message as the single line of output of the spec command."""
+    output.write(json.dumps(spec_message(), separators=(",", ":"), ensure_ascii=False) + "\n")
+    output.flush()
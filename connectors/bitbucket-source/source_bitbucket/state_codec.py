@@ -0,0 +1,129 @@
+import base64
+import json
+import zlib
+from typing import Any, Dict, List, Mapping, MutableMapping, Optional, Sequence, Set
+
+# Repositories from which the per-repository parts of a stream state are stored compactly
+DEFAULT_COMPACT_MIN_REPOSITORIES = 500
+
+# Average repositories per compressed chunk: a checkpoint re-encodes only the chunks it changed
+CHUNK_REPOSITORIES = 256
+
+# Key of the compact parts in the stream state, and version of their encoding
+COMPACT_KEY = "compact"
+VERSION = 1
+
+
+def _chunk_of(repository: str, chunks: int) -> int:
+    return zlib.crc32(repository.encode("utf-8")) % chunks
+
+
+def _encode_chunk(repositories: List[str], fields: Mapping[str, Mapping[str, Any]]) -> str:
+    """
+    Encode the entries of the given repositories: their names sorted once as the chunk's key
+    dictionary, and per field the [index, value] pairs of the repositories it has an entry for,
+    as compressed JSON.
+    """
+    names = sorted(repositories)
+    payload: Dict[str, Any] = {"names": names}
+    for field, entries in fields.items():
+        payload[field] = [[index, entries[name]] for index, name in enumerate(names) if name in entries]
+    body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+    return base64.b64encode(zlib.compress(body, 6)).decode("ascii")
+
+
+def _decode_chunk(chunk: str) -> Dict[str, Dict[str, Any]]:
+    payload = json.loads(zlib.decompress(base64.b64decode(chunk)))
+    names = payload.pop("names")
+    return {field: {names[index]: value for index, value in pairs} for field, pairs in payload.items()}
+
+
+class StateCodec:
+    """
+    Compact encoding of the per-repository parts of a stream state.
+
+    The fields holding one entry per repository (repositories, slice_stats...) make up most of the
+    state of large workspaces, and the state is serialized again at every checkpoint. Once they
+    cover min_repositories repositories, they are stored as chunks of compressed JSON, each
+    repository going to a chunk by a hash of its name. Chunks are cached: the stream touches the
+    repositories whose entries it changed, and a checkpoint only re-encodes their chunks, so that
+    its cost follows the number of slices completed since the last checkpoint rather than the size
+    of the workspace. Other keys, among which the cursor, are kept as they are, and plain states
+    (written below the threshold or by earlier versions) are read unchanged.
+    """
+
+    def __init__(self, fields: Sequence[str], min_repositories: int = DEFAULT_COMPACT_MIN_REPOSITORIES):
+        self.fields = tuple(fields)
+        self.min_repositories = min_repositories
+        self._chunks: List[Optional[str]] = []
+        self._members: List[Set[str]] = []
+        self._encoded_fields: Optional[Set[str]] = None
+        self._dirty: Set[int] = set()
+
+    def decode(self, state: Mapping[str, Any]) -> Dict[str, Any]:
+        """Expand the compact parts of a state, returning plain states as they are."""
+        self.invalidate()
+        compact = state.get(COMPACT_KEY) if state else None
+        if not isinstance(compact, Mapping):
+            return dict(state or {})
+        if compact.get("v") != VERSION:
+            raise ValueError(f"Unsupported compact state version {compact.get('v')}")
+        decoded = {key: value for key, value in state.items() if key != COMPACT_KEY}
+        for chunk in compact.get("chunks", []):
+            for field, entries in _decode_chunk(chunk).items():
+                decoded.setdefault(field, {}).update(entries)
+        return decoded
+
+    def touch(self, repository: str) -> None:
+        """Mark the entries of a repository as changed since the last encoding."""
+        if self._chunks:
+            chunk = _chunk_of(repository, len(self._chunks))
+            self._members[chunk].add(repository)
+            self._dirty.add(chunk)
+
+    def invalidate(self) -> None:
+        """Forget the encoded chunks, after entries were removed or replaced wholesale."""
+        self._chunks = []
+        self._members = []
+        self._encoded_fields = None
+        self._dirty = set()
+
+    def _rebuild(self, fields: Mapping[str, Mapping[str, Any]], repositories: Set[str]) -> None:
+        chunks = max(1, -(-len(repositories) // CHUNK_REPOSITORIES))
+        self._chunks = [None] * chunks
+        self._members = [set() for _ in range(chunks)]
+        for repository in repositories:
+            self._members[_chunk_of(repository, chunks)].add(repository)
+        self._encoded_fields = set(fields)
+        self._dirty = set(range(chunks))
+
+    def encode(self, state: MutableMapping[str, Any]) -> MutableMapping[str, Any]:
+        """
+        Return the state with its per-repository fields in compact form, once they cover
+        min_repositories repositories, and the state unchanged otherwise.
+        """
+        fields = {field: state[field] for field in self.fields if state.get(field)}
+        largest = max((len(entries) for entries in fields.values()), default=0)
+        if self.min_repositories <= 0 or largest < self.min_repositories:
+            self.invalidate()
+            return state
+
+        if not self._chunks or set(fields) != self._encoded_fields:
+            self._rebuild(fields, set().union(*fields.values()))
+        elif sum(len(members) for members in self._members) > 2 * CHUNK_REPOSITORIES * len(self._chunks):
+            # Chunks grew twice as large as intended: spread the repositories over more of them
+            self._rebuild(fields, set().union(*self._members))
+        for chunk in self._dirty:
+            # Repositories touched after their entries were removed leave the chunk
+            members = {
+                repository
+                for repository in self._members[chunk]
+                if any(repository in entries for entries in fields.values())
+            }
+            self._members[chunk] = members
+            self._chunks[chunk] = _encode_chunk(list(members), fields)
+        self._dirty = set()
+
+        compact = {key: value for key, value in state.items() if key not in fields}
+        compact[COMPACT_KEY] = {"v": VERSION, "chunks": list(self._chunks)}
+        return compact
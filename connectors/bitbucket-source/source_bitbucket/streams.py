@@ -1,11 +1,34 @@
+import queue
+import threading
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, Iterable, List, Mapping, MutableMapping, Optional
-from datetime import datetime, timezone
-from urllib.parse import urlparse
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, List, Mapping, MutableMapping, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, quote, urlencode, urlparse
 
 from airbyte_cdk import BasicHttpAuthenticator, SyncMode
+from airbyte_cdk.models import Type
 import requests
-from airbyte_cdk.sources.streams.http import HttpStream
+from airbyte_cdk.sources.message import InMemoryMessageRepository
+from airbyte_cdk.sources.streams.call_rate import APIBudget
+from airbyte_cdk.sources.streams.checkpoint import ResumableFullRefreshCursor
+from airbyte_cdk.sources.streams.http import HttpClient, HttpStream
+from airbyte_cdk.sources.streams.http.error_handlers import ErrorHandler
+
+from .breaker import DEFAULT_MAX_FAILURES, DEFAULT_SLOW_REQUEST_SECONDS, SliceBreaker, SliceBreakerErrorHandler
+from .detail_cache import DetailCache
+from .events import EventQueue
+from .paging import PageSizeErrorHandler, PageSizer
+from .prefetch import DEFAULT_PREFETCH_PAGES, decoded, prefetch_pages
+from .profiling import Profiler
+from .projection import project_records, stream_projection
+from .scheduling import SliceScheduler
+from .state_codec import DEFAULT_COMPACT_MIN_REPOSITORIES, StateCodec
+from .timestamps import comparable_timestamp, normalize_timestamp
 
 
 class BitbucketStream(HttpStream, ABC):
@@ -14,6 +37,9 @@ class BitbucketStream(HttpStream, ABC):
     Implements common functionality including cursor-based pagination and rate limiting.
     """
 
+    # Largest pagelen the endpoint accepts
+    max_page_size = 100
+
     # Bitbucket uses cursor-based pagination with a 'next' URL in responses
     @property
     def url_base(self) -> str:
@@ -21,29 +47,108 @@ class BitbucketStream(HttpStream, ABC):
 
     @property
     def page_size(self) -> int:
-        return 100
+        """Page size of the next slice, adapted to the endpoint's responses within the configured page_size."""
+        return self._page_sizer.size
 
     def __init__(
-        self, config: Mapping[str, Any], authenticator: BasicHttpAuthenticator, **kwargs
+        self,
+        config: Mapping[str, Any],
+        authenticator: BasicHttpAuthenticator,
+        session: Optional[requests.Session] = None,
+        profiler: Optional[Profiler] = None,
+        **kwargs,
     ):
-        super().__init__(authenticator=authenticator, **kwargs)
+        # Created first, the error handler built by HttpStream.__init__ lowers it on timeouts
+        self._page_sizer = PageSizer(
+            self.name, min(self.max_page_size, int(config.get("page_size") or self.max_page_size)), self.logger
+        )
+        if session is None:
+            session = requests.Session()
+            session.auth = authenticator
+        # The connector-wide connection pool, authenticated by build_session, unless the stream has a session of its own
+        self._session = session
+        self._init_http_stream(session, **kwargs)
         self.config = config
         self.workspace = config["workspace"]
         self.start_date = config.get("start_date", "2020-01-01T00:00:00Z")
+        self.num_workers = max(1, int(config.get("num_workers", 1)))
+        self.prefetch_pages = max(0, int(config.get("prefetch_pages", DEFAULT_PREFETCH_PAGES)))
+        # The profiler shared by the streams of the connector, reporting on all of them at the end of the sync
+        self._profiler = profiler
+        if self._profiler:
+            self._profiler.instrument(
+                self,
+                {
+                    "_fetch_next_page": "fetch_page",
+                    "parse_response": "parse_response",
+                    "next_page_token": "next_page_token",
+                    "add_cursor_field": "add_cursor_field",
+                    "enrich_with_environment": "environment_enrichment",
+                    "enrich_pull_requests": "detail_enrichment",
+                },
+            )
+
+    def _init_http_stream(self, session: requests.Session, api_budget: Optional[APIBudget] = None) -> None:
+        """
+        Initialize the stream as HttpStream.__init__ does, with an HTTP client sending its requests
+        through the given session, which already carries the authenticator, instead of a session
+        the CDK would create for the stream.
+        """
+        self._exit_on_rate_limit = False
+        self._http_client = HttpClient(
+            name=self.name,
+            logger=self.logger,
+            error_handler=self.get_error_handler(),
+            api_budget=api_budget or APIBudget(policies=[]),
+            session=session,
+            use_cache=self.use_cache,
+            backoff_strategy=self.get_backoff_strategy(),
+            message_repository=InMemoryMessageRepository(),
+        )
+        if not self.cursor and len(self.cursor_field) == 0 and type(self).read_records is HttpStream.read_records:
+            self.cursor = ResumableFullRefreshCursor()
+
+    def get_error_handler(self) -> Optional[ErrorHandler]:
+        """Shrink the page size when requests time out, on top of the should_retry handling."""
+        return PageSizeErrorHandler(super().get_error_handler(), self._page_sizer)
 
     def next_page_token(self, response: requests.Response) -> Optional[Mapping[str, Any]]:
         """
         Bitbucket uses cursor-based pagination with a 'next' URL.
         The next URL is a complete URL, not just a token.
+        The page is measured to adapt the page size, which the next URL is rewritten to when possible.
         """
-        json_response = response.json()
+        json_response = decoded(response)
         next_url = json_response.get("next")
+        self._page_sizer.observe_response(response, "pagelen", len(json_response.get("values", [])))
 
         if next_url:
             # Return the full next URL - we'll use it in request_path
-            return {"next_url": next_url}
+            return {"next_url": self._resize_next_url(next_url)}
         return None
 
+    def _resize_next_url(self, next_url: str) -> str:
+        """
+        Rewrite a next URL to the current page size. Numbered pages start at (page - 1) * pagelen,
+        so the URL is only rewritten once a page boundary of the new size falls on that offset;
+        other pagination (such as the commit hashes of the commits endpoint) keeps its size.
+        """
+        parsed = urlparse(next_url)
+        # A list of pairs keeps repeated parameters, such as the states of pull requests
+        pairs = parse_qsl(parsed.query, keep_blank_values=True)
+        query = dict(pairs)
+        try:
+            pagelen = int(query["pagelen"])
+            offset = (int(query["page"]) - 1) * pagelen
+        except (KeyError, ValueError):
+            return next_url
+        size = self._page_sizer.aligned(offset)
+        if not size or size == pagelen:
+            return next_url
+        resized = {"page": str(offset // size + 1), "pagelen": str(size)}
+        pairs = [(key, resized.get(key, value)) for key, value in pairs]
+        return parsed._replace(query=urlencode(pairs, quote_via=quote)).geturl()
+
     def request_params(
         self,
         stream_state: Optional[Mapping[str, Any]],
@@ -90,6 +195,37 @@ class BitbucketStream(HttpStream, ABC):
         """
         raise NotImplementedError("Subclasses must implement get_path()")
 
+    @property
+    def session(self) -> requests.Session:
+        """The authenticated session used by this stream, for requests made outside of pagination."""
+        return self._session
+
+    def read(self, configured_stream, logger, slice_logger, stream_state, state_manager, internal_config):
+        """
+        Trim records to the fields of the configured catalog before they are serialized,
+        and profile the read of the stream when profiling is enabled.
+        """
+        records = super().read(configured_stream, logger, slice_logger, stream_state, state_manager, internal_config)
+        projection = stream_projection(self, configured_stream)
+        if projection:
+            records = project_records(records, projection)
+        if self._profiler:
+            yield from self._profiler.profile_stream(self.name, records)
+        else:
+            yield from records
+
+    def profile_slice(self, stream_slice: Optional[Mapping[str, Any]]):
+        """Context in which a slice is read, profiled on its own when slice profiling is enabled."""
+        return self._profiler.profile_slice(stream_slice) if self._profiler else nullcontext()
+
+    def profile_thread(self, function: Callable[..., Any]) -> Callable[..., Any]:
+        """A function run by a worker thread of the stream, profiled with the stream when profiling is enabled."""
+        return self._profiler.profile_thread(function) if self._profiler else function
+
+    def timed(self, function: Callable[..., Any], section: str) -> Callable[..., Any]:
+        """A function whose calls are recorded in a section timer when profiling is enabled."""
+        return self._profiler.timed(function, section) if self._profiler else function
+
     def parse_response(
         self,
         response: requests.Response,
@@ -101,7 +237,7 @@ class BitbucketStream(HttpStream, ABC):
         """
         Parse the response and extract records from 'values' array.
         """
-        json_response = response.json()
+        json_response = decoded(response)
         records = json_response.get("values", [])
 
         for record in records:
@@ -143,6 +279,20 @@ class RepositoriesStream(BitbucketStream):
     def get_path(self, stream_slice: Optional[Mapping[str, Any]] = None) -> str:
         return f"repositories/{self.workspace}"
 
+    def read_all_repositories(self) -> Iterable[Mapping[str, Any]]:
+        """
+        Page through every repository in the workspace.
+        Used by substreams for slicing, independently of this stream's resumable full refresh state
+        (read_records() only returns a single page for resumable full refresh streams).
+        """
+        yield from self._read_pages(
+            lambda request, response, state, _slice: self.parse_response(
+                response, stream_state=state, stream_slice=_slice
+            ),
+            None,
+            {},
+        )
+
 
 class IncrementalBitbucketStream(BitbucketStream, ABC):
     """
@@ -158,18 +308,94 @@ class IncrementalBitbucketStream(BitbucketStream, ABC):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self._cursor_value = None
+        self._scheduler = SliceScheduler()
+        self._start_bound_source = None
+        self._start_bound_value = None
+        # Highest cursor emitted by the slice in progress, in comparable form
+        self._slice_cursor: Optional[str] = None
+        # Filter bound of the current sync attempt and, within a slice, the last checkpointed page
+        self._resume: Optional[Dict[str, Any]] = None
+        self._state_manager = None
+        self.checkpoint_interval_pages = max(1, int(self.config.get("checkpoint_interval_pages", 10)))
 
     @property
     def state(self) -> MutableMapping[str, Any]:
         """Return the current stream state."""
+        state = {}
         if self._cursor_value:
-            return {self.cursor_field: self._cursor_value}
-        return {}
+            state[self.cursor_field] = self._cursor_value
+        slice_stats = self._scheduler.stats
+        if slice_stats:
+            state["slice_stats"] = slice_stats
+        if self._resume:
+            state["resume"] = dict(self._resume)
+        if self.page_size != self._page_sizer.maximum:
+            state["page_size"] = self.page_size
+        return state
 
     @state.setter
     def state(self, value: MutableMapping[str, Any]):
         """Set the stream state."""
-        self._cursor_value = value.get(self.cursor_field)
+        cursor_value = value.get(self.cursor_field)
+        # Cursors are kept in normalized form; older states may hold the raw API value
+        self._cursor_value = normalize_timestamp(cursor_value) or cursor_value if cursor_value else None
+        self._scheduler = SliceScheduler(value.get("slice_stats"))
+        self._resume = value.get("resume")
+        self._page_sizer.restore(value.get("page_size"))
+
+    @property
+    def slice_stats(self) -> Mapping[str, Mapping[str, Any]]:
+        """Pages read and seconds taken by the last slice of each repository, as of the previous sync and this one."""
+        return self._scheduler.stats
+
+    def read(self, configured_stream, logger, slice_logger, stream_state, state_manager, internal_config):
+        """Keep the state manager at hand so that long slices can checkpoint their pagination."""
+        self._state_manager = state_manager
+        try:
+            yield from super().read(configured_stream, logger, slice_logger, stream_state, state_manager, internal_config)
+        finally:
+            self._state_manager = None
+
+    def _read_pages(
+        self,
+        records_generator_fn: Callable[..., Iterable[Mapping[str, Any]]],
+        stream_slice: Optional[Mapping[str, Any]] = None,
+        stream_state: Optional[Mapping[str, Any]] = None,
+    ) -> Iterable[Any]:
+        """
+        Paginate through a slice, checkpointing the next page URL and the number of records emitted
+        every checkpoint_interval_pages pages. A slice interrupted in a previous attempt continues
+        from its last checkpointed page. The next prefetch_pages pages are fetched while the records
+        of a page are emitted.
+        """
+        stream_state = stream_state or {}
+        next_page_token = None
+        records = 0
+        if self._resume and self._resume.get("slice") == stream_slice:
+            next_page_token = self._resume.get("next_page_token")
+            records = self._resume.get("records", 0)
+            self.logger.info(f"Resuming {self.name} slice {stream_slice} after {records} records")
+
+        pages = 0
+        for request, response, next_page_token in prefetch_pages(
+            lambda page_token: self._fetch_next_page(stream_slice, stream_state, page_token),
+            self.next_page_token,
+            next_page_token,
+            self.prefetch_pages,
+            self.profile_thread,
+        ):
+            for record in records_generator_fn(request, response, stream_state, stream_slice):
+                records += 1
+                yield record
+
+            if not next_page_token:
+                break
+
+            pages += 1
+            if self._resume is not None and pages % self.checkpoint_interval_pages == 0:
+                self._resume.update(slice=dict(stream_slice or {}), next_page_token=next_page_token, records=records)
+                if self._state_manager:
+                    yield self._checkpoint_state(self.state, state_manager=self._state_manager)
 
     def parse_response(
         self,
@@ -182,13 +408,7 @@ class IncrementalBitbucketStream(BitbucketStream, ABC):
         """
         Parse response and apply client-side incremental filtering.
         """
-        start_date = stream_state.get(self.cursor_field, self.start_date) if stream_state else self.start_date
-
-        # Parse start_date to datetime for comparison
-        if isinstance(start_date, str):
-            start_dt = datetime.fromisoformat(start_date.replace('Z', '+00:00'))
-        else:
-            start_dt = datetime(2020, 1, 1, tzinfo=timezone.utc)
+        start_bound = self._start_bound(stream_state, stream_slice)
 
         for record in super().parse_response(
             response,
@@ -199,22 +419,40 @@ class IncrementalBitbucketStream(BitbucketStream, ABC):
             # Add cursor field to record
             record_with_cursor = self.add_cursor_field(record)
 
-            # Filter by start date (client-side incremental)
+            # Filter by start date (client-side incremental), comparing timestamps as strings
             cursor_value = record_with_cursor.get(self.cursor_field)
-            if cursor_value:
-                try:
-                    record_dt = datetime.fromisoformat(cursor_value.replace('Z', '+00:00'))
-                    if record_dt >= start_dt:
-                        # Update cursor
-                        if not self._cursor_value or cursor_value > self._cursor_value:
-                            self._cursor_value = cursor_value
-                        yield record_with_cursor
-                except (ValueError, AttributeError):
-                    # If date parsing fails, include the record
-                    yield record_with_cursor
-            else:
+            comparable = comparable_timestamp(cursor_value) if isinstance(cursor_value, str) else None
+            if comparable is None:
+                # If there is no cursor or date parsing fails, include the record
+                yield record_with_cursor
+            elif comparable >= start_bound:
+                if self._slice_cursor is None or comparable > self._slice_cursor:
+                    self._slice_cursor = comparable
+                # Update cursor, normalizing only values that may move it
+                if not self._cursor_value or comparable > self._cursor_value:
+                    normalized = normalize_timestamp(comparable)
+                    if normalized and (not self._cursor_value or normalized > self._cursor_value):
+                        self._cursor_value = normalized
                 yield record_with_cursor
 
+    def _start_bound(
+        self, stream_state: Optional[Mapping[str, Any]], stream_slice: Optional[Mapping[str, Any]] = None
+    ) -> str:
+        """
+        Return the lower bound for client-side filtering, as the second-precision prefix of its normalized form.
+        The bound only changes between slices, so it is normalized once rather than on every page.
+        """
+        start_date = stream_state.get(self.cursor_field, self.start_date) if stream_state else self.start_date
+        if self._resume and self._resume.get(self.cursor_field):
+            # Keep the bound of the sync attempt that was interrupted, the stored cursor already moved past it
+            start_date = self._resume[self.cursor_field]
+
+        if start_date != self._start_bound_source:
+            self._start_bound_source = start_date
+            normalized = normalize_timestamp(start_date) if isinstance(start_date, str) else None
+            self._start_bound_value = (normalized or "2020-01-01T00:00:00.000000Z")[:19]
+        return self._start_bound_value
+
     @abstractmethod
     def add_cursor_field(self, record: Mapping[str, Any]) -> Mapping[str, Any]:
         """
@@ -223,7 +461,502 @@ class IncrementalBitbucketStream(BitbucketStream, ABC):
         raise NotImplementedError("Subclasses must implement add_cursor_field()")
 
 
-class PullRequestsStream(IncrementalBitbucketStream):
+# Keys of the resume state locating a slice in progress, the others holding the bounds of the sync attempt
+SLICE_RESUME_KEYS = ("slice", "next_page_token", "records")
+
+
+class RepositorySubstream(IncrementalBitbucketStream, ABC):
+    """
+    Base class for incremental streams sliced by the repositories of the workspace.
+    Slices are ordered by the SliceScheduler so that the most expensive repositories start first.
+    """
+
+    # State keys holding one entry per repository, stored compactly for large workspaces
+    repository_state_fields: Tuple[str, ...] = (
+        "repositories",
+        "repository_cursors",
+        "slice_stats",
+        "failed_slices",
+        "listing",
+    )
+
+    def __init__(self, parent_stream: RepositoriesStream, **kwargs):
+        # Created first, the error handler built by HttpStream.__init__ counts the failures of each slice
+        config = kwargs["config"]
+        self._breaker = SliceBreaker(
+            int(config.get("slice_max_failures", DEFAULT_MAX_FAILURES)),
+            float(config.get("slice_slow_request_seconds") or DEFAULT_SLOW_REQUEST_SECONDS),
+        )
+        super().__init__(**kwargs)
+        self.parent_stream = parent_stream
+        self.full_scan_interval_days = int(self.config.get("full_scan_interval_days", 7))
+        self._pages_read = 0
+        self._slices_remaining = 0
+        # Repository updated_on as of the last completed slice of each repository
+        self._repositories: Dict[str, Optional[str]] = {}
+        # Cursor of each repository: the highest cursor its last completed slice emitted, and at least
+        # the bound that slice was read from, so that a repository is read from where it was left
+        # however far the records of other repositories moved the stream cursor
+        self._repository_cursors: Dict[str, str] = {}
+        # Repository updated_on as listed at the start of this sync
+        self._listed_repositories: Dict[str, Optional[str]] = {}
+        # Repositories of the last listing (uuid, updated_on and size by full name), slicing the next
+        # sync while the listing is refreshed in the background
+        self.cached_repository_list = bool(self.config.get("cached_repository_list", True))
+        self._listing: Dict[str, Dict[str, Any]] = {}
+        self._refresh: Optional[Future] = None
+        self._last_full_scan: Optional[str] = None
+        self._full_scan = False
+        # Webhook events of the repositories, when syncs are driven by them; opened when slicing
+        self.event_spool_file = self.config.get("event_spool_file")
+        self._events: Optional[EventQueue] = None
+        self._slice_started_at = 0.0
+        self._slices_read = 0
+        # Slices deferred by their circuit breaker to the end of the stream, and whether they are being retried
+        self._deferred: List[Mapping[str, Any]] = []
+        self._retrying = False
+        # Repositories whose slice failed even when retried, with the bound to read them from on the next sync
+        self._failed_slices: Dict[str, Dict[str, Any]] = {}
+        self._state_codec = StateCodec(
+            self.repository_state_fields,
+            int(self.config.get("compact_state_min_repositories", DEFAULT_COMPACT_MIN_REPOSITORIES)),
+        )
+
+    @property
+    def state(self) -> MutableMapping[str, Any]:
+        """Return the current stream state, its per-repository entries compacted for large workspaces."""
+        return self._state_codec.encode(self._get_state())
+
+    @state.setter
+    def state(self, value: MutableMapping[str, Any]):
+        """Set the stream state, in plain or compact form."""
+        self._set_state(self._state_codec.decode(value))
+
+    def _get_state(self) -> MutableMapping[str, Any]:
+        """The stream state in plain form, including the activity of the repositories already synced."""
+        state = IncrementalBitbucketStream.state.fget(self)
+        if self._repositories:
+            state["repositories"] = self._repositories
+        if self._repository_cursors:
+            state["repository_cursors"] = self._repository_cursors
+        if self._last_full_scan:
+            state["last_full_scan"] = self._last_full_scan
+        if self._failed_slices:
+            state["failed_slices"] = self._failed_slices
+        if self._listing:
+            state["listing"] = self._listing
+        return state
+
+    def _set_state(self, value: Mapping[str, Any]) -> None:
+        IncrementalBitbucketStream.state.fset(self, value)
+        self._repositories = dict(value.get("repositories") or {})
+        self._repository_cursors = dict(value.get("repository_cursors") or {})
+        self._last_full_scan = value.get("last_full_scan")
+        self._failed_slices = dict(value.get("failed_slices") or {})
+        self._listing = dict(value.get("listing") or {})
+
+    @property
+    def failed_repositories(self) -> List[str]:
+        """Repositories whose slice failed even when retried, read again by the next sync."""
+        return list(self._failed_slices)
+
+    def get_error_handler(self) -> Optional[ErrorHandler]:
+        """Open the slice's circuit breaker once it spent its failure budget."""
+        return SliceBreakerErrorHandler(super().get_error_handler(), self._breaker)
+
+    def read(self, configured_stream, logger, slice_logger, stream_state, state_manager, internal_config):
+        """
+        Close the event queue once the stream is read. When every repository was skipped, the CDK's
+        only state message is the incoming state, which the stream's own state replaces: the listing
+        pruned the repositories that are gone and the sync attempt's bound was dropped since.
+        """
+        self._slices_read = 0
+        incremental = configured_stream.sync_mode == SyncMode.incremental
+        try:
+            for message in super().read(configured_stream, logger, slice_logger, stream_state, state_manager, internal_config):
+                if incremental and not self._slices_read and getattr(message, "type", None) == Type.STATE:
+                    continue
+                yield message
+            if incremental and not self._slices_read:
+                yield self._checkpoint_state(self.state, state_manager=state_manager)
+        finally:
+            self._refresh = None
+            if self._events is not None:
+                self._events.close()
+                self._events = None
+
+    def full_scan_due(self) -> bool:
+        """
+        Whether this sync reads every repository. Skipping unchanged repositories relies on
+        updated_on, which not every kind of activity bumps, or on webhook events, which may be
+        lost, so every repository is read again once full_scan_interval_days have passed since
+        the last full scan. Each repository is read from its own cursor, so that the scan finds
+        the records the skipped syncs missed.
+        """
+        if not self._cursor_value or not self._last_full_scan or self.full_scan_interval_days <= 0:
+            return True
+        due = datetime.now(timezone.utc) - timedelta(days=self.full_scan_interval_days)
+        return normalize_timestamp(due.isoformat()) >= self._last_full_scan
+
+    def _skip_unchanged(self, repositories: List[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+        """
+        Record the updated_on of the listed repositories and, unless a full scan is due, leave out
+        those that have not changed since their last completed slice.
+        """
+        self._listed_repositories = {repo["full_name"]: repo.get("updated_on") for repo in repositories}
+        # Forget repositories that were deleted or moved out of the workspace
+        self._repositories = {
+            name: updated_on for name, updated_on in self._repositories.items() if name in self._listed_repositories
+        }
+        self._repository_cursors = {
+            name: cursor for name, cursor in self._repository_cursors.items() if name in self._listed_repositories
+        }
+
+        self._state_codec.invalidate()
+
+        self._full_scan = self.full_scan_due()
+        pending = self._events.pending(self.name) if self._events is not None else None
+        active = self._active_repositories(repositories, pending)
+        if self._full_scan:
+            return active
+        if pending is not None:
+            self.logger.info(
+                f"Reading {len(active)} of {len(repositories)} repositories with {self.name} events since their last sync"
+            )
+        else:
+            self.logger.info(
+                f"Skipping {len(repositories) - len(active)} of {len(repositories)} repositories "
+                f"without activity since their last {self.name} sync"
+            )
+        return active
+
+    def _active_repositories(
+        self, repositories: List[Mapping[str, Any]], pending: Optional[Mapping[str, float]]
+    ) -> List[Mapping[str, Any]]:
+        """
+        The repositories a sync reads: all of them when a full scan is due, those with webhook
+        events when syncs are driven by them (pending holding the events not synced yet), and
+        otherwise those whose updated_on changed since their last completed slice. Repositories
+        whose slice failed are read again in any case.
+        """
+        if self.full_scan_due():
+            return list(repositories)
+        if pending is not None:
+            return self._with_events(repositories, pending)
+        return [
+            repo
+            for repo in repositories
+            if not repo.get("updated_on")
+            or self._repositories.get(repo["full_name"]) != repo["updated_on"]
+            or repo["full_name"] in self._failed_slices
+        ]
+
+    def _with_events(
+        self, repositories: List[Mapping[str, Any]], pending: Mapping[str, float]
+    ) -> List[Mapping[str, Any]]:
+        """
+        Keep the repositories with webhook events not synced yet by this stream, those that were
+        never synced, whose history no event announces, and those whose slice failed. Event-driven
+        syncs and the full scans reconciling them read each repository from its own cursor: a
+        repository synced before repositories had one is read once more to get it, since a lost
+        event would otherwise leave it to the stream cursor, which other repositories moved on.
+        """
+        return [
+            repo
+            for repo in repositories
+            if repo["full_name"] in pending
+            or repo["full_name"] not in self._repository_cursors
+            or repo["full_name"] in self._failed_slices
+        ]
+
+    def planned_slices(self, repositories: List[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+        """
+        The slices the next sync would read from the given listing, in the order it would read
+        them, the slice interrupted in a previous attempt first. The stream is left unchanged, and
+        the events of the spool file are counted without ingesting it.
+        """
+        pending = None
+        events = EventQueue.from_config(self.config)
+        if events is not None:
+            try:
+                pending = events.pending(self.name, self.event_spool_file)
+            finally:
+                events.close()
+        slices = self._ordered_slices(self._active_repositories(repositories, pending))
+        interrupted = (self._resume or {}).get("slice")
+        if interrupted in slices:
+            slices.remove(interrupted)
+            slices.insert(0, interrupted)
+        return slices
+
+    def _ordered_slices(self, repositories: List[Mapping[str, Any]]) -> List[Mapping[str, Any]]:
+        return [{"repository": repo["full_name"]} for repo in self._scheduler.order(repositories)]
+
+    def _open_events(self) -> None:
+        """Open the event queue when syncs are driven by webhook events, queueing the spooled events first."""
+        if self._events is None:
+            self._events = EventQueue.from_config(self.config)
+        if self._events is not None and self.event_spool_file:
+            queued = self._events.ingest_spool(self.event_spool_file)
+            if queued:
+                self.logger.info(f"Queued {queued} events from {self.event_spool_file}")
+
+    def stream_slices(
+        self,
+        sync_mode: SyncMode,
+        cursor_field: Optional[List[str]] = None,
+        stream_state: Optional[Mapping[str, Any]] = None,
+    ) -> Iterable[Optional[Mapping[str, Any]]]:
+        """
+        Generate slices based on parent repositories, most expensive first, leaving out repositories
+        without activity (or webhook events) since their last sync. A slice interrupted in a previous
+        attempt is resumed first. Slices deferred by their circuit breaker are retried once at the end.
+
+        When the state holds the listing of the previous sync, slicing starts from it while the
+        repositories are listed again in the background, and the slices are brought up to date with
+        the new listing once it is done, at the latest before the last slice.
+        """
+        self._open_events()
+        self._refresh = None
+        if self.cached_repository_list and self._listing:
+            executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="repository-listing")
+            self._refresh = executor.submit(lambda: list(self.parent_stream.read_all_repositories()))
+            executor.shutdown(wait=False)
+            repositories = self._skip_unchanged(self._cached_repositories())
+        else:
+            listed = list(self.parent_stream.read_all_repositories())
+            self._record_listing(listed)
+            repositories = self._skip_unchanged(listed)
+        slices = self._ordered_slices(repositories)
+
+        if not self._resume:
+            self._resume = {self.cursor_field: self._cursor_value or self.start_date}
+        interrupted = self._resume.pop("slice", None)
+        if interrupted in slices:
+            slices.remove(interrupted)
+            slices.insert(0, interrupted)
+            self._resume["slice"] = interrupted
+        else:
+            for key in SLICE_RESUME_KEYS:
+                self._resume.pop(key, None)
+
+        self._plan_slices(slices)
+        self._slices_remaining = len(slices)
+        self._deferred = []
+        if self._refresh is None:
+            yield from slices
+        else:
+            yield from self._refreshed_slices(slices)
+
+        # Deferred slices are appended to as the slices are read, the retry pass starts once all were
+        deferred, self._deferred = self._deferred, []
+        if deferred:
+            self.logger.info(f"Retrying {len(deferred)} {self.name} slices deferred by their circuit breaker")
+            self._retrying = True
+            try:
+                yield from deferred
+            finally:
+                self._retrying = False
+        if self._slices_remaining <= 0:
+            # Without any slice to read, no slice dropped the bound of the sync attempt
+            self._resume = None
+        failed = [stream_slice["repository"] for stream_slice in deferred if stream_slice["repository"] in self._failed_slices]
+        if failed:
+            self.logger.warning(
+                f"{self.name} of {len(failed)} repositories could not be read and will be read again on the next sync: "
+                + "; ".join(f"{repository} ({self._failed_slices[repository]['error']})" for repository in failed)
+            )
+
+    def _record_listing(self, repositories: List[Mapping[str, Any]]) -> None:
+        """Keep the listed repositories in state, for the next sync to slice from."""
+        self._listing = {
+            repo["full_name"]: {"uuid": repo.get("uuid"), "updated_on": repo.get("updated_on"), "size": repo.get("size")}
+            for repo in repositories
+        }
+
+    def _cached_repositories(self) -> List[Mapping[str, Any]]:
+        """The repositories of the listing kept in state by the previous sync."""
+        return [{"full_name": name, **entry} for name, entry in self._listing.items()]
+
+    def _refreshed_slices(self, slices: List[Mapping[str, Any]]) -> Iterable[Mapping[str, Any]]:
+        """
+        Yield the slices of the cached listing, applying the refreshed listing as soon as it is
+        done: before the last slice is handed out, so that the slices it adds are counted before
+        the sync attempt's bound is dropped after the last slice.
+        """
+        pending = deque(slices)
+        yielded = set()
+        refresh = self._refresh
+        while pending or refresh is not None:
+            if refresh is not None and (refresh.done() or len(pending) <= 1):
+                self._apply_refresh(refresh.result(), pending, yielded)
+                refresh = None
+                continue
+            stream_slice = pending.popleft()
+            yielded.add(stream_slice["repository"])
+            yield stream_slice
+
+    def _apply_refresh(
+        self, repositories: List[Mapping[str, Any]], pending: "deque[Mapping[str, Any]]", yielded: set
+    ) -> None:
+        """
+        Bring the slices not handed out yet up to date with the refreshed listing: drop those of
+        repositories no longer listed, and add those of repositories that are new or changed since
+        the cached listing, most expensive first.
+        """
+        self._record_listing(repositories)
+        active = self._skip_unchanged(repositories)
+        removed = [stream_slice for stream_slice in pending if stream_slice["repository"] not in self._listed_repositories]
+        for stream_slice in removed:
+            pending.remove(stream_slice)
+        planned = yielded | {stream_slice["repository"] for stream_slice in pending}
+        added = [
+            stream_slice for stream_slice in self._ordered_slices(active) if stream_slice["repository"] not in planned
+        ]
+        pending.extend(added)
+        self._slices_remaining += len(added) - len(removed)
+        self.logger.info(
+            f"Refreshed the repository listing of {self.name}: {len(added)} slices of new or changed repositories added, "
+            f"{len(removed)} slices of removed repositories dropped"
+        )
+
+    def _removed_repository(self, repository: str) -> bool:
+        """Whether a repository sliced from the cached listing is missing from the refreshed one."""
+        if self._refresh is None:
+            return False
+        return all(repo["full_name"] != repository for repo in self._refresh.result())
+
+    def _plan_slices(self, slices: List[Mapping[str, Any]]) -> None:
+        """Prepare the reading of the slices of this sync, once they are known."""
+
+    def _start_bound(
+        self, stream_state: Optional[Mapping[str, Any]], stream_slice: Optional[Mapping[str, Any]] = None
+    ) -> str:
+        """
+        Read a repository from its own cursor when the stream's bound moved past it, and a
+        repository whose slice failed in a previous sync from the bound of that sync.
+        """
+        bound = super()._start_bound(stream_state, stream_slice)
+        floor = self._repository_floor(stream_slice)
+        return min(bound, floor) if floor else bound
+
+    def _repository_floor(self, stream_slice: Optional[Mapping[str, Any]]) -> Optional[str]:
+        """The lowest of the repository's cursor and failed bound, below which its slice is not read."""
+        bounds = [bound for bound in (self._repository_bound(stream_slice), self._failed_bound(stream_slice)) if bound]
+        return min(bounds) if bounds else None
+
+    def _repository_bound(self, stream_slice: Optional[Mapping[str, Any]]) -> Optional[str]:
+        """The cursor of the slice's repository, as a bound prefix."""
+        cursor = self._repository_cursors.get((stream_slice or {}).get("repository"))
+        return cursor[:19] if cursor else None
+
+    def _failed_bound(self, stream_slice: Optional[Mapping[str, Any]]) -> Optional[str]:
+        """The bound a repository whose slice failed in a previous sync was read from, as a bound prefix."""
+        failed = self._failed_slices.get((stream_slice or {}).get("repository"))
+        failed_bound = normalize_timestamp(failed.get(self.cursor_field) or "") if failed else None
+        return failed_bound[:19] if failed_bound else None
+
+    def next_page_token(self, response: requests.Response) -> Optional[Mapping[str, Any]]:
+        """Count pages per slice for the scheduler statistics."""
+        self._pages_read += 1
+        return super().next_page_token(response)
+
+    def read_records(
+        self,
+        sync_mode: SyncMode,
+        cursor_field: Optional[List[str]] = None,
+        stream_slice: Optional[Mapping[str, Any]] = None,
+        stream_state: Optional[Mapping[str, Any]] = None,
+    ) -> Iterable[Mapping[str, Any]]:
+        """Read a repository slice, recording its duration for the next sync's scheduling."""
+        repository = (stream_slice or {}).get("repository")
+        self._pages_read = 0
+        # A resumed slice skips the pages read before the interruption: events received since the
+        # slice first started may concern those pages, so the repository stays queued
+        resumed = bool(self._resume and self._resume.get("slice") == stream_slice)
+        self._slice_started_at = 0.0 if resumed else time.time()
+        self._breaker.reset()
+        self._slice_cursor = None
+        self._slices_read += 1
+        self._scheduler.start(repository)
+        try:
+            with self.profile_slice(stream_slice):
+                yield from super().read_records(
+                    sync_mode=sync_mode,
+                    cursor_field=cursor_field,
+                    stream_slice=stream_slice,
+                    stream_state=stream_state,
+                )
+        except Exception:
+            if self._removed_repository(repository):
+                # Sliced from the cached listing, the repository was deleted or moved out of the workspace since
+                self.logger.info(f"Dropping {self.name} of {repository}, no longer in the workspace")
+                self._finish_slice()
+                return
+            if not self._breaker.open:
+                raise
+            self._defer_slice(stream_slice, stream_state)
+            return
+        self._scheduler.finish(repository, self._pages_read)
+        self._repositories[repository] = self._listed_repositories.get(repository)
+        self._advance_repository_cursor(repository, stream_state, stream_slice)
+        self._failed_slices.pop(repository, None)
+        self._state_codec.touch(repository)
+        if self._events is not None:
+            self._events.acknowledge(self.name, repository, self._slice_started_at)
+        self._finish_slice()
+
+    def _advance_repository_cursor(
+        self, repository: str, stream_state: Optional[Mapping[str, Any]], stream_slice: Mapping[str, Any]
+    ) -> None:
+        """Move the cursor of a repository whose slice completed to the highest cursor the slice emitted."""
+        cursor = self._start_bound(stream_state, stream_slice) + ".000000Z"
+        emitted = normalize_timestamp(self._slice_cursor) if self._slice_cursor else None
+        if emitted and emitted > cursor:
+            cursor = emitted
+        if cursor > self._repository_cursors.get(repository, ""):
+            self._repository_cursors[repository] = cursor
+
+    def _defer_slice(self, stream_slice: Mapping[str, Any], stream_state: Optional[Mapping[str, Any]]) -> None:
+        """
+        Set aside a slice whose circuit breaker opened: to the end of the stream the first time, and
+        until the next sync when it fails again, recording the bound its records were read from.
+        The slice is read again from its first page.
+        """
+        repository = stream_slice["repository"]
+        if self._resume is not None:
+            self._resume = self._attempt_resume()
+        if not self._retrying:
+            self.logger.warning(f"Deferring {self.name} of {repository} to the end of the stream: {self._breaker.reason}")
+            self._deferred.append(stream_slice)
+            return
+
+        self.logger.warning(f"Giving up on {self.name} of {repository} for this sync: {self._breaker.reason}")
+        self._failed_slices[repository] = {
+            self.cursor_field: self._start_bound(stream_state, stream_slice) + ".000000Z",
+            "error": self._breaker.reason,
+            "failed_at": normalize_timestamp(datetime.now(timezone.utc).isoformat()),
+        }
+        self._state_codec.touch(repository)
+        self._finish_slice()
+
+    def _attempt_resume(self) -> Dict[str, Any]:
+        """The resume state of the sync attempt, without the position within the slice just done with."""
+        return {key: value for key, value in self._resume.items() if key not in SLICE_RESUME_KEYS}
+
+    def _finish_slice(self) -> None:
+        """A slice is done with: forget its pagination, and the sync attempt's bound after the last slice."""
+        self._slices_remaining -= 1
+        if self._resume is not None and self._slices_remaining > 0:
+            self._resume = self._attempt_resume()
+        else:
+            self._resume = None
+            # A scan that left repositories out is not a full scan
+            if self._full_scan and not self._failed_slices:
+                self._last_full_scan = normalize_timestamp(datetime.now(timezone.utc).isoformat())
+
+
+class PullRequestsStream(RepositorySubstream):
     """
     Stream for pull requests in repositories.
     Supports incremental sync based on updated_on field.
@@ -239,13 +972,232 @@ class PullRequestsStream(IncrementalBitbucketStream):
     def name(self) -> str:
         return "pull_requests"
 
-    @property
-    def page_size(self) -> int:
-        return 50
+    max_page_size = 50
+
+    # States a pull request can be in; the endpoint only returns OPEN ones unless asked for others
+    states = ("OPEN", "MERGED", "DECLINED", "SUPERSEDED")
 
     def __init__(self, parent_stream: RepositoriesStream, **kwargs):
-        super().__init__(**kwargs)
-        self.parent_stream = parent_stream
+        super().__init__(parent_stream=parent_stream, **kwargs)
+        configured_states = self.config.get("pull_request_states") or self.states
+        self.pull_request_states = [state for state in self.states if state in configured_states]
+        # Cursor of each pull request state, so that a state added to pull_request_states is read from the start date
+        self._state_cursors: Dict[str, str] = {}
+        self._state_bounds_cache: Tuple[Any, Dict[str, str]] = (None, {})
+        self.backfill_window_days = self.config.get("backfill_window_days")
+        # Completed backfill windows per repository, or True once a repository is fully backfilled
+        self._backfill: Optional[Dict[str, Any]] = None
+        # Copy of the backfill progress for the state, rebuilt only when a window or repository completes
+        self._backfill_snapshot: Optional[Dict[str, Any]] = None
+        self.pull_request_details = bool(self.config.get("pull_request_details", False))
+        # Opened on the first enriched page, so that only syncs fetching details create the cache;
+        # backfill windows enrich their pages from several threads
+        self._detail_lock = threading.Lock()
+        self._detail_cache: Optional[DetailCache] = None
+        self._detail_executor: Optional[ThreadPoolExecutor] = None
+        self._details_stored = 0
+
+    repository_state_fields = RepositorySubstream.repository_state_fields + ("backfill",)
+
+    def _get_state(self) -> MutableMapping[str, Any]:
+        """The stream state in plain form, including the cursor of each state and unfinished backfill windows."""
+        state = super()._get_state()
+        if self._state_cursors:
+            state["state_cursors"] = dict(self._state_cursors)
+        if self._backfill:
+            if self._backfill_snapshot is None:
+                self._backfill_snapshot = {}
+                if not all(windows is True for windows in self._backfill.values()):
+                    self._backfill_snapshot = {
+                        repository: windows if windows is True else list(windows)
+                        for repository, windows in self._backfill.items()
+                    }
+            if self._backfill_snapshot:
+                state["backfill"] = self._backfill_snapshot
+        return state
+
+    def _set_state(self, value: Mapping[str, Any]) -> None:
+        super()._set_state(value)
+        state_cursors = value.get("state_cursors")
+        if state_cursors is None and self._cursor_value:
+            # States written before pull_request_states covered open pull requests only
+            state_cursors = {"OPEN": self._cursor_value}
+            if self._resume and self._resume.get(self.cursor_field):
+                self._resume = {**self._resume, "state_cursors": {"OPEN": self._resume[self.cursor_field]}}
+        self._state_cursors = {
+            state: normalize_timestamp(cursor) or cursor for state, cursor in (state_cursors or {}).items()
+        }
+        self._backfill = value.get("backfill")
+        self._backfill_snapshot = None
+
+    def read(self, configured_stream, logger, slice_logger, stream_state, state_manager, internal_config):
+        """Release the detail fetchers and cache once the stream is read."""
+        try:
+            yield from super().read(configured_stream, logger, slice_logger, stream_state, state_manager, internal_config)
+        finally:
+            self._close_details()
+
+    def parse_response(
+        self,
+        response: requests.Response,
+        *,
+        stream_state: Mapping[str, Any],
+        stream_slice: Optional[Mapping[str, Any]] = None,
+        next_page_token: Optional[Mapping[str, Any]] = None,
+    ) -> Iterable[Mapping[str, Any]]:
+        """Parse and filter a page of pull requests, enriched with their details when enabled."""
+        records = super().parse_response(
+            response,
+            stream_state=stream_state,
+            stream_slice=stream_slice,
+            next_page_token=next_page_token,
+        )
+        records = self._filter_states(records, self._state_bounds(stream_state, stream_slice))
+        if self.pull_request_details:
+            records = self.enrich_pull_requests(list(records), stream_slice)
+        yield from records
+
+    def _state_bounds(
+        self, stream_state: Optional[Mapping[str, Any]], stream_slice: Optional[Mapping[str, Any]] = None
+    ) -> Dict[str, str]:
+        """
+        Lower bound of each configured state, as the second-precision prefix of its normalized form:
+        the state's cursor as of the start of the sync attempt, or the start date for states never
+        read, and at most the cursor of the slice's repository and the bound of a slice that failed
+        in a previous sync.
+        """
+        cursors = (self._resume or {}).get("state_cursors", self._state_cursors)
+        floor = self._repository_floor(stream_slice)
+        key = (tuple(sorted(cursors.items())), floor)
+        if self._state_bounds_cache[0] != key:
+            start = (normalize_timestamp(self.start_date) or "2020-01-01T00:00:00.000000Z")[:19]
+            bounds = {}
+            for state in self.pull_request_states:
+                bound = (normalize_timestamp(cursors[state]) or start)[:19] if cursors.get(state) else start
+                bounds[state] = min(bound, floor) if floor else bound
+            self._state_bounds_cache = (key, bounds)
+        return self._state_bounds_cache[1]
+
+    def _start_bound(
+        self, stream_state: Optional[Mapping[str, Any]], stream_slice: Optional[Mapping[str, Any]] = None
+    ) -> str:
+        """Filter pages at the lowest bound of the states, each record then being held to its own state's."""
+        return min(self._state_bounds(stream_state, stream_slice).values())
+
+    def _filter_states(
+        self, records: Iterable[MutableMapping[str, Any]], bounds: Mapping[str, str]
+    ) -> Iterable[MutableMapping[str, Any]]:
+        """Drop the pull requests older than the bound of their state, advancing the cursor of each state."""
+        for record in records:
+            state = record.get("state")
+            cursor_value = record.get(self.cursor_field)
+            comparable = comparable_timestamp(cursor_value) if isinstance(cursor_value, str) else None
+            if comparable is not None and state in bounds:
+                if comparable < bounds[state]:
+                    continue
+                if comparable > self._state_cursors.get(state, ""):
+                    normalized = normalize_timestamp(comparable)
+                    if normalized and normalized > self._state_cursors.get(state, ""):
+                        self._state_cursors[state] = normalized
+            yield record
+
+    def enrich_pull_requests(
+        self, records: List[MutableMapping[str, Any]], stream_slice: Optional[Mapping[str, Any]]
+    ) -> List[MutableMapping[str, Any]]:
+        """
+        Add the participants, reviewers and diffstat of a page of pull requests, which the list endpoint
+        leaves out. Details are taken from the cache when the pull request's updated_on has not changed
+        since they were fetched, and the others are fetched concurrently by num_workers threads.
+        Pull requests whose details cannot be fetched are emitted as listed, and fetched again next sync.
+        """
+        repository = (stream_slice or {}).get("repository")
+        versions = [
+            (record["id"], record["updated_on"]) for record in records if "id" in record and record.get("updated_on")
+        ]
+        if not repository or not versions:
+            return records
+
+        with self._detail_lock:
+            if self._detail_cache is None:
+                self._detail_cache = DetailCache.from_config(self.config)
+                self._detail_executor = ThreadPoolExecutor(
+                    max_workers=self.num_workers, thread_name_prefix="pr-details"
+                )
+        details = self._detail_cache.get_many(repository, versions)
+
+        missing = [version for version in versions if version[0] not in details]
+        bodies = self._detail_executor.map(lambda version: self._fetch_details(repository, version[0]), missing)
+        fetched = [(*version, body) for version, body in zip(missing, bodies) if body is not None]
+        self._detail_cache.put_many(repository, fetched)
+        details.update((pull_request_id, body) for pull_request_id, _, body in fetched)
+
+        # Keep the cache bounded during long syncs as well
+        with self._detail_lock:
+            self._details_stored += len(fetched)
+            evict = self._details_stored >= self._detail_cache.max_entries // 10
+            if evict:
+                self._details_stored = 0
+        if evict:
+            self._detail_cache.evict()
+
+        for record in records:
+            body = details.get(record.get("id"))
+            if body:
+                record.update(body)
+        return records
+
+    def _fetch_details(self, repository: str, pull_request_id: int) -> Optional[Dict[str, Any]]:
+        """Fetch the participants, reviewers and diffstat summary of a pull request."""
+        url = f"{self.url_base}repositories/{repository}/pullrequests/{pull_request_id}"
+        try:
+            response = self.session.get(url, timeout=30)
+            if response.status_code != 200:
+                self.logger.warning(
+                    f"Could not fetch details of {repository} pull request {pull_request_id}: "
+                    f"HTTP {response.status_code}"
+                )
+                return None
+            pull_request = response.json()
+
+            diffstat = {"files_changed": 0, "lines_added": 0, "lines_removed": 0}
+            next_url = f"{url}/diffstat?pagelen=500"
+            while next_url:
+                response = self.session.get(next_url, timeout=30)
+                if response.status_code != 200:
+                    self.logger.warning(
+                        f"Could not fetch diffstat of {repository} pull request {pull_request_id}: "
+                        f"HTTP {response.status_code}"
+                    )
+                    return None
+                page = response.json()
+                for entry in page.get("values", []):
+                    diffstat["files_changed"] += 1
+                    diffstat["lines_added"] += entry.get("lines_added") or 0
+                    diffstat["lines_removed"] += entry.get("lines_removed") or 0
+                next_url = page.get("next")
+
+        except requests.exceptions.RequestException as e:
+            self.logger.warning(f"Could not fetch details of {repository} pull request {pull_request_id}: {e}")
+            return None
+
+        return {
+            "participants": pull_request.get("participants", []),
+            "reviewers": pull_request.get("reviewers", []),
+            "diffstat": diffstat,
+        }
+
+    def _close_details(self) -> None:
+        if self._detail_executor is not None:
+            self._detail_executor.shutdown(wait=True)
+            self._detail_executor = None
+        if self._detail_cache is not None:
+            self._detail_cache.evict()
+            self.logger.info(
+                f"Pull request details: {self._detail_cache.hits} from the cache, {self._detail_cache.misses} fetched"
+            )
+            self._detail_cache.close()
+            self._detail_cache = None
+            self._details_stored = 0
 
     def get_path(self, stream_slice: Optional[Mapping[str, Any]] = None) -> str:
         if not stream_slice:
@@ -259,21 +1211,151 @@ class PullRequestsStream(IncrementalBitbucketStream):
         stream_slice: Optional[Mapping[str, Any]] = None,
         next_page_token: Optional[Mapping[str, Any]] = None,
     ) -> MutableMapping[str, Any]:
-        """Add sort parameter for pull requests."""
+        """Add the states and sort parameter for pull requests, and the updated_on range of a backfill window."""
         params = super().request_params(stream_state, stream_slice, next_page_token)
         if not next_page_token:
+            # Repeated state parameters select every configured state in one walk; next URLs keep them
+            params["state"] = self.pull_request_states
             params["sort"] = "-updated_on"
+            window = (stream_slice or {}).get("window")
+            if window:
+                lower, upper = window
+                query = f"updated_on >= {lower}"
+                if upper:
+                    query += f" AND updated_on < {upper}"
+                params["q"] = query
         return params
 
-    def stream_slices(
+    def _plan_slices(self, slices: List[Mapping[str, Any]]) -> None:
+        """
+        On the first sync with backfill enabled, register every repository for a windowed backfill
+        up front so that a restarted sync knows which ones remain.
+        """
+        if self._resume is not None:
+            # Bounds of the states for the sync attempt, which their cursors move past as slices are read
+            self._resume.setdefault("state_cursors", dict(self._state_cursors))
+        if self.backfill_window_days and self._backfill is None and not self._cursor_value:
+            self._backfill = {stream_slice["repository"]: [] for stream_slice in slices}
+            self._backfill_snapshot = None
+            self._state_codec.invalidate()
+
+    def _backfill_windows(self) -> List[Tuple[str, Optional[str]]]:
+        """
+        Split [start_date, now) into fixed windows aligned on start_date, so that window boundaries
+        are stable across restarts. The last window is left open-ended.
+        """
+        lower = datetime.fromisoformat(self.start_date.replace("Z", "+00:00"))
+        if lower.tzinfo is None:
+            lower = lower.replace(tzinfo=timezone.utc)
+        now = datetime.now(timezone.utc)
+        step = timedelta(days=self.backfill_window_days)
+
+        windows = []
+        while lower < now:
+            upper = lower + step
+            windows.append((lower.isoformat(), upper.isoformat() if upper < now else None))
+            lower = upper
+        return windows
+
+    def _read_pages(
         self,
-        sync_mode: SyncMode,
-        cursor_field: Optional[List[str]] = None,
+        records_generator_fn: Callable[..., Iterable[Mapping[str, Any]]],
+        stream_slice: Optional[Mapping[str, Any]] = None,
         stream_state: Optional[Mapping[str, Any]] = None,
-    ) -> Iterable[Optional[Mapping[str, Any]]]:
-        """Generate slices based on parent repositories."""
-        for repo in self.parent_stream.read_records(sync_mode=SyncMode.full_refresh):
-            yield {"repository": repo["full_name"]}
+    ) -> Iterable[Mapping[str, Any]]:
+        """Backfill repositories with unfinished windows, and walk the others with the regular cursor."""
+        repository = (stream_slice or {}).get("repository")
+        if self._backfill and isinstance(self._backfill.get(repository), list):
+            yield from self._read_backfill_windows(stream_slice, stream_state or {})
+        else:
+            yield from super()._read_pages(records_generator_fn, stream_slice, stream_state)
+
+    def _read_backfill_windows(
+        self, stream_slice: Mapping[str, Any], stream_state: Mapping[str, Any]
+    ) -> Iterable[Mapping[str, Any]]:
+        """
+        Fetch the unfinished backfill windows of a repository concurrently.
+        Each window is its own BBQL updated_on range query paginated sequentially by a worker; pages are
+        handed back through a bounded queue and a window is checkpointed once all of its records are emitted,
+        so that a failure later in the repository only reads its unfinished windows again.
+        Records are not filtered by the stream cursor, since windows are bounded server-side.
+        """
+        repository = stream_slice["repository"]
+        completed = self._backfill[repository]
+        windows = [window for window in self._backfill_windows() if window[0] not in completed]
+
+        pages: queue.Queue = queue.Queue(maxsize=self.num_workers * 2)
+        stop = threading.Event()
+        # The page counter and page size controller behind next_page_token are shared by the workers
+        token_lock = threading.Lock()
+
+        def put(item: Tuple[Any, Optional[List[Mapping[str, Any]]], Optional[BaseException]]) -> None:
+            while not stop.is_set():
+                try:
+                    pages.put(item, timeout=0.1)
+                    return
+                except queue.Full:
+                    continue
+
+        # Window pages are bounded by their query rather than filtered by the overrides of parse_response,
+        # and the plain parsing they call is timed like the instrumented method
+        parse_page = self.timed(partial(BitbucketStream.parse_response, self), "parse_response")
+
+        def fetch_window(window: Tuple[str, Optional[str]]) -> None:
+            window_slice = {**stream_slice, "window": window}
+            next_page_token = None
+            try:
+                while not stop.is_set():
+                    _, response = self._fetch_next_page(window_slice, stream_state, next_page_token)
+                    records = list(parse_page(response, stream_state=stream_state))
+                    if self.pull_request_details:
+                        records = self.enrich_pull_requests(records, stream_slice)
+                    put((window, records, None))
+                    with token_lock:
+                        next_page_token = self.next_page_token(response)
+                    if not next_page_token:
+                        break
+                put((window, None, None))
+            except Exception as e:
+                put((window, None, e))
+
+        executor = ThreadPoolExecutor(max_workers=self.num_workers, thread_name_prefix="pr-backfill")
+        try:
+            for window in windows:
+                executor.submit(self.profile_thread(fetch_window), window)
+
+            remaining = len(windows)
+            while remaining:
+                window, records, error = pages.get()
+                if error:
+                    raise error
+                if records is None:
+                    completed.append(window[0])
+                    self._backfill_snapshot = None
+                    self._state_codec.touch(repository)
+                    remaining -= 1
+                    if self._state_manager:
+                        yield self._checkpoint_state(self.state, state_manager=self._state_manager)
+                    continue
+                for record in records:
+                    record = self.add_cursor_field(record)
+                    cursor_value = record.get(self.cursor_field)
+                    normalized = normalize_timestamp(cursor_value) if isinstance(cursor_value, str) else None
+                    if normalized and (not self._cursor_value or normalized > self._cursor_value):
+                        self._cursor_value = normalized
+                    if normalized and (self._slice_cursor is None or normalized > self._slice_cursor):
+                        self._slice_cursor = normalized
+                    state = record.get("state")
+                    if normalized and state in self.pull_request_states and normalized > self._state_cursors.get(state, ""):
+                        self._state_cursors[state] = normalized
+                    yield record
+        finally:
+            stop.set()
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        self._backfill[repository] = True
+        self._backfill_snapshot = None
+        self._state_codec.touch(repository)
 
     def add_cursor_field(self, record: Mapping[str, Any]) -> Mapping[str, Any]:
         """Add cursor_at field from updated_on."""
@@ -282,7 +1364,7 @@ class PullRequestsStream(IncrementalBitbucketStream):
         return record
 
 
-class CommitsStream(IncrementalBitbucketStream):
+class CommitsStream(RepositorySubstream):
     """
     Stream for commits in repositories.
     Supports incremental sync based on date field.
@@ -298,26 +1380,12 @@ class CommitsStream(IncrementalBitbucketStream):
     def name(self) -> str:
         return "commits"
 
-    def __init__(self, parent_stream: RepositoriesStream, **kwargs):
-        super().__init__(**kwargs)
-        self.parent_stream = parent_stream
-
     def get_path(self, stream_slice: Optional[Mapping[str, Any]] = None) -> str:
         if not stream_slice:
             raise ValueError("stream_slice is required for CommitsStream")
         repository = stream_slice["repository"]
         return f"repositories/{repository}/commits"
 
-    def stream_slices(
-        self,
-        sync_mode: SyncMode,
-        cursor_field: Optional[List[str]] = None,
-        stream_state: Optional[Mapping[str, Any]] = None,
-    ) -> Iterable[Optional[Mapping[str, Any]]]:
-        """Generate slices based on parent repositories."""
-        for repo in self.parent_stream.read_records(sync_mode=SyncMode.full_refresh):
-            yield {"repository": repo["full_name"]}
-
     def add_cursor_field(self, record: Mapping[str, Any]) -> Mapping[str, Any]:
         """Add cursor_at field from date."""
         if "date" in record:
@@ -325,7 +1393,7 @@ class CommitsStream(IncrementalBitbucketStream):
         return record
 
 
-class DeploymentsStream(IncrementalBitbucketStream):
+class DeploymentsStream(RepositorySubstream):
     """
     Stream for deployments in repositories.
     Supports incremental sync based on state.completed_on field.
@@ -343,8 +1411,7 @@ class DeploymentsStream(IncrementalBitbucketStream):
         return "deployments"
 
     def __init__(self, parent_stream: RepositoriesStream, **kwargs):
-        super().__init__(**kwargs)
-        self.parent_stream = parent_stream
+        super().__init__(parent_stream=parent_stream, **kwargs)
         self._environment_cache: Dict[str, Dict[str, Any]] = {}
 
     def get_path(self, stream_slice: Optional[Mapping[str, Any]] = None) -> str:
@@ -365,16 +1432,6 @@ class DeploymentsStream(IncrementalBitbucketStream):
             params["sort"] = "-state.completed_on"
         return params
 
-    def stream_slices(
-        self,
-        sync_mode: SyncMode,
-        cursor_field: Optional[List[str]] = None,
-        stream_state: Optional[Mapping[str, Any]] = None,
-    ) -> Iterable[Optional[Mapping[str, Any]]]:
-        """Generate slices based on parent repositories."""
-        for repo in self.parent_stream.read_records(sync_mode=SyncMode.full_refresh):
-            yield {"repository": repo["full_name"]}
-
     def parse_response(
         self,
         response: requests.Response,
@@ -439,11 +1496,7 @@ class DeploymentsStream(IncrementalBitbucketStream):
         # Fetch from API
         url = f"{self.url_base}repositories/{repository}/environments/{environment_uuid}"
         try:
-            response = requests.get(
-                url,
-                auth=(self.config["email"], self.config["api_token"]),
-                timeout=30
-            )
+            response = self.session.get(url, timeout=30)
 
             if response.status_code == 200:
                 environment_data = response.json()
@@ -0,0 +1,49 @@
+from datetime import datetime, timezone
+from typing import Optional
+
+
+def normalize_timestamp(value: str) -> Optional[str]:
+    """
+    Normalize an ISO 8601 timestamp into the fixed-width UTC form YYYY-MM-DDTHH:MM:SS.ffffffZ.
+
+    Normalized timestamps compare chronologically as plain strings, so cursors can be filtered
+    and advanced without building datetime objects. The UTC forms returned by Bitbucket
+    (``+00:00`` or ``Z`` suffix, with or without fractional seconds) are handled by string
+    slicing; other offsets fall back to datetime parsing.
+
+    Returns None if the value is not a valid timestamp.
+    """
+    if value.endswith("+00:00"):
+        body = value[:-6]
+    elif value.endswith("Z"):
+        body = value[:-1]
+    else:
+        body = None
+
+    if body is not None and len(body) >= 19 and body[10] == "T" and body[4] == "-" and body[16] == ":":
+        if len(body) == 19:
+            return body + ".000000Z"
+        fraction = body[20:]
+        if body[19] == "." and 0 < len(fraction) <= 6 and fraction.isdigit():
+            return body[:20] + fraction.ljust(6, "0") + "Z"
+
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except (ValueError, AttributeError, TypeError):
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def comparable_timestamp(value: str) -> Optional[str]:
+    """
+    Return a form of an ISO 8601 timestamp that compares chronologically, to the second,
+    against normalized timestamps and their 19-character prefixes.
+
+    UTC timestamps share the YYYY-MM-DDTHH:MM:SS prefix of their normalized form, so they are
+    returned as they are without any parsing; other offsets are normalized.
+    """
+    if value[-1:] == "Z" or value.endswith("+00:00"):
+        return value
+    return normalize_timestamp(value)
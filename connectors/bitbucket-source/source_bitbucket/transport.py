@@ -0,0 +1,97 @@
+from typing import Any, Mapping, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.auth import AuthBase
+
+from .hedging import DEFAULT_PERCENTILE, MAX_CONCURRENT_HEDGES, HedgingAdapter
+from .quota import QuotaCoordinator
+
+try:
+    import brotli  # noqa: F401
+
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    # urllib3 only decodes brotli responses when a brotli package is installed
+    ACCEPT_ENCODING = "gzip, deflate"
+
+# Connections kept open per host on top of the configured workers, for the main thread
+# and enrichment calls made while the workers are busy
+EXTRA_CONNECTIONS = 2
+
+# Seconds Bitbucket is expected to keep rejecting requests after a 429, as in BitbucketStream.backoff_time
+RATE_LIMIT_BACKOFF = 60.0
+
+
+def _hold_back_on_rate_limit(quota: QuotaCoordinator, response: requests.Response) -> requests.Response:
+    if response.status_code == 429:
+        # Hold back the other processes sharing the credentials as well
+        quota.block(RATE_LIMIT_BACKOFF)
+    return response
+
+
+class QuotaAdapter(HTTPAdapter):
+    """HTTP adapter that takes a token from the shared quota before each request."""
+
+    def __init__(self, quota: QuotaCoordinator, **kwargs):
+        super().__init__(**kwargs)
+        self.quota = quota
+
+    def send(self, request: requests.PreparedRequest, **kwargs) -> requests.Response:
+        self.quota.acquire()
+        return _hold_back_on_rate_limit(self.quota, super().send(request, **kwargs))
+
+
+class QuotaHedgingAdapter(HedgingAdapter):
+    """
+    Hedging adapter whose requests, hedges included, each take a token from the shared quota before
+    they are timed, and which does not hedge while the quota is blocked or has no token left:
+    a hedge would then only wait for the quota behind the request it duplicates.
+    """
+
+    def __init__(self, quota: QuotaCoordinator, **kwargs):
+        super().__init__(**kwargs)
+        self.quota = quota
+
+    def _acquire(self) -> None:
+        self.quota.acquire()
+
+    def _can_hedge(self) -> bool:
+        return not self.quota.exhausted()
+
+    def _wire_send(self, request: requests.PreparedRequest, kwargs: Mapping[str, Any]) -> requests.Response:
+        return _hold_back_on_rate_limit(self.quota, super()._wire_send(request, kwargs))
+
+
+def build_session(
+    config: Mapping[str, Any], authenticator: AuthBase, quota: Optional[QuotaCoordinator] = None
+) -> requests.Session:
+    """
+    Create the HTTP session shared by every stream of the connector, signing requests with the authenticator.
+
+    All requests go through one keep-alive connection pool per host, sized to the configured
+    number of workers, so that connections (and the DNS lookup and TLS handshake that opened them)
+    are reused across streams and slices instead of being set up again by each stream.
+    With a quota coordinator, every request first takes a token from the budget shared with the
+    other processes using the same credentials. With hedge_requests, slow GETs are hedged, the
+    pool keeping room for the hedges in flight.
+    """
+    pool_size = max(1, int(config.get("num_workers", 1))) + EXTRA_CONNECTIONS
+    pool = {"pool_connections": 1, "pool_block": True}
+
+    session = requests.Session()
+    session.auth = authenticator
+    if config.get("hedge_requests"):
+        pool["pool_maxsize"] = pool_size + MAX_CONCURRENT_HEDGES
+        percentile = float(config.get("hedge_percentile") or DEFAULT_PERCENTILE)
+        if quota is not None:
+            adapter = QuotaHedgingAdapter(quota=quota, percentile=percentile, **pool)
+        else:
+            adapter = HedgingAdapter(percentile=percentile, **pool)
+    elif quota is not None:
+        adapter = QuotaAdapter(quota, pool_maxsize=pool_size, **pool)
+    else:
+        adapter = HTTPAdapter(pool_maxsize=pool_size, **pool)
+    session.mount("https://", adapter)
+    session.headers.update({"Accept-Encoding": ACCEPT_ENCODING, "Connection": "keep-alive"})
+    return session
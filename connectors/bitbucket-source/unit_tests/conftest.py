@@ -0,0 +1,161 @@
+import logging
+import re
+from typing import Any, Dict, Iterator, List, Mapping, Optional
+
+import pytest
+from airbyte_cdk.models import (
+    AirbyteMessage,
+    AirbyteStateMessageSerializer,
+    ConfiguredAirbyteCatalogSerializer,
+    Type,
+)
+
+from source_bitbucket import SourceBitbucket
+
+API = "https://api.bitbucket.org/2.0/"
+
+CONFIG = {"workspace": "w", "email": "user@example.com", "api_token": "token"}
+
+# Streams read as full refresh whatever the test reads the others as
+FULL_REFRESH_STREAMS = ("repositories", "workspace_users")
+
+
+class Workspace:
+    """
+    Bitbucket workspace served through requests_mock: its repositories, with the commits and pull
+    requests of each, can be changed between syncs, and every request made is recorded.
+    """
+
+    def __init__(self, requests_mock):
+        self.requests_mock = requests_mock
+        # updated_on and size by repository name
+        self.repositories: Dict[str, Dict[str, Any]] = {}
+        # commit dates and pull request (id, updated_on) by repository name
+        self.commits: Dict[str, List[str]] = {}
+        self.pull_requests: Dict[str, List[tuple]] = {}
+        # Failed requests left by repository name, None failing every request
+        self.failures: Dict[str, Optional[int]] = {}
+        requests_mock.get(re.compile(API + r"repositories/w\?"), json=self._listing)
+        requests_mock.get(re.compile(API + r"repositories/w/([^/]+)/commits"), json=self._commits)
+        requests_mock.get(re.compile(API + r"repositories/w/([^/]+)/pullrequests"), json=self._pull_requests)
+
+    def add_repository(self, name: str, updated_on: str = "2024-01-01T00:00:00+00:00", size: int = 100) -> None:
+        self.repositories[name] = {"updated_on": updated_on, "size": size}
+        self.commits.setdefault(name, [])
+        self.pull_requests.setdefault(name, [])
+
+    def _listing(self, request, context) -> Mapping[str, Any]:
+        return {
+            "values": [
+                {"full_name": f"w/{name}", "uuid": f"{{{name}}}", **repository}
+                for name, repository in self.repositories.items()
+            ]
+        }
+
+    def fail(self, name: str, times: Optional[int] = None) -> None:
+        """Answer the next requests of a repository's endpoints with HTTP 500, all of them by default."""
+        self.failures[name] = times
+
+    @staticmethod
+    def _repository(request) -> str:
+        return re.match(API + r"repositories/w/([^/]+)/", request.url).group(1)
+
+    def _failing(self, name: str, context) -> bool:
+        """Whether a request of the repository fails: removed from the workspace, or set to fail."""
+        if name not in self.repositories:
+            context.status_code = 404
+            return True
+        if name not in self.failures:
+            return False
+        times = self.failures[name]
+        if times is not None:
+            if times <= 1:
+                del self.failures[name]
+            else:
+                self.failures[name] = times - 1
+        context.status_code = 500
+        return True
+
+    @staticmethod
+    def _page(request, values: List[Mapping[str, Any]]) -> Mapping[str, Any]:
+        """A page of the values, with the next URL of numbered pages as Bitbucket sends it."""
+        page = int(request.qs.get("page", ["1"])[0])
+        pagelen = int(request.qs.get("pagelen", ["100"])[0])
+        body: Dict[str, Any] = {"values": values[(page - 1) * pagelen : page * pagelen]}
+        if page * pagelen < len(values):
+            body["next"] = f"{request.url.split('?')[0]}?page={page + 1}&pagelen={pagelen}"
+        return body
+
+    def _commits(self, request, context) -> Mapping[str, Any]:
+        name = self._repository(request)
+        if self._failing(name, context):
+            return {"type": "error", "error": {"message": "Something went wrong"}}
+        dates = sorted(self.commits.get(name, []), reverse=True)
+        return self._page(request, [{"hash": f"{name}-{date}", "date": date} for date in dates])
+
+    def _pull_requests(self, request, context) -> Mapping[str, Any]:
+        name = self._repository(request)
+        if self._failing(name, context):
+            return {"type": "error", "error": {"message": "Something went wrong"}}
+        pull_requests = sorted(self.pull_requests.get(name, []), key=lambda pr: pr[1], reverse=True)
+        return self._page(
+            request, [{"id": pr_id, "updated_on": updated_on, "state": "OPEN"} for pr_id, updated_on in pull_requests]
+        )
+
+    def requested(self, endpoint: str) -> List[str]:
+        """Repositories whose endpoint (commits, pullrequests) was requested, in request order."""
+        pattern = re.compile(API + rf"repositories/w/([^/]+)/{endpoint}")
+        return [match.group(1) for match in (pattern.match(r.url) for r in self.requests_mock.request_history) if match]
+
+
+@pytest.fixture
+def workspace(requests_mock) -> Workspace:
+    return Workspace(requests_mock)
+
+
+def catalog(streams: List[str]):
+    return ConfiguredAirbyteCatalogSerializer.load(
+        {
+            "streams": [
+                {
+                    "stream": {"name": name, "json_schema": {}, "supported_sync_modes": ["full_refresh", "incremental"]},
+                    "sync_mode": "full_refresh" if name in FULL_REFRESH_STREAMS else "incremental",
+                    "destination_sync_mode": "append",
+                    "cursor_field": ["cursor_at"],
+                }
+                for name in streams
+            ]
+        }
+    )
+
+
+def read_messages(
+    streams: List[str], state: Optional[Mapping[str, Mapping[str, Any]]] = None, **config: Any
+) -> Iterator[AirbyteMessage]:
+    """Read the streams with the given per-stream states, yielding the messages as they are emitted."""
+    state_messages = [
+        AirbyteStateMessageSerializer.load(
+            {"type": "STREAM", "stream": {"stream_descriptor": {"name": name}, "stream_state": stream_state}}
+        )
+        for name, stream_state in (state or {}).items()
+    ]
+    yield from SourceBitbucket().read(logging.getLogger("test"), {**CONFIG, **config}, catalog(streams), state_messages)
+
+
+def read(
+    streams: List[str], state: Optional[Mapping[str, Mapping[str, Any]]] = None, **config: Any
+) -> List[AirbyteMessage]:
+    """Read the streams with the given per-stream states, returning every message emitted."""
+    return list(read_messages(streams, state, **config))
+
+
+def records(messages: List[AirbyteMessage], stream: str) -> List[Mapping[str, Any]]:
+    return [message.record.data for message in messages if message.type == Type.RECORD and message.record.stream == stream]
+
+
+def states(messages: List[AirbyteMessage], stream: str) -> List[Dict[str, Any]]:
+    return [
+        message.state.stream.stream_state.__dict__
+        for message in messages
+        if message.type == Type.STATE and message.state.stream.stream_descriptor.name == stream
+    ]
@@ -0,0 +1,141 @@
+from typing import Any, Dict, List
+
+from .conftest import API, read, records, states
+
+
+def commit_dates(messages, repository: str) -> List[str]:
+    """Dates of the commits of a repository read by a sync."""
+    prefix = f"{repository}-"
+    hashes = [record["hash"] for record in records(messages, "commits")]
+    return sorted(commit_hash[len(prefix) :] for commit_hash in hashes if commit_hash.startswith(prefix))
+
+
+def synced_workspace(workspace) -> Dict[str, Any]:
+    """Three repositories with an old and a recent commit each, synced once, returning the state of that sync."""
+    for name in ("r0", "r1", "r2"):
+        workspace.add_repository(name)
+        workspace.commits[name] = ["2024-01-15T00:00:00+00:00", "2024-03-01T00:00:00+00:00"]
+    return states(read(["commits"]), "commits")[-1]
+
+
+def test_slice_failing_again_when_retried_is_read_from_its_bound_next_sync(workspace):
+    for name in ("r0", "r1", "r2"):
+        workspace.add_repository(name)
+        workspace.commits[name] = ["2024-01-15T00:00:00+00:00", "2024-03-01T00:00:00+00:00"]
+    workspace.fail("r1")
+
+    messages = read(["commits"], slice_max_failures=1)
+
+    # Deferred to the end of the stream, then given up on when the retry fails too
+    assert workspace.requested("commits").count("r1") == 2
+    assert workspace.requested("commits")[-1] == "r1"
+    assert commit_dates(messages, "r1") == []
+    state = states(messages, "commits")[-1]
+    assert state["failed_slices"]["w/r1"]["cursor_at"] == "2020-01-01T00:00:00.000000Z"
+    assert "w/r1" not in state["repository_cursors"]
+    assert "resume" not in state
+    assert "last_full_scan" not in state
+
+    # The stream cursor moved past the old commit, which the failed repository is read again from its bound for;
+    # the others are read from their own cursors by the full scan the first sync did not complete
+    del workspace.failures["r1"]
+    workspace.commits["r0"].append("2024-03-05T00:00:00+00:00")
+    workspace.requests_mock.reset_mock()
+    messages = read(["commits"], {"commits": state}, slice_max_failures=1, full_scan_interval_days=30)
+
+    assert sorted(workspace.requested("commits")) == ["r0", "r1", "r2"]
+    assert commit_dates(messages, "r1") == ["2024-01-15T00:00:00+00:00", "2024-03-01T00:00:00+00:00"]
+    assert commit_dates(messages, "r0") == ["2024-03-01T00:00:00+00:00", "2024-03-05T00:00:00+00:00"]
+    assert commit_dates(messages, "r2") == ["2024-03-01T00:00:00+00:00"]
+    state = states(messages, "commits")[-1]
+    assert "failed_slices" not in state
+    assert "last_full_scan" in state
+    assert state["repository_cursors"]["w/r1"] == "2024-03-01T00:00:00.000000Z"
+
+
+def test_deferred_slice_read_when_retried(workspace):
+    for name in ("r0", "r1"):
+        workspace.add_repository(name)
+        workspace.commits[name] = ["2024-03-01T00:00:00+00:00"]
+    workspace.fail("r1", times=1)
+
+    messages = read(["commits"], slice_max_failures=1)
+
+    assert sorted(workspace.requested("commits")) == ["r0", "r1", "r1"]
+    assert workspace.requested("commits")[-1] == "r1"
+    assert commit_dates(messages, "r1") == ["2024-03-01T00:00:00+00:00"]
+    state = states(messages, "commits")[-1]
+    assert "failed_slices" not in state
+    assert set(state["repository_cursors"]) == {"w/r0", "w/r1"}
+
+
+def test_interrupted_slice_resumes_from_its_checkpointed_page(workspace):
+    for name in ("r0", "r1"):
+        workspace.add_repository(name)
+    workspace.commits["r0"] = ["2024-02-20T00:00:00+00:00"]
+    workspace.commits["r1"] = [f"2024-02-2{day}T00:00:00+00:00" for day in range(5)]
+    # The previous attempt, bound at 2024-02-15, checkpointed r1 after its first page of two commits; the
+    # stream cursor it emitted moved past the commit of r0, which was not read yet
+    state = {
+        "cursor_at": "2024-02-24T00:00:00.000000Z",
+        "resume": {
+            "cursor_at": "2024-02-15T00:00:00.000000Z",
+            "slice": {"repository": "w/r1"},
+            "next_page_token": {"next_url": f"{API}repositories/w/r1/commits?page=2&pagelen=2"},
+            "records": 2,
+        },
+    }
+
+    messages = read(["commits"], {"commits": state})
+
+    history = [request.url for request in workspace.requests_mock.request_history if "/commits" in request.url]
+    assert "page=2&pagelen=2" in history[0]
+    assert workspace.requested("commits") == ["r1", "r1", "r0"]
+    assert commit_dates(messages, "r1") == [f"2024-02-2{day}T00:00:00+00:00" for day in range(3)]
+    assert commit_dates(messages, "r0") == ["2024-02-20T00:00:00+00:00"]
+    state = states(messages, "commits")[-1]
+    assert "resume" not in state
+    # The commits of the pages read before the interruption are not known to the resumed slice: its
+    # repository's cursor stays at the highest it read, and the next sync reads those pages again
+    assert state["repository_cursors"] == {"w/r0": "2024-02-20T00:00:00.000000Z", "w/r1": "2024-02-22T00:00:00.000000Z"}
+
+
+def test_removed_repository_is_dropped_from_the_cached_listing(workspace):
+    state = synced_workspace(workspace)
+    del workspace.repositories["r1"]
+    workspace.requests_mock.reset_mock()
+
+    # Every repository of the cached listing is sliced by the full scan, the removed one included
+    messages = read(["commits"], {"commits": state}, full_scan_interval_days=0)
+
+    assert {"r0", "r2"} <= set(workspace.requested("commits"))
+    assert commit_dates(messages, "r1") == []
+    state = states(messages, "commits")[-1]
+    assert "failed_slices" not in state
+    assert "resume" not in state
+    for field in ("repositories", "repository_cursors", "listing"):
+        assert sorted(state[field]) == ["w/r0", "w/r2"]
+
+
+def test_sync_skipping_every_repository_keeps_their_cursors(workspace):
+    state = synced_workspace(workspace)
+    # An earlier attempt's bound, which a sync reading no slice must not carry over
+    state["resume"] = {"cursor_at": "2020-01-01T00:00:00.000000Z"}
+    workspace.requests_mock.reset_mock()
+
+    messages = read(["commits"], {"commits": state}, full_scan_interval_days=30)
+
+    assert workspace.requested("commits") == []
+    assert records(messages, "commits") == []
+    emitted = states(messages, "commits")
+    assert all("resume" not in stream_state for stream_state in emitted)
+    state = emitted[-1]
+    assert state["repository_cursors"] == {name: "2024-03-01T00:00:00.000000Z" for name in ("w/r0", "w/r1", "w/r2")}
+
+    # The next change is read from the repository's cursor, not from the dropped bound
+    workspace.commits["r0"].append("2024-03-05T00:00:00+00:00")
+    workspace.repositories["r0"]["updated_on"] = "2024-03-05T00:00:00+00:00"
+    messages = read(["commits"], {"commits": state}, full_scan_interval_days=30)
+
+    assert workspace.requested("commits") == ["r0"]
+    assert commit_dates(messages, "r0") == ["2024-03-01T00:00:00+00:00", "2024-03-05T00:00:00+00:00"]
@@ -0,0 +1,209 @@
+import json
+from typing import Any, Dict, List
+
+import pytest
+from airbyte_cdk.models import Type
+
+from source_bitbucket import SourceBitbucket
+from source_bitbucket.state_codec import CHUNK_REPOSITORIES, COMPACT_KEY, DEFAULT_COMPACT_MIN_REPOSITORIES, StateCodec
+from source_bitbucket.streams import RepositorySubstream
+
+from .conftest import read_messages
+
+FIELDS = RepositorySubstream.repository_state_fields
+
+
+def plain_state(repositories: int, cursor: str = "2024-03-01T00:00:00.000000Z") -> Dict[str, Any]:
+    names = [f"w/r{index}" for index in range(repositories)]
+    return {
+        "cursor_at": cursor,
+        "repositories": {name: "2024-01-01T00:00:00+00:00" for name in names},
+        "repository_cursors": {name: cursor for name in names},
+        "slice_stats": {name: {"seconds": 0.5, "pages": 1} for name in names},
+    }
+
+
+def round_trip(codec: StateCodec, state: Dict[str, Any]) -> Dict[str, Any]:
+    """Encode a state, serialize it as a checkpoint would, and decode it with a fresh codec."""
+    encoded = json.loads(json.dumps(codec.encode(state)))
+    return StateCodec(FIELDS).decode(encoded)
+
+
+def test_state_below_threshold_stays_plain():
+    state = plain_state(DEFAULT_COMPACT_MIN_REPOSITORIES - 1)
+    assert StateCodec(FIELDS).encode(state) == state
+
+
+def test_state_at_threshold_is_compacted_and_decoded_back():
+    state = plain_state(DEFAULT_COMPACT_MIN_REPOSITORIES)
+    codec = StateCodec(FIELDS)
+
+    encoded = codec.encode(state)
+
+    assert set(encoded) == {"cursor_at", COMPACT_KEY}
+    assert encoded["cursor_at"] == state["cursor_at"]
+    assert round_trip(StateCodec(FIELDS), state) == state
+
+
+def test_touched_repository_is_encoded_again():
+    state = plain_state(DEFAULT_COMPACT_MIN_REPOSITORIES)
+    codec = StateCodec(FIELDS)
+    codec.encode(state)
+
+    state["repository_cursors"]["w/r7"] = "2024-04-01T00:00:00.000000Z"
+    state["slice_stats"]["w/r7"] = {"seconds": 2.0, "pages": 3}
+    codec.touch("w/r7")
+
+    assert round_trip(codec, state) == state
+
+
+def test_new_repository_is_encoded_once_touched():
+    state = plain_state(DEFAULT_COMPACT_MIN_REPOSITORIES)
+    codec = StateCodec(FIELDS)
+    codec.encode(state)
+
+    state["repositories"]["w/new"] = "2024-02-01T00:00:00+00:00"
+    state["repository_cursors"]["w/new"] = "2024-02-01T00:00:00.000000Z"
+    codec.touch("w/new")
+
+    assert round_trip(codec, state) == state
+
+
+@pytest.mark.parametrize("forget", ["touch", "invalidate"])
+def test_removed_repository_leaves_the_state(forget):
+    state = plain_state(DEFAULT_COMPACT_MIN_REPOSITORIES + 1)
+    codec = StateCodec(FIELDS)
+    codec.encode(state)
+
+    for field in ("repositories", "repository_cursors", "slice_stats"):
+        del state[field]["w/r3"]
+    if forget == "touch":
+        codec.touch("w/r3")
+    else:
+        codec.invalidate()
+
+    decoded = round_trip(codec, state)
+    assert decoded == state
+    assert all("w/r3" not in decoded[field] for field in ("repositories", "repository_cursors", "slice_stats"))
+
+
+def test_state_dropping_below_threshold_is_plain_again():
+    state = plain_state(DEFAULT_COMPACT_MIN_REPOSITORIES)
+    codec = StateCodec(FIELDS)
+    codec.encode(state)
+
+    for field in ("repositories", "repository_cursors", "slice_stats"):
+        del state[field]["w/r0"]
+    codec.invalidate()
+
+    assert codec.encode(state) == state
+
+
+def test_growing_state_is_spread_over_more_chunks():
+    state = plain_state(DEFAULT_COMPACT_MIN_REPOSITORIES)
+    codec = StateCodec(FIELDS)
+    chunks = len(codec.encode(state)[COMPACT_KEY]["chunks"])
+
+    for index in range(DEFAULT_COMPACT_MIN_REPOSITORIES, 2 * CHUNK_REPOSITORIES * chunks + 1):
+        name = f"w/r{index}"
+        state["repositories"][name] = "2024-01-01T00:00:00+00:00"
+        state["repository_cursors"][name] = state["cursor_at"]
+        codec.touch(name)
+
+    encoded = json.loads(json.dumps(codec.encode(state)))
+    assert len(encoded[COMPACT_KEY]["chunks"]) > chunks
+    assert StateCodec(FIELDS).decode(encoded) == state
+
+
+def test_new_field_re_chunks_the_state():
+    state = plain_state(DEFAULT_COMPACT_MIN_REPOSITORIES)
+    codec = StateCodec(FIELDS)
+    codec.encode(state)
+
+    state["failed_slices"] = {"w/r1": {"cursor_at": "2024-01-01T00:00:00.000000Z", "error": "timeout"}}
+    codec.touch("w/r1")
+
+    assert round_trip(codec, state) == state
+
+
+def test_legacy_state_is_decoded_unchanged():
+    legacy = {"cursor_at": "2024-03-01T00:00:00+00:00"}
+    assert StateCodec(FIELDS).decode(legacy) == legacy
+    assert StateCodec(FIELDS).decode({}) == {}
+
+
+def test_unknown_compact_version_is_rejected():
+    with pytest.raises(ValueError):
+        StateCodec(FIELDS).decode({"cursor_at": "2024-03-01T00:00:00Z", COMPACT_KEY: {"v": 99, "chunks": []}})
+
+
+@pytest.fixture
+def streams(monkeypatch) -> List[Any]:
+    """The streams created by the syncs of a test, to compare the states they emit with their own."""
+    created: List[Any] = []
+    create = SourceBitbucket.streams
+
+    def record_streams(self, config):
+        instances = create(self, config)
+        created.extend(instances)
+        return instances
+
+    monkeypatch.setattr(SourceBitbucket, "streams", record_streams)
+    return created
+
+
+def checked_read(streams: List[Any], name: str, state=None, **config) -> List[Dict[str, Any]]:
+    """
+    Read a stream, checking that every state it emits decodes to the plain state of the stream at
+    that point: a change of a repository's entries that was not touched would leave a stale chunk.
+    """
+    emitted: List[Dict[str, Any]] = []
+    for message in read_messages([name], state, **config):
+        if message.type != Type.STATE or message.state.stream.stream_descriptor.name != name:
+            continue
+        stream_state = json.loads(json.dumps(message.state.stream.stream_state.__dict__))
+        stream = next(stream for stream in reversed(streams) if stream.name == name)
+        assert StateCodec(FIELDS).decode(stream_state) == json.loads(json.dumps(stream._get_state()))
+        emitted.append(stream_state)
+    return emitted
+
+
+def test_sync_states_round_trip_at_threshold(workspace, streams):
+    for index in range(DEFAULT_COMPACT_MIN_REPOSITORIES):
+        workspace.add_repository(f"r{index}")
+        workspace.commits[f"r{index}"] = ["2024-03-01T00:00:00+00:00"]
+
+    # First sync: the state fills up past the threshold and goes compact
+    first = checked_read(streams, "commits")
+    assert COMPACT_KEY in first[-1]
+
+    # Changed repositories are read again, and their touched entries encoded again
+    for index in (3, 250, 499):
+        workspace.repositories[f"r{index}"]["updated_on"] = "2024-03-05T00:00:00+00:00"
+        workspace.commits[f"r{index}"].append("2024-03-05T00:00:00+00:00")
+    second = checked_read(streams, "commits", {"commits": first[-1]}, full_scan_interval_days=30)
+    decoded = StateCodec(FIELDS).decode(second[-1])
+    assert decoded["repository_cursors"]["w/r250"] == "2024-03-05T00:00:00.000000Z"
+    assert decoded["repository_cursors"]["w/r1"] == "2024-03-01T00:00:00.000000Z"
+
+    # A removed repository leaves the entries the stream keeps per listed repository
+    del workspace.repositories["r42"]
+    third = checked_read(
+        streams, "commits", {"commits": second[-1]}, full_scan_interval_days=30, cached_repository_list=False
+    )
+    decoded = StateCodec(FIELDS).decode(third[-1])
+    assert all("w/r42" not in decoded[field] for field in ("repositories", "repository_cursors", "listing"))
+    assert len(decoded["repository_cursors"]) == DEFAULT_COMPACT_MIN_REPOSITORIES - 1
+
+
+def test_sync_from_legacy_state_at_threshold(workspace, streams):
+    for index in range(DEFAULT_COMPACT_MIN_REPOSITORIES):
+        workspace.add_repository(f"r{index}")
+        workspace.commits[f"r{index}"] = ["2024-02-01T00:00:00+00:00", "2024-03-01T00:00:00+00:00"]
+
+    emitted = checked_read(streams, "commits", {"commits": {"cursor_at": "2024-02-15T00:00:00+00:00"}})
+
+    decoded = StateCodec(FIELDS).decode(emitted[-1])
+    assert COMPACT_KEY in emitted[-1]
+    assert decoded["cursor_at"] == "2024-03-01T00:00:00.000000Z"
+    assert len(decoded["repository_cursors"]) == DEFAULT_COMPACT_MIN_REPOSITORIES